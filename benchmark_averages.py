@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Averages Benchmark
+==================
+מדידת AveragesCalculator על עונה סינתטית (ברירת מחדל: ~12,000 שורות שחקן-משחק)
+משווה את החישוב המלא (שחקנים + קבוצות + יריבים) עם המימוש הקודם (שורה-שורה) מול החישוב הווקטורי,
+על אותו קלט, ובודק שהתוצאות זהות
+
+- LegacyAveragesCalculator = אותו חישוב, רק ארבעת השלבים שהוחלפו חוזרים למימוש שורה-שורה:
+  team_id (apply), possessions (apply), דירוגים (rank לכל עמודה), זוגות יריבים (לולאה על משחקים)
+- טבלת השלבים מציגה רק את השלבים שנמדדים בנפרד: team_id ודירוגים רצים על טבלאות הממוצעים
+  (שורה לקבוצה/שחקן, לא לכל משחק) ואין בהם האצה לבד - הם נכללים רק בחישוב המלא
+
+Usage:
+    python benchmark_averages.py
+    python benchmark_averages.py --teams 16 --rounds 60 --players 13
+"""
+
+import argparse
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from scrapers.processors.averages import AveragesCalculator
+from scrapers.processors.stats_calculator import StatsCalculator
+from utils import normalize_team_name_global
+
+LEAGUE_ID = 1
+STAT_COLS = ['fgm', 'fga', '2ptm', '2pta', '3ptm', '3pta', 'ftm', 'fta',
+             'def', 'off', 'ast', 'stl', 'to', 'pf', 'pfa', 'blk', 'blka']
+OPPONENT_COLS = ['pts', '2ptm', '2pta', '3ptm', '3pta', 'fgm', 'fga', 'ftm', 'fta', 'def', 'off', 'reb',
+                 'pf', 'pfa', 'stl', 'to', 'ast', 'blk', 'blka', 'rate', 'second_chance_pts',
+                 'fast_break_pts', 'points_in_paint', 'pts_off_turnovers']
+
+
+def make_season(teams=16, rounds=60, players=13, seed=7):
+    """
+    עונה סינתטית: כל מחזור = teams/2 משחקים
+
+    Returns:
+        (player_df, team_df, team_mapping)
+    """
+    rng = np.random.default_rng(seed)
+    team_names = [f"קבוצה {i}" for i in range(teams)]
+    player_rows, team_rows = [], []
+
+    for rnd in range(rounds):
+        order = rng.permutation(teams)
+        for home, away in zip(order[::2], order[1::2]):
+            game_id = f"{LEAGUE_ID}_{rnd}_{home}_{away}"
+            for team in (home, away):
+                stats = {col: rng.integers(0, 12, players) for col in STAT_COLS}
+                stats['pts'] = 2 * stats['2ptm'] + 3 * stats['3ptm'] + stats['ftm']
+                stats['reb'] = stats['def'] + stats['off']
+                stats['rate'] = stats['pts'] + stats['reb'] - stats['to']
+                for p in range(players):
+                    row = {col: int(values[p]) for col, values in stats.items()}
+                    row.update({
+                        'game_id': game_id,
+                        'player_id': f"p{team}_{p}",
+                        'player_name': f"שחקן {team}-{p}",
+                        'team': team_names[team],
+                        'min': int(rng.integers(0, 40)),
+                        'starter': int(p < 5)
+                    })
+                    player_rows.append(row)
+
+                team_row = {col: int(values.sum()) for col, values in stats.items()}
+                team_row.update({
+                    'game_id': game_id,
+                    'team': team_names[team],
+                    'second_chance_pts': int(rng.integers(0, 20)),
+                    'bench_pts': int(rng.integers(0, 40)),
+                    'fast_break_pts': int(rng.integers(0, 20)),
+                    'points_in_paint': int(rng.integers(10, 60)),
+                    'pts_off_turnovers': int(rng.integers(0, 25))
+                })
+                team_rows.append(team_row)
+
+    mapping = {(name, LEAGUE_ID): {'team_id': 100 + i} for i, name in enumerate(team_names)}
+    return pd.DataFrame(player_rows), pd.DataFrame(team_rows), mapping
+
+
+# ============================================
+# המימוש הקודם (שורה-שורה) - להשוואה בלבד
+# ============================================
+
+_possessions = StatsCalculator.calculate_possessions
+
+
+def legacy_possessions(df):
+    return df.apply(lambda row: _possessions(row.to_dict()), axis=1)
+
+
+class LegacyAveragesCalculator(AveragesCalculator):
+    """AveragesCalculator עם השלבים שהוחלפו במימוש שורה-שורה הקודם"""
+
+    def _attach_team_ids(self, df):
+        df = self._with_league(df)
+
+        def get_team_id(row):
+            key = (row['team'], int(row['league_id']))
+            if key in self.team_mapping:
+                return self.team_mapping[key]['team_id']
+            key = (str(row['team']).strip(), int(row['league_id']))
+            if key in self.team_mapping:
+                return self.team_mapping[key]['team_id']
+            return normalize_team_name_global(row['team'], row['league_id'], self.team_mapping)['team_id']
+
+        df['team_id'] = df.apply(get_team_id, axis=1)
+        return df
+
+    @staticmethod
+    def _add_ranks(df, ascending_cols, descending_cols):
+        df = df.copy()
+        for col in descending_cols:
+            if col in df.columns:
+                df[f"{col}_rank"] = df[col].rank(ascending=False, method='min').astype(int)
+        for col in ascending_cols:
+            if col in df.columns:
+                df[f"{col}_rank"] = df[col].rank(ascending=True, method='min').astype(int)
+        return df
+
+    @staticmethod
+    def _opponent_rows(team_df, stat_cols):
+        rows = []
+        for game_id in team_df['game_id'].unique():
+            game_teams = team_df[team_df['game_id'] == game_id]
+            if len(game_teams) == 2:
+                team1, team2 = game_teams.iloc[0], game_teams.iloc[1]
+                opp1 = {'league_id': team1['league_id'], 'team': team1['team'], 'game_id': game_id}
+                opp2 = {'league_id': team2['league_id'], 'team': team2['team'], 'game_id': game_id}
+                for col in stat_cols:
+                    opp1[f"opp_{col}"] = team2[col]
+                    opp2[f"opp_{col}"] = team1[col]
+                rows.extend([opp1, opp2])
+        return pd.DataFrame(rows) if rows else None
+
+
+def full_calculation(calc, player_df, team_df):
+    """החישוב המלא של ליגה (בלי סכומים רצים): שחקנים, קבוצות, יריבים"""
+    return (
+        calc.calculate_player_averages(player_df.copy()),
+        calc.calculate_team_averages(team_df.copy()),
+        calc.calculate_opponent_averages(team_df.copy())
+    )
+
+
+def legacy_full_calculation(calc, player_df, team_df):
+    with mock.patch.object(StatsCalculator, 'calculate_possessions', staticmethod(legacy_possessions)):
+        return full_calculation(calc, player_df, team_df)
+
+
+def same_frames(old, new):
+    return all(
+        o.sort_values(list(o.columns[:2])).reset_index(drop=True).equals(
+            n.sort_values(list(n.columns[:2])).reset_index(drop=True)
+        )
+        for o, n in zip(old, new)
+    )
+
+
+def timed(func, *args, repeat=3):
+    """(זמן הריצה הטוב ביותר בשניות, תוצאה)"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark AveragesCalculator on a synthetic season')
+    parser.add_argument('--teams', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=60)
+    parser.add_argument('--players', type=int, default=13)
+    args = parser.parse_args()
+
+    player_df, team_df, mapping = make_season(args.teams, args.rounds, args.players)
+    player_df['league_id'] = LEAGUE_ID
+    team_df['league_id'] = LEAGUE_ID
+    print(f"Synthetic season: {len(player_df):,} player rows, {len(team_df):,} team rows")
+
+    calc = AveragesCalculator(LEAGUE_ID, 'bench', '.', '.', team_mapping=mapping)
+    legacy = LegacyAveragesCalculator(LEAGUE_ID, 'bench', '.', '.', team_mapping=mapping)
+
+    results = []
+
+    # possessions
+    team_avg = calc.calculate_team_averages(team_df.copy())
+    old_t, old = timed(legacy_possessions, team_avg)
+    new_t, new = timed(StatsCalculator.calculate_possessions, team_avg)
+    results.append(('possessions', old_t, new_t, np.allclose(old, new)))
+
+    # זוגות יריבים
+    opp_cols = [col for col in OPPONENT_COLS if col in team_df.columns]
+    old_t, old = timed(legacy._opponent_rows, team_df, opp_cols)
+    new_t, new = timed(calc._opponent_rows, team_df, opp_cols)
+    results.append(('opponent rows', old_t, new_t, old.equals(new)))
+
+    # החישוב המלא על אותו קלט
+    old_t, old = timed(legacy_full_calculation, legacy, player_df, team_df)
+    new_t, new = timed(full_calculation, calc, player_df, team_df)
+    results.append(('full averages', old_t, new_t, same_frames(old, new)))
+
+    print(f"\n{'step':<16}{'row-wise':>12}{'vectorized':>12}{'speedup':>10}  same")
+    for name, old_t, new_t, same in results:
+        print(f"{name:<16}{old_t * 1000:>10.1f}ms{new_t * 1000:>10.1f}ms{old_t / new_t:>9.1f}x  {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,86 @@ SCRAPING_CONFIG = {
     "delay_between_requests": 1,
     "timeout": 10,
     "retry_attempts": 3,
-    
+    "retry_backoff": 0.5,      # שניות - מוכפל בכל ניסיון חוזר (0.5, 1, 2...)
+    "http_pool_size": 16,      # חיבורי keep-alive פתוחים לכל אתר
+
+    # מספר בקשות מקבילות מקסימלי לכל אתר (מנוע ההורדה האסינכרוני)
+    "max_concurrency_per_host": 4,
+
+    # pipeline גזירת משחקים: הורדה -> פרסור -> כתיבה/העלאה (thread יחיד)
+    "game_fetch_workers": 4,
+    "game_parse_workers": 2,
+    "pipeline_queue_size": 16,   # תורים חסומים - זיכרון קבוע גם בגזירת עונה שלמה
+
+    # עמודי שחקנים שנגזרים במקביל (הקצב עדיין מוגבל ע"י rate_limits)
+    "crawl_workers": 4,
+
+    # מספר עמודים (soup) שנשמרים בזיכרון במהלך ריצה - עמוד הליגה, עמודי קבוצות
+    "soup_cache_size": 32,
+
+    # parser של BeautifulSoup: "html.parser" או "lxml" (מהיר, דורש pip install lxml)
+    # אם lxml לא מותקן - נופלים אוטומטית ל-html.parser
+    # לפני מעבר ל-lxml: pytest tests/test_parser_parity.py (עמודי /match/ שמורים, שני ה-parsers)
+    "html_parser": "html.parser",
+
+    # הגבלת קצב לכל אתר (Token Bucket): rate = בקשות לשנייה, burst = רצף מותר
+    # 429/5xx מורידים את הקצב אוטומטית עד min_rate, והצלחות מחזירות אותו
+    # אתר שלא מופיע כאן מקבל 1/delay_between_requests
+    "rate_limits": {
+        "ibasketball.co.il": {"rate": 2.0, "burst": 5, "min_rate": 0.25},
+        "basket.co.il": {"rate": 2.0, "burst": 5, "min_rate": 0.25}
+    },
+
+    # מטמון HTTP על הדיסק (Conditional GET עם ETag / Last-Modified)
+    # עמוד שלא השתנה מחזיר 304 ומוגש מהמטמון במקום הורדה מלאה
+    "http_cache": {
+        "enabled": True,
+        "folder": "data/http_cache",
+        "ttl_days": 14,          # רשומה ישנה יותר נמחקת ומורדת מחדש
+        "max_size_mb": 200,      # מעל הגודל הזה נמחקות הרשומות הכי פחות בשימוש
+        "fresh_minutes": 0       # > 0: מגישים מהמטמון בלי לפנות לשרת בתוך החלון
+    },
+
+    # Supabase: מקסימום שורות לבקשת upsert אחת (תור לכל טבלה, נשלח בסוף כל שלב)
+    "supabase_batch_size": 500,
+
+    # העלאה ל-Supabase ב-thread רקע: הגזירה לא מחכה לרשת, chunk שנכשל מנוסה שוב ואז נכתב ל-dead letter
+    "supabase_worker": {
+        "enabled": True,
+        "queue_size": 1000,          # פריטים (שורות של טבלה) שממתינים; תור מלא = הגזירה מחכה
+        "retries": 3,
+        "backoff_seconds": 1.0,      # 1, 2, 4 שניות
+        "dead_letter": "logs/supabase_dead_letter.jsonl"   # שליחה חוזרת: python main.py --replay-dead-letter
+    },
+
+    # יומן העלאות: hash לכל שורה שהועלתה - שורות שלא השתנו לא נשלחות שוב (python main.py --force-upload עוקף)
+    "upload_ledger": {
+        "enabled": True,
+        "path": "data/upload_ledger.sqlite"
+    },
+
+    # העברת CSV ל-Supabase (migrate_to_supabase.py): קריאה ב-chunks, טבלאות בלתי תלויות במקביל, המשך מנקודת עצירה
+    "migration": {
+        "chunk_size": 500,           # שורות CSV ל-chunk (וגם מקסימום שורות לבקשת upsert)
+        "workers": 4,                # טבלאות שנטענות במקביל באותו שלב
+        "checkpoint": "data/migration_checkpoint.json"
+    },
+
+    # ממוצעים אינקרמנטליים: סכומים רצים נשמרים בין ריצות, ורק משחקים חדשים/מתוקנים מחושבים
+    "incremental_averages": True,
+
+    # מחסן נתונים מקומי (SQLite) - כל הישויות הגזורות במקום אחד, באותה סכמה כמו Supabase
+    "warehouse": {
+        "enabled": True,
+        "path": "data/warehouse.sqlite"
+    },
+
+    # זיהוי שמות קבוצות שלא מופיעים במיפוי כמו שהם (גרשיים, רווחים, שמות מקוצרים)
+    "team_resolution": {
+        "fuzzy_min_score": 0.85,  # דמיון trigram מינימלי (Dice, 0-1) להתאמה מקורבת, רק עם אותו סוג מועדון
+        "cache_size": 4096        # שמות שכבר זוהו (LRU)
+    },
+
     # מצב גזירה - בחר אחד:
     # "full"  - בדיקה מקיפה של כל השחקנים + תיקון נתונים חסרים (כמו המקור)
     # "quick" - רק שחקנים חדשים + משחקים חדשים (מהיר, יומיומי)
@@ -13,6 +13,7 @@ Basketball Scraper - Main Script - UPDATED
     python main.py                    # גזירה לכל הליגות הפעילות
     python main.py --league 1         # גזירה לליגה ספציפית (לפי מספר)
     python main.py --mode quick       # מצב גזירה מהיר (רק חדשים)
+    python main.py --parallel 4       # עד 4 ליגות במקביל
     python main.py --list             # רשימת ליגות זמינות
     python main.py --help             # עזרה
 
@@ -24,12 +25,16 @@ Basketball Scraper - Main Script - UPDATED
 import sys
 import argparse
 import json  
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 from config import get_active_leagues, get_league_config, LEAGUES, SCRAPING_CONFIG
 from scrapers import IBasketballScraper
-from utils import log_message
+from scrapers.processors import calculate_leagues_averages
+from utils import log_message, league_log
+from utils.rate_limiter import get_rate_limiter
+from utils.http_session import get_request_stats
 from models import League
 import pandas as pd
 
@@ -38,13 +43,15 @@ import pandas as pd
 # MAIN SCRAPING LOGIC
 # ============================================
 
-def scrape_league(league_id, scrape_mode=None):
+def scrape_league(league_id, scrape_mode=None, averages_sources=None, force_upload=False):
     """
     גזירה של ליגה אחת
     
     Args:
         league_id: מזהה ליגה מספרי (לדוגמה: "1", "2")
         scrape_mode: מצב גזירה ("full" או "quick"), None = מconfig
+        averages_sources: list - אם הועבר, הממוצעים לא מחושבים כאן ומקור הליגה נוסף לרשימה
+        force_upload: העלאה ל-Supabase גם של שורות שלא השתנו
     
     Returns:
         bool: True אם הצליח
@@ -74,8 +81,14 @@ def scrape_league(league_id, scrape_mode=None):
             return False
         
         # הרצת גזירה
+        scraper.defer_averages = averages_sources is not None
+        scraper.force_upload = force_upload
         success = scraper.run()
         
+        # כישלון העלאה לא פוסל את הנתונים המקומיים לחישוב הממוצעים המשותף
+        if scraper.scrape_succeeded and averages_sources is not None:
+            averages_sources.append(scraper.averages_source())
+        
         return success
         
     except Exception as e:
@@ -85,8 +98,71 @@ def scrape_league(league_id, scrape_mode=None):
         return False
 
 
-def scrape_all_leagues(scrape_mode=None):
-    """גזירה של כל הליגות הפעילות"""
+def _process_league(league_id, league_name, scrape_mode=None, averages_sources=None, force_upload=False):
+    """כותרת + גזירה של ליגה אחת (יחידת עבודה גם בריצה מקבילית)"""
+    log_message("")
+    log_message("="*80)
+    log_message(f"PROCESSING LEAGUE: {league_id} - {league_name}")
+    log_message("="*80)
+    
+    return scrape_league(
+        league_id, scrape_mode=scrape_mode, averages_sources=averages_sources, force_upload=force_upload
+    )
+
+
+def _process_league_logged(league_id, league_name, scrape_mode=None, averages_sources=None, force_upload=False):
+    """כמו _process_league, אבל כל שורות ה-log של הליגה (גם של threads עובדים) מקבלות את הקוד שלה"""
+    with league_log(LEAGUES[league_id]['code']):
+        return _process_league(league_id, league_name, scrape_mode, averages_sources, force_upload)
+
+
+def _log_request_stats():
+    """קצב בקשות בפועל + latency - מונים של כל התהליך, לכן נכתבים פעם אחת בסוף הריצה"""
+    for line in get_rate_limiter().summary_lines():
+        log_message(line)
+    for line in get_request_stats().summary_lines():
+        log_message(line)
+
+
+def replay_dead_letter():
+    """
+    שליחה חוזרת ל-Supabase של השורות שנכתבו ל-dead letter (ה-ledger מתעדכן כמו בהעלאה רגילה)
+    
+    Returns:
+        bool: True אם לא נשארו שורות שנכשלו
+    """
+    try:
+        from utils.supabase_uploader import upsert_rows
+        from utils.upload_ledger import get_upload_ledger
+        from utils.upload_worker import replay_dead_letter as replay
+    except ImportError as e:
+        log_message(f"❌ Supabase uploader not available: {e}")
+        return False
+    
+    settings = SCRAPING_CONFIG.get('supabase_worker', {})
+    ledger = get_upload_ledger()
+    
+    def upsert(table, rows):
+        on_success = (lambda chunk: ledger.record(table, chunk)) if ledger is not None else None
+        _, _, errors = upsert_rows(
+            table, rows, on_success=on_success,
+            retries=settings.get('retries', 0), backoff=settings.get('backoff_seconds', 1.0)
+        )
+        return errors
+    
+    _, remaining = replay(settings.get('dead_letter', 'logs/supabase_dead_letter.jsonl'), upsert, log=log_message)
+    return remaining == 0
+
+
+def scrape_all_leagues(scrape_mode=None, parallel=1, force_upload=False):
+    """
+    גזירה של כל הליגות הפעילות
+    
+    Args:
+        scrape_mode: מצב גזירה ("full" או "quick"), None = מconfig
+        parallel: מספר ליגות שרצות במקביל (1 = אחת אחרי השנייה)
+        force_upload: העלאה ל-Supabase גם של שורות שלא השתנו
+    """
     active_leagues = get_active_leagues()
     
     if not active_leagues:
@@ -97,17 +173,38 @@ def scrape_all_leagues(scrape_mode=None):
     
     results = {}
     
-    for league_id in active_leagues.keys():
+    # הממוצעים של כל הליגות מחושבים יחד בסוף (מיפוי קבוצות אחד, groupby אחד)
+    averages_sources = []
+    
+    if parallel > 1:
+        # הליגות חולקות רק את teams.csv (קריאה) ואת שכבת ה-HTTP (thread-safe)
+        log_message(f"Running up to {parallel} leagues in parallel")
+        
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='league') as executor:
+            futures = {
+                league_id: executor.submit(
+                    _process_league_logged, league_id, config['name'], scrape_mode, averages_sources, force_upload
+                )
+                for league_id, config in active_leagues.items()
+            }
+            for league_id, future in futures.items():
+                results[league_id] = future.result()
+    else:
+        for league_id, config in active_leagues.items():
+            results[league_id] = _process_league(league_id, config['name'], scrape_mode, averages_sources, force_upload)
+    
+    if averages_sources:
         log_message("")
         log_message("="*80)
-        log_message(f"PROCESSING LEAGUE: {league_id} - {active_leagues[league_id]['name']}")
+        log_message("CALCULATING AVERAGES (ALL LEAGUES)")
         log_message("="*80)
-        
-        success = scrape_league(league_id, scrape_mode=scrape_mode)
-        results[league_id] = success
+        for league_id, success in calculate_leagues_averages(averages_sources).items():
+            if not success:
+                log_message(f"❌ Failed to calculate averages", LEAGUES[league_id]['code'])
+                results[league_id] = False
     
     
-    # סיכום
+    # סיכום (בלוק רציף אחד, אחרי שכל הליגות סיימו)
     log_message("")
     log_message("="*80)
     log_message("SCRAPING SUMMARY")
@@ -116,6 +213,7 @@ def scrape_all_leagues(scrape_mode=None):
     successful = [lid for lid, success in results.items() if success]
     failed = [lid for lid, success in results.items() if not success]
     
+    _log_request_stats()
     log_message(f"✅ Successful: {len(successful)} leagues")
     for lid in successful:
         log_message(f"   ✓ League {lid}: {LEAGUES[lid]['name']}")
@@ -145,6 +243,9 @@ Examples:
   python main.py --league 1            # Scrape only league #1
   python main.py --mode quick          # Quick scrape (new players/games only)
   python main.py --league 1 --mode quick  # Quick scrape for specific league
+  python main.py --parallel 4          # Scrape up to 4 leagues at once
+  python main.py --force-upload        # Re-upload all rows to Supabase, changed or not
+  python main.py --replay-dead-letter  # Retry the rows that failed to upload and exit
   python main.py --list                # List all available leagues
         """
     )
@@ -162,6 +263,26 @@ Examples:
         help='Scraping mode: "full" (complete + validation) or "quick" (new only)'
     )
     
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Scrape up to N leagues concurrently (default: 1, sequential)'
+    )
+    
+    parser.add_argument(
+        '--force-upload',
+        action='store_true',
+        help='Upload every row to Supabase, ignoring the local upload ledger (unchanged rows are skipped by default)'
+    )
+    
+    parser.add_argument(
+        '--replay-dead-letter',
+        action='store_true',
+        help='Re-upload the rows written to the Supabase dead letter file and exit'
+    )
+    
     parser.add_argument(
         '--list',
         action='store_true',
@@ -191,6 +312,10 @@ Examples:
         print("  • quick = New players/games only (fast, daily)\n")
         return
     
+    # שליחה חוזרת של ה-dead letter בלבד
+    if args.replay_dead_letter:
+        sys.exit(0 if replay_dead_letter() else 1)
+    
     # קביעת מצב גזירה
     scrape_mode = args.mode if args.mode else SCRAPING_CONFIG.get('scrape_mode', 'full')
     
@@ -200,6 +325,10 @@ Examples:
     log_message("BASKETBALL SCRAPER STARTED")
     log_message(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     log_message(f"Mode: {scrape_mode.upper()}")
+    if args.parallel > 1 and not args.league:
+        log_message(f"Parallel leagues: {args.parallel}")
+    if args.force_upload:
+        log_message("Force upload: all rows are sent to Supabase")
     log_message("="*80)
     
     # גזירה
@@ -213,13 +342,15 @@ Examples:
             sys.exit(1)
         
         log_message(f"Scraping single league: {league_id} - {LEAGUES[league_id]['name']}")
-        success = scrape_league(league_id, scrape_mode=scrape_mode)
-        
+        success = scrape_league(league_id, scrape_mode=scrape_mode, force_upload=args.force_upload)
+        _log_request_stats()
         
         exit_code = 0 if success else 1
     else:
         # כל הליגות
-        all_success = scrape_all_leagues(scrape_mode=scrape_mode)
+        all_success = scrape_all_leagues(
+            scrape_mode=scrape_mode, parallel=args.parallel, force_upload=args.force_upload
+        )
         exit_code = 0 if all_success else 1
     
     # סיום
@@ -3,20 +3,344 @@
 Migration Script - CSV to Supabase
 ===================================
 מעביר את כל הנתונים הקיימים מ-CSV ל-Supabase
+
+- כל קובץ נקרא ב-chunks (pd.read_csv chunksize) - בלי לטעון קבצים שלמים לזיכרון
+- ניקוי טיפוסים וקטורי לכל chunk (NaN -> None, מספרים שלמים, תאריכים) במקום המרה שורה-שורה
+- כל טבלה עולה ב-upserts של עד chunk_size שורות
+- הטבלאות נטענות בשלבים לפי התלויות (leagues -> teams -> players/games -> ...),
+  וטבלאות שונות באותו שלב נטענות במקביל
+- אחרי כל chunk שעלה נרשמת נקודת עצירה (checkpoint) - ריצה שנקטעה ממשיכה מאותו מקום
 """
 
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 from supabase_uploader import SupabaseUploader
-from config import LEAGUES
+from config import LEAGUES, SCRAPING_CONFIG
 from utils import log_message
 
+MIGRATION_CONFIG = SCRAPING_CONFIG.get('migration', {})
+CHUNK_SIZE = MIGRATION_CONFIG.get('chunk_size', SCRAPING_CONFIG.get('supabase_batch_size', 500))
+WORKERS = MIGRATION_CONFIG.get('workers', 4)
+CHECKPOINT_FILE = MIGRATION_CONFIG.get('checkpoint', 'data/migration_checkpoint.json')
+
+# טבלה ב-Supabase ועמודות המפתח (on_conflict) לכל סוג נתונים
+TABLES = {
+    'leagues': ('leagues', 'league_id'),
+    'teams': ('teams', 'team_id,league_id'),
+    'players': ('players', 'player_id'),
+    'player_details': ('players', 'player_id'),
+    'history': ('player_season_history', 'player_id,season'),
+    'games': ('games', 'game_id'),
+    'quarters': ('game_quarters', 'game_id,team_id,quarter'),
+    'player_stats': ('game_player_stats', 'game_id,player_id'),
+    'team_stats': ('game_team_stats', 'game_id,team_id'),
+    'player_averages': ('player_averages', 'player_id,league_id'),
+    'team_averages': ('team_averages', 'team_id,league_id'),
+    'opponent_averages': ('opponent_averages', 'team_id,league_id')
+}
+
+# סדר הטעינה: כל שלב מתחיל רק אחרי שהקודם הצליח (מפתחות זרים)
+# player_details אחרי players - שניהם כותבים לאותה טבלה, והקובץ של הליגה קובע
+STAGES = [
+    ['leagues'],
+    ['teams'],
+    ['players', 'games'],
+    ['player_details'],
+    ['history', 'quarters', 'player_stats', 'team_stats',
+     'player_averages', 'team_averages', 'opponent_averages']
+]
+
+# עמודות בקובץ ה-history שאינן עונות
+HISTORY_ID_COLUMNS = ['player_id', 'Name', 'Current Team', 'team_id', 'league_id',
+                      'Date Of Birth', 'Height', 'Number']
+
+# מזהים שנקראים כטקסט (מזהה hex שכולו ספרות לא יהפוך למספר)
+ID_DTYPES = {'player_id': str, 'gameid': str, 'game_id': str}
+
+
+# ============================================
+# VECTORIZED CLEANING
+# ============================================
+
+def _column(df, name, default=None):
+    """עמודה מה-chunk, או עמודה קבועה אם היא לא קיימת בקובץ"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
+def _int(series):
+    """מספר שלם או NA (13.0 -> 13, טקסט -> NA)"""
+    return pd.to_numeric(series, errors='coerce').round().astype('Int64')
+
+
+def _float(series):
+    return pd.to_numeric(series, errors='coerce')
+
+
+def _text_id(series):
+    """מזהה כטקסט: 741605.0 -> '741605'"""
+    if pd.api.types.is_numeric_dtype(series):
+        series = _int(series)
+    return series.astype('string')
+
+
+def _iso_date(series):
+    """DD/MM/YYYY -> YYYY-MM-DD (ערכים בפורמט אחר נשארים כמו שהם)"""
+    text = series.astype('string')
+    parts = text.str.extract(r'^\s*(\d{1,2})/(\d{1,2})/(\d{4})\s*$')
+    iso = parts[2] + '-' + parts[1].str.zfill(2) + '-' + parts[0].str.zfill(2)
+    return iso.where(parts[0].notna(), text)
+
+
+def to_records(df):
+    """
+    DataFrame -> רשימת מילונים מוכנה ל-upsert
+    NaN/NA -> None וטיפוסי numpy -> טיפוסי Python, לכל ה-chunk בפעולה אחת
+    (במקום clean_numeric_fields לכל שורה)
+    """
+    df = df.loc[:, ~df.columns.astype(str).str.startswith('Unnamed:')]
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+# ============================================
+# TRANSFORMS (chunk -> DataFrame בעמודות של Supabase)
+# ============================================
+
+def _leagues_frame(df, league_id=None):
+    return pd.DataFrame({
+        'league_id': _int(df['league_id']),
+        'name': df['name'],
+        'name_en': _column(df, 'name_en', '').fillna(''),
+        'country': _column(df, 'country', 'Israel').fillna('Israel'),
+        'season': _column(df, 'season', '').fillna(''),
+        'url': _column(df, 'url', '').fillna(''),
+        'is_active': _column(df, 'is_active', False).fillna(False).astype(bool)
+    })
+
+
+def _teams_frame(df, league_id=None):
+    team_ids = _int(df['Team_ID'])
+    league_ids = _int(df['League_ID'])
+    valid = (team_ids.notna() & league_ids.notna() & (league_ids != 0)).fillna(False)
+    df = df[valid]
+    return pd.DataFrame({
+        'team_id': team_ids[valid],
+        'league_id': league_ids[valid],
+        'team_name': df['Team_Name'],
+        'short_name': _column(df, 'short_name').fillna(df['Team_Name']),
+        'bg_color': _column(df, 'bg_color', '#000000').fillna('#000000'),
+        'text_color': _column(df, 'text_color', '#FFFFFF').fillna('#FFFFFF'),
+        'name_variations': _column(df, 'name_variations', '').fillna('')
+    })
+
+
+def _players_frame(df, league_id=None):
+    df = df[df['player_id'].notna()]
+    return pd.DataFrame({
+        'player_id': df['player_id'].astype('string'),
+        'name': df['name'],
+        'current_team_id': _int(_column(df, 'current_team_id')),
+        'league_id': _int(df['league_id']),
+        'date_of_birth': _column(df, 'date_of_birth'),
+        'height': _float(_column(df, 'height')),
+        'jersey_number': _int(_column(df, 'jersey_number'))
+    })
+
+
+def _player_details_frame(df, league_id):
+    df = df[df['player_id'].notna()]
+    return pd.DataFrame({
+        'player_id': df['player_id'].astype('string'),
+        'name': df['Name'],
+        'current_team_id': _int(_column(df, 'team_id')),
+        'league_id': int(league_id),
+        'date_of_birth': _column(df, 'Date Of Birth'),
+        'height': _float(_column(df, 'Height')),
+        'jersey_number': _int(_column(df, 'Number'))
+    })
+
+
+def _history_frame(df, league_id):
+    """עמודת עונה לכל שורה -> שורה לכל (שחקן, עונה); "קבוצה (ליגה)" מפוצל לשני שדות"""
+    seasons = [col for col in df.columns if col not in HISTORY_ID_COLUMNS]
+    long = df.melt(id_vars=['player_id'], value_vars=seasons, var_name='season', value_name='team_league')
+    long = long[long['team_league'].notna()]
+    team_league = long['team_league'].astype(str)
+    long, team_league = long[team_league.str.strip() != ''], team_league[team_league.str.strip() != '']
+
+    has_league = team_league.str.contains('(', regex=False)
+    parts = team_league.str.split('(')
+    return pd.DataFrame({
+        'player_id': long['player_id'].astype('string'),
+        'season': long['season'].astype(str),
+        'team_name': parts.str[0].str.strip().where(has_league, team_league),
+        'league_name': parts.str[1].str.replace(')', '', regex=False).str.strip().where(has_league, ''),
+        'league_id': int(league_id)
+    })
+
+
+def _games_frame(df, league_id):
+    home_score = _column(df, 'Home Score')
+    return pd.DataFrame({
+        'game_id': df['gameid'].astype('string'),
+        'league_id': int(league_id),
+        'code': _text_id(_column(df, 'Code')),
+        'week_day': _column(df, 'Week Day', ''),
+        'date': _iso_date(df['Date']),
+        'round': _text_id(_column(df, 'Round')),
+        'time': _column(df, 'Time', ''),
+        'home_team': df['Home Team'],
+        'home_team_code': _column(df, 'Home Team Code', ''),
+        'home_team_id': _int(_column(df, 'home_team_id')),
+        'away_team': df['Away Team'],
+        'away_team_code': _column(df, 'Away Team Code', ''),
+        'away_team_id': _int(_column(df, 'away_team_id')),
+        'venue': _column(df, 'Venue', ''),
+        'home_score': _int(home_score),
+        'away_score': _int(_column(df, 'Away Score')),
+        'arena': _column(df, 'Arena', ''),
+        'status': (home_score.notna() & (home_score.astype('string').str.strip() != '')).fillna(False).map(
+            {True: 'completed', False: 'scheduled'}
+        )
+    })
+
+
+def _game_stats_frame(df, league_id=None):
+    """סטטיסטיקות משחק (שחקן/קבוצה) - כמו בקובץ, עם תאריך ISO"""
+    if 'game_date' in df.columns:
+        df = df.assign(game_date=_iso_date(df['game_date']))
+    return df
+
+
+def _quarters_frame(df, league_id=None):
+    df = _game_stats_frame(df)
+    if 'quarter' in df.columns and not pd.api.types.is_numeric_dtype(df['quarter']):
+        # "Q1" -> 1
+        df = df.assign(quarter=_int(df['quarter'].astype('string').str.replace('Q', '', regex=False)))
+    return df
+
+
+def _as_is_frame(df, league_id=None):
+    return df
+
+
+TRANSFORMS = {
+    'leagues': _leagues_frame,
+    'teams': _teams_frame,
+    'players': _players_frame,
+    'player_details': _player_details_frame,
+    'history': _history_frame,
+    'games': _games_frame,
+    'quarters': _quarters_frame,
+    'player_stats': _game_stats_frame,
+    'team_stats': _game_stats_frame,
+    'player_averages': _as_is_frame,
+    'team_averages': _as_is_frame,
+    'opponent_averages': _as_is_frame
+}
+
+
+# ============================================
+# CHECKPOINT
+# ============================================
+
+class MigrationCheckpoint:
+    """
+    נקודות עצירה: לכל משימה (ליגה + סוג נתונים) - כמה chunks כבר עלו והאם הסתיימה
+    נשמר ב-JSON אחרי כל chunk; קובץ מקור שהשתנה מאז (גודל/mtime) מתחיל מההתחלה,
+    וכך גם משימה שלא הסתיימה כשגודל ה-chunk שונה (מספר chunks לא מתורגם לאותן שורות)
+    """
+
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.tasks = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.tasks = json.load(f).get('tasks', {})
+            except (OSError, ValueError) as e:
+                log_message(f"⚠️  Cannot read checkpoint {path}: {e} - starting over")
+
+    @staticmethod
+    def signature(file_path):
+        """טביעת הקובץ - אם הוא השתנה, ה-chunks שנרשמו כבר לא תקפים"""
+        if not file_path:
+            return None
+        stat = os.stat(file_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def progress(self, key, signature):
+        """
+        Returns:
+            (chunks שכבר עלו, האם המשימה הסתיימה)
+        """
+        entry = self.tasks.get(key)
+        if not entry or entry.get('signature') != signature:
+            return 0, False
+        if entry.get('done', False):
+            return entry.get('chunks', 0), True
+        if entry.get('chunk_size') != self.chunk_size:
+            log_message(f"⚠️  Checkpoint for {key} used chunks of {entry.get('chunk_size')} - "
+                        f"restarting it with chunks of {self.chunk_size}")
+            return 0, False
+        return entry.get('chunks', 0), False
+
+    def update(self, key, signature, chunks, done=False):
+        with self._lock:
+            self.tasks[key] = {
+                'signature': signature,
+                'chunk_size': self.chunk_size,
+                'chunks': chunks,
+                'done': done
+            }
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'tasks': self.tasks}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """מחיקת נקודות העצירה (אחרי העברה מלאה, או --fresh)"""
+        with self._lock:
+            self.tasks = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+# ============================================
+# MIGRATION
+# ============================================
+
 class DataMigration:
     """מחלקה להעברת נתונים"""
-    
-    def __init__(self):
-        """אתחול"""
+
+    def __init__(self, chunk_size=CHUNK_SIZE, workers=WORKERS, checkpoint_path=CHECKPOINT_FILE, fresh=False):
+        """
+        אתחול
+
+        Args:
+            chunk_size: שורות ל-chunk בקריאה ולבקשת upsert
+            workers: טבלאות שנטענות במקביל באותו שלב
+            checkpoint_path: קובץ נקודות העצירה
+            fresh: להתעלם מנקודות עצירה קיימות ולהתחיל מההתחלה
+        """
         self.uploader = SupabaseUploader()
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.checkpoint = MigrationCheckpoint(checkpoint_path, chunk_size)
+        if fresh:
+            self.checkpoint.clear()
+        self._stats_lock = threading.Lock()
         self.stats = {
             'leagues': 0,
             'teams': 0,
@@ -30,393 +354,237 @@ class DataMigration:
             'team_averages': 0,
             'opponent_averages': 0
         }
-    
+
     def migrate_all(self, league_ids=None):
         """
         העברת כל הנתונים
-        
+
         Args:
             league_ids: רשימת league_ids להעברה (None = כולם)
         """
         log_message("="*60)
         log_message("🚀 STARTING MIGRATION TO SUPABASE")
         log_message("="*60)
-        
+
         # Test connection
         if not self.uploader.test_connection():
             log_message("❌ Cannot connect to Supabase!")
             return False
-        
+
         # Get leagues to migrate
         if league_ids is None:
             leagues_to_migrate = {lid: cfg for lid, cfg in LEAGUES.items() if cfg.get('active', False)}
         else:
             leagues_to_migrate = {lid: cfg for lid, cfg in LEAGUES.items() if lid in league_ids}
-        
-        log_message(f"📊 Migrating {len(leagues_to_migrate)} leagues")
+
+        log_message(f"📊 Migrating {len(leagues_to_migrate)} leagues "
+                    f"(chunks of {self.chunk_size}, {self.workers} workers)")
+        if self.checkpoint.tasks:
+            log_message(f"♻️  Resuming from checkpoint: {self.checkpoint.path}")
         log_message("")
-        
-        # Migrate global data first
-        self._migrate_global_leagues()
-        self._migrate_global_teams()
-        self._migrate_global_players()
-        
-        # Migrate each league
-        for league_id, config in leagues_to_migrate.items():
-            log_message("="*60)
-            log_message(f"[{config['code'].upper()}] Migrating: {config['name']}")
-            log_message("="*60)
-            
-            self._migrate_league_data(league_id, config)
-        
+
+        tasks = self._build_tasks(leagues_to_migrate)
+
+        for number, stage in enumerate(STAGES, 1):
+            stage_tasks = [task for task in tasks if task['kind'] in stage]
+            if not stage_tasks:
+                continue
+
+            log_message(f"📦 Stage {number}/{len(STAGES)}: {', '.join(stage)}")
+            if not self._run_stage(stage_tasks):
+                # השלבים הבאים תלויים בזה (מפתחות זרים) - עוצרים; ריצה חוזרת ממשיכה מה-checkpoint
+                self._print_stats()
+                log_message("="*60)
+                log_message(f"⚠️  MIGRATION STOPPED at stage {number} - run again to resume")
+                log_message("="*60)
+                return False
+
+        self.checkpoint.clear()
+
         # Print stats
         self._print_stats()
-        
+
         log_message("="*60)
         log_message("✅ MIGRATION COMPLETED!")
         log_message("="*60)
-        
+
         return True
-    
-    def _migrate_global_leagues(self):
-        """העברת טבלת leagues"""
-        log_message("📋 Migrating leagues...")
-        
-        leagues_file = 'data/leagues.csv'
-        if not os.path.exists(leagues_file):
+
+    def _build_tasks(self, leagues_to_migrate):
+        """
+        משימה לכל קובץ מקור: סוג נתונים + נתיב + ליגה
+
+        Returns:
+            list של dict: key, kind, path, league_id, league_code
+        """
+        tasks = [
+            {'key': 'global:leagues', 'kind': 'leagues', 'path': 'data/leagues.csv', 'league_id': None, 'league_code': None},
+            {'key': 'global:teams', 'kind': 'teams', 'path': 'data/teams.csv', 'league_id': None, 'league_code': None},
+            {'key': 'global:players', 'kind': 'players', 'path': 'data/players.csv', 'league_id': None, 'league_code': None}
+        ]
+
+        for league_id, config in leagues_to_migrate.items():
+            league_code = config['code']
+            data_folder = config['data_folder']
+            games_folder = config['games_folder']
+            files = {
+                'player_details': os.path.join(data_folder, f"{league_code}_player_details.csv"),
+                'history': os.path.join(data_folder, f"{league_code}_player_history.csv"),
+                'games': os.path.join(games_folder, 'games_schedule.csv'),
+                'quarters': os.path.join(games_folder, 'game_quarters.csv'),
+                'player_stats': os.path.join(games_folder, 'game_player_stats.csv'),
+                'team_stats': os.path.join(games_folder, 'game_team_stats.csv'),
+                'player_averages': os.path.join(data_folder, f"{league_code}_player_averages.csv"),
+                'team_averages': os.path.join(data_folder, f"{league_code}_team_averages.csv"),
+                'opponent_averages': os.path.join(data_folder, f"{league_code}_opponent_averages.csv")
+            }
+            for kind, path in files.items():
+                tasks.append({
+                    'key': f"{league_id}:{kind}",
+                    'kind': kind,
+                    'path': path,
+                    'league_id': league_id,
+                    'league_code': league_code
+                })
+
+        return tasks
+
+    def _run_stage(self, stage_tasks):
+        """
+        הרצת שלב: טבלאות שונות במקביל
+        משימות של אותה טבלה (למשל players מכמה ליגות) רצות ברצף ובסדר הליגות,
+        כך ששחקן שמופיע בשתי ליגות מקבל את אותו ערך כמו בהעברה הסדרתית
+
+        Returns:
+            bool: האם כל המשימות הצליחו
+        """
+        by_table = {}
+        for task in stage_tasks:
+            by_table.setdefault(TABLES[task['kind']][0], []).append(task)
+
+        def run_sequence(sequence):
+            results = [self._migrate_task(task) for task in sequence]
+            return all(results)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(by_table)))) as executor:
+            results = list(executor.map(run_sequence, by_table.values()))
+        return all(results)
+
+    def _read_chunks(self, task):
+        """
+        מקור ה-chunks של משימה
+
+        Returns:
+            (iterator של DataFrames או None אם אין מקור, signature של הקובץ)
+        """
+        path = task['path']
+        if os.path.exists(path):
+            chunks = pd.read_csv(path, encoding='utf-8-sig', chunksize=self.chunk_size, dtype=ID_DTYPES)
+            return chunks, MigrationCheckpoint.signature(path)
+
+        if task['kind'] == 'leagues':
             log_message("⚠️  leagues.csv not found, creating from config")
-            # Create from config
-            for league_id, config in LEAGUES.items():
-                if config.get('active', False):
-                    league_data = {
-                        'league_id': int(league_id),
-                        'name': config['name'],
-                        'name_en': config.get('name_en', ''),
-                        'country': config.get('country', 'Israel'),
-                        'season': config.get('season', ''),
-                        'url': config['url'],
-                        'is_active': True
-                    }
-                    self.uploader.upsert_league(league_data)
-                    self.stats['leagues'] += 1
-        else:
-            df = pd.read_csv(leagues_file, encoding='utf-8-sig')
-            for _, row in df.iterrows():
-                league_data = {
-                    'league_id': int(row['league_id']),
-                    'name': row['name'],
-                    'name_en': row.get('name_en', ''),
-                    'country': row.get('country', 'Israel'),
-                    'season': row.get('season', ''),
-                    'url': row.get('url', ''),
-                    'is_active': bool(row.get('is_active', False))
-                }
-                self.uploader.upsert_league(league_data)
-                self.stats['leagues'] += 1
-        
-        log_message(f"✅ Migrated {self.stats['leagues']} leagues")
-    
-    def _migrate_global_teams(self):
-        """העברת טבלת teams"""
-        log_message("🏀 Migrating teams...")
-        
-        teams_file = 'data/teams.csv'
-        if not os.path.exists(teams_file):
-            log_message("⚠️  teams.csv not found, skipping")
-            return
-        
-        df = pd.read_csv(teams_file, encoding='utf-8-sig')
-        teams_data = []
-        
-        for _, row in df.iterrows():
-            # Skip invalid teams
-            if pd.isna(row['Team_ID']) or pd.isna(row['League_ID']):
-                continue
-            if int(row['League_ID']) == 0:
-                continue
-            
-            teams_data.append({
-                'team_id': int(row['Team_ID']),
-                'league_id': int(row['League_ID']),
-                'team_name': row['Team_Name'],
-                'short_name': row.get('short_name', row['Team_Name']),
-                'bg_color': row.get('bg_color', '#000000'),
-                'text_color': row.get('text_color', '#FFFFFF'),
-                'name_variations': row.get('name_variations', '')
-            })
-        
-        if teams_data:
-            self.uploader.upsert_teams(teams_data)
-            self.stats['teams'] = len(teams_data)
-        
-        log_message(f"✅ Migrated {self.stats['teams']} teams")
-    
-    def _migrate_global_players(self):
-        """העברת טבלת players"""
-        log_message("👤 Migrating players...")
-        
-        players_file = 'data/players.csv'
-        if not os.path.exists(players_file):
-            log_message("⚠️  players.csv not found, skipping")
-            return
-        
-        df = pd.read_csv(players_file, encoding='utf-8-sig')
-        players_data = []
-        
-        for _, row in df.iterrows():
-            if pd.isna(row['player_id']):
-                continue
-            
-            players_data.append({
-                'player_id': str(row['player_id']),
-                'name': row['name'],
-                'current_team_id': int(row['current_team_id']) if pd.notna(row['current_team_id']) else None,
-                'league_id': int(row['league_id']),
-                'date_of_birth': row['date_of_birth'] if pd.notna(row['date_of_birth']) else None,
-                'height': float(row['height']) if pd.notna(row['height']) else None,
-                'jersey_number': int(row['jersey_number']) if pd.notna(row['jersey_number']) else None
-            })
-        
-        if players_data:
-            self.uploader.upsert_players(players_data)
-            self.stats['players'] = len(players_data)
-        
-        log_message(f"✅ Migrated {self.stats['players']} players")
-    
-    def _migrate_league_data(self, league_id, config):
-        """העברת נתוני ליגה ספציפית"""
-        league_code = config['code']
-        data_folder = config['data_folder']
-        games_folder = config['games_folder']
-        
-        # Player details (if not in global file)
-        self._migrate_player_details(league_id, league_code, data_folder)
-        
-        # Player history
-        self._migrate_player_history(league_id, league_code, data_folder)
-        
-        # Games
-        self._migrate_games(league_id, games_folder)
-        
-        # Game quarters
-        self._migrate_game_quarters(league_id, games_folder)
-        
-        # Game player stats
-        self._migrate_game_player_stats(league_id, games_folder)
-        
-        # Game team stats
-        self._migrate_game_team_stats(league_id, games_folder)
-        
-        # Averages
-        self._migrate_player_averages(league_id, league_code, data_folder)
-        self._migrate_team_averages(league_id, league_code, data_folder)
-        self._migrate_opponent_averages(league_id, league_code, data_folder)
-    
-    def _migrate_player_details(self, league_id, league_code, data_folder):
-        """העברת פרטי שחקנים"""
-        file_path = os.path.join(data_folder, f"{league_code}_player_details.csv")
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  📝 Player details...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        players_data = []
-        for _, row in df.iterrows():
-            players_data.append({
-                'player_id': str(row['player_id']),
-                'name': row['Name'],
-                'current_team_id': int(row['team_id']) if pd.notna(row['team_id']) else None,
-                'league_id': int(league_id),
-                'date_of_birth': row['Date Of Birth'] if pd.notna(row['Date Of Birth']) else None,
-                'height': float(row['Height']) if pd.notna(row['Height']) else None,
-                'jersey_number': int(row['Number']) if pd.notna(row['Number']) else None
-            })
-        
-        if players_data:
-            self.uploader.upsert_players(players_data)
-            log_message(f"  ✅ {len(players_data)} players")
-    
-    def _migrate_player_history(self, league_id, league_code, data_folder):
-        """העברת היסטוריית שחקנים"""
-        file_path = os.path.join(data_folder, f"{league_code}_player_history.csv")
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  📚 Player history...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        history_data = []
-        for _, row in df.iterrows():
-            player_id = str(row['player_id'])
-            
-            # Extract seasons from columns
-            for col in df.columns:
-                if col not in ['player_id', 'Name', 'Current Team', 'team_id', 'league_id',
-                               'Date Of Birth', 'Height', 'Number']:
-                    season = col
-                    if pd.notna(row[col]) and str(row[col]).strip():
-                        team_league = str(row[col])
-                        team_name = team_league.split('(')[0].strip() if '(' in team_league else team_league
-                        league_name = team_league.split('(')[1].replace(')', '').strip() if '(' in team_league else ''
-                        
-                        history_data.append({
-                            'player_id': player_id,
-                            'season': season,
-                            'team_name': team_name,
-                            'league_name': league_name,
-                            'league_id': int(league_id)
-                        })
-        
-        if history_data:
-            self.uploader.upsert_player_history(history_data)
-            self.stats['history'] += len(history_data)
-            log_message(f"  ✅ {len(history_data)} history records")
-    
-    def _migrate_games(self, league_id, games_folder):
-        """העברת משחקים"""
-        file_path = os.path.join(games_folder, 'games_schedule.csv')
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  🏆 Games...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        games_data = []
-        for _, row in df.iterrows():
-            games_data.append({
-                'game_id': str(row['gameid']),
-                'league_id': int(league_id),
-                'code': str(row['Code']) if pd.notna(row.get('Code')) else None,
-                'week_day': row.get('Week Day', ''),
-                'date': row['Date'] if pd.notna(row['Date']) else None,
-                'round': str(row['Round']) if pd.notna(row.get('Round')) else None,
-                'time': row.get('Time', ''),
-                'home_team': row['Home Team'],
-                'home_team_code': row.get('Home Team Code', ''),
-                'home_team_id': int(row['home_team_id']) if pd.notna(row.get('home_team_id')) else None,
-                'away_team': row['Away Team'],
-                'away_team_code': row.get('Away Team Code', ''),
-                'away_team_id': int(row['away_team_id']) if pd.notna(row.get('away_team_id')) else None,
-                'venue': row.get('Venue', ''),
-                'home_score': int(row['Home Score']) if pd.notna(row.get('Home Score')) and str(row['Home Score']).replace('.','').isdigit() else None,
-                'away_score': int(row['Away Score']) if pd.notna(row.get('Away Score')) and str(row['Away Score']).replace('.','').isdigit() else None,
-                'arena': row.get('Arena', ''),
-                'status': 'completed' if pd.notna(row.get('Home Score')) and str(row.get('Home Score')).strip() != '' else 'scheduled'
+            active = {lid: cfg for lid, cfg in LEAGUES.items() if cfg.get('active', False)}
+            df = pd.DataFrame({
+                'league_id': [int(lid) for lid in active],
+                'name': [cfg['name'] for cfg in active.values()],
+                'name_en': [cfg.get('name_en', '') for cfg in active.values()],
+                'country': [cfg.get('country', 'Israel') for cfg in active.values()],
+                'season': [cfg.get('season', '') for cfg in active.values()],
+                'url': [cfg['url'] for cfg in active.values()],
+                'is_active': True
             })
-        
-        if games_data:
-            self.uploader.upsert_games(games_data)
-            self.stats['games'] += len(games_data)
-            log_message(f"  ✅ {len(games_data)} games")
-    
-    def _migrate_game_quarters(self, league_id, games_folder):
-        """העברת רבעי משחק"""
-        file_path = os.path.join(games_folder, 'game_quarters.csv')
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  🔢 Quarters...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        quarters_data = df.to_dict('records')
-        
-        if quarters_data:
-            self.uploader.upsert_game_quarters(quarters_data)
-            self.stats['quarters'] += len(quarters_data)
-            log_message(f"  ✅ {len(quarters_data)} quarters")
-    
-    def _migrate_game_player_stats(self, league_id, games_folder):
-        """העברת סטטיסטיקות שחקן במשחק"""
-        file_path = os.path.join(games_folder, 'game_player_stats.csv')
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  📊 Player stats...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        stats_data = df.to_dict('records')
-        
-        if stats_data:
-            self.uploader.upsert_game_player_stats(stats_data)
-            self.stats['player_stats'] += len(stats_data)
-            log_message(f"  ✅ {len(stats_data)} player stats")
-    
-    def _migrate_game_team_stats(self, league_id, games_folder):
-        """העברת סטטיסטיקות קבוצה במשחק"""
-        file_path = os.path.join(games_folder, 'game_team_stats.csv')
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  📈 Team stats...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        stats_data = df.to_dict('records')
-        
-        if stats_data:
-            self.uploader.upsert_game_team_stats(stats_data)
-            self.stats['team_stats'] += len(stats_data)
-            log_message(f"  ✅ {len(stats_data)} team stats")
-    
-    def _migrate_player_averages(self, league_id, league_code, data_folder):
-        """העברת ממוצעי שחקנים"""
-        file_path = os.path.join(data_folder, f"{league_code}_player_averages.csv")
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  📉 Player averages...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        avg_data = df.to_dict('records')
-        
-        if avg_data:
-            self.uploader.upsert_player_averages(avg_data)
-            self.stats['player_averages'] += len(avg_data)
-            log_message(f"  ✅ {len(avg_data)} player averages")
-    
-    def _migrate_team_averages(self, league_id, league_code, data_folder):
-        """העברת ממוצעי קבוצות"""
-        file_path = os.path.join(data_folder, f"{league_code}_team_averages.csv")
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  📊 Team averages...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        avg_data = df.to_dict('records')
-        
-        if avg_data:
-            self.uploader.upsert_team_averages(avg_data)
-            self.stats['team_averages'] += len(avg_data)
-            log_message(f"  ✅ {len(avg_data)} team averages")
-    
-    def _migrate_opponent_averages(self, league_id, league_code, data_folder):
-        """העברת ממוצעי יריבים"""
-        file_path = os.path.join(data_folder, f"{league_code}_opponent_averages.csv")
-        if not os.path.exists(file_path):
-            return
-        
-        log_message(f"  🛡️ Opponent averages...")
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
-        
-        avg_data = df.to_dict('records')
-        
-        if avg_data:
-            self.uploader.upsert_opponent_averages(avg_data)
-            self.stats['opponent_averages'] += len(avg_data)
-            log_message(f"  ✅ {len(avg_data)} opponent averages")
-    
+            return iter([df]), None
+
+        if task['league_id'] is None:
+            log_message(f"⚠️  {os.path.basename(path)} not found, skipping")
+        return None, None
+
+    def _migrate_task(self, task):
+        """
+        העברת קובץ אחד, chunk אחרי chunk, עם נקודת עצירה אחרי כל chunk שעלה
+
+        Returns:
+            bool: הצלחה (קובץ שלא קיים = הצלחה)
+        """
+        kind = task['kind']
+        table, on_conflict = TABLES[kind]
+        league_code = task['league_code']
+        label = kind.replace('_', ' ')
+
+        chunks, signature = self._read_chunks(task)
+        if chunks is None:
+            return True
+
+        done_chunks, finished = self.checkpoint.progress(task['key'], signature)
+        if finished:
+            log_message(f"  ⏭️  {label}: already migrated (checkpoint)", league_code)
+            return True
+        if done_chunks:
+            log_message(f"  ♻️  {label}: skipping {done_chunks} chunks from checkpoint", league_code)
+
+        keys = on_conflict.split(',')
+        transform = TRANSFORMS[kind]
+        uploaded = 0
+        index = 0
+
+        try:
+            for index, chunk in enumerate(chunks):
+                if index < done_chunks:
+                    continue
+
+                frame = transform(chunk, task['league_id'])
+                if frame.empty:
+                    self.checkpoint.update(task['key'], signature, index + 1)
+                    continue
+
+                # Postgres דוחה upsert שמעדכן את אותה שורה פעמיים באותה בקשה - האחרונה קובעת
+                frame = frame.drop_duplicates(subset=keys, keep='last')
+
+                if not self._upload_frame(table, on_conflict, frame):
+                    log_message(f"  ❌ {label}: failed at chunk {index + 1} - will resume from it", league_code)
+                    return False
+
+                uploaded += len(frame)
+                self.checkpoint.update(task['key'], signature, index + 1)
+        except Exception as e:
+            log_message(f"  ❌ {label}: error in chunk {index + 1}: {e}", league_code)
+            return False
+
+        self.checkpoint.update(task['key'], signature, index + 1, done=True)
+
+        stat_key = 'players' if kind == 'player_details' else kind
+        with self._stats_lock:
+            self.stats[stat_key] += uploaded
+        log_message(f"  ✅ {label}: {uploaded:,} rows", league_code)
+        return True
+
+    def _upload_frame(self, table, on_conflict, frame):
+        """upsert של chunk אחרי ניקוי"""
+        if table != 'players':
+            return self.uploader.upsert_rows(table, to_records(frame), on_conflict, self.chunk_size)
+
+        # שחקן בלי current_team_id נשלח בלי העמודה, כדי לא לדרוס קבוצה קיימת ב-null
+        # (בקשה אחת = אותן עמודות בכל השורות, לכן שתי בקשות)
+        has_team = frame['current_team_id'].notna()
+        with_team = to_records(frame[has_team])
+        without_team = to_records(frame[~has_team].drop(columns=['current_team_id']))
+        return all(
+            self.uploader.upsert_rows(table, rows, on_conflict, self.chunk_size)
+            for rows in (with_team, without_team) if rows
+        )
+
     def _print_stats(self):
         """הדפסת סטטיסטיקות"""
         log_message("")
         log_message("="*60)
         log_message("📊 MIGRATION STATISTICS")
         log_message("="*60)
-        
+
         for key, value in self.stats.items():
             if value > 0:
                 log_message(f"  {key.replace('_', ' ').title()}: {value:,}")
-        
+
         total = sum(self.stats.values())
         log_message("")
         log_message(f"  TOTAL RECORDS: {total:,}")
@@ -429,16 +597,19 @@ class DataMigration:
 
 if __name__ == "__main__":
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Migrate CSV data to Supabase')
     parser.add_argument('--league', type=str, help='Specific league ID to migrate')
     parser.add_argument('--all', action='store_true', help='Migrate all active leagues')
     parser.add_argument('--test', action='store_true', help='Test connection only')
-    
+    parser.add_argument('--fresh', action='store_true', help='Ignore the checkpoint and start over')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per CSV chunk / upsert request')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Tables loaded in parallel per stage')
+
     args = parser.parse_args()
-    
-    migrator = DataMigration()
-    
+
+    migrator = DataMigration(chunk_size=args.chunk_size, workers=args.workers, fresh=args.fresh)
+
     if args.test:
         # Test connection
         log_message("🧪 Testing Supabase connection...")
@@ -446,16 +617,17 @@ if __name__ == "__main__":
             log_message("✅ Connection successful!")
         else:
             log_message("❌ Connection failed!")
-    
+
     elif args.all or args.league:
         # Migrate data
         league_ids = [args.league] if args.league else None
         migrator.migrate_all(league_ids)
-    
+
     else:
         # Show help
         parser.print_help()
         print("\nExamples:")
         print("  python migrate_to_supabase.py --test              # Test connection")
         print("  python migrate_to_supabase.py --all               # Migrate all leagues")
-        print("  python migrate_to_supabase.py --league 1          # Migrate league 1 only")
\ No newline at end of file
+        print("  python migrate_to_supabase.py --league 1          # Migrate league 1 only")
+        print("  python migrate_to_supabase.py --all --fresh       # Start over, ignoring the checkpoint")
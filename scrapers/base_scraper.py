@@ -5,10 +5,13 @@ Base Scraper Class
 בסיס משותף לכל ה-scrapers עם פונקציונליות חוזרת
 """
 
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from pathlib import Path
 
-from utils import log_message, ensure_directories
+from config import SCRAPING_CONFIG
+from utils import log_message, ensure_directories, get_soup, fetch_soups
 
 
 class BaseScraper(ABC):
@@ -18,6 +21,7 @@ class BaseScraper(ABC):
     - ניהול תיקיות
     - logging
     - מצבי גזירה (full/quick)
+    - מטמון soup לריצה (עמוד שנדרש בכמה שלבים מורד פעם אחת)
     """
     
     def __init__(self, league_config, league_id, scrape_mode='full'):
@@ -34,6 +38,19 @@ class BaseScraper(ABC):
         self.league_code = league_config['code']
         self.scrape_mode = scrape_mode
         
+        # True = הממוצעים מחושבים בסוף הריצה לכל הליגות יחד (main.scrape_all_leagues)
+        self.defer_averages = False
+        
+        # True = העלאה ל-Supabase גם של שורות שלא השתנו מאז ההעלאה האחרונה (--force-upload)
+        self.force_upload = False
+        
+        # UploadWorker של ההעלאה ל-Supabase ברקע (אם ה-scraper יוצר כזה) - מתרוקן בסוף run()
+        self.upload_worker = None
+        
+        # סיכום ההעלאות של הריצה (מ-UploadWorker.drain) + האם שלבי הגזירה עצמם הצליחו
+        self.upload_report = None
+        self.scrape_succeeded = False
+        
         # נתיבים
         self.data_folder = league_config['data_folder']
         self.games_folder = league_config['games_folder']
@@ -41,6 +58,11 @@ class BaseScraper(ABC):
         # ודא תיקיות
         ensure_directories(league_config)
         
+        # מטמון soup לריצה הנוכחית (LRU חסום)
+        self._soup_cache = OrderedDict()
+        self._soup_cache_size = SCRAPING_CONFIG.get('soup_cache_size', 32)
+        self._soup_cache_lock = threading.Lock()
+        
         # אתחול processors
         self._init_processors()
     
@@ -59,6 +81,84 @@ class BaseScraper(ABC):
         """עדכון משחקים - יוגדר בכל scraper"""
         pass
     
+    def _cached_soup(self, url):
+        with self._soup_cache_lock:
+            soup = self._soup_cache.get(url)
+            if soup is not None:
+                self._soup_cache.move_to_end(url)
+            return soup
+    
+    def _cache_soup(self, url, soup):
+        if soup is None or self._soup_cache_size <= 0:
+            return
+        with self._soup_cache_lock:
+            self._soup_cache[url] = soup
+            self._soup_cache.move_to_end(url)
+            while len(self._soup_cache) > self._soup_cache_size:
+                self._soup_cache.popitem(last=False)
+    
+    def get_soup(self, url):
+        """get_soup דרך מטמון הריצה - עמוד שכבר הורד בריצה הזאת לא מורד שוב"""
+        soup = self._cached_soup(url)
+        if soup is None:
+            soup = get_soup(url)
+            self._cache_soup(url, soup)
+        return soup
+    
+    def fetch_many(self, urls):
+        """
+        הורדת אצווה של עמודים במקביל (מוגבל לפי host), דרך מטמון הריצה
+
+        Args:
+            urls: רשימת כתובות
+
+        Returns:
+            dict: {url: BeautifulSoup או None}
+        """
+        soups = {url: self._cached_soup(url) for url in urls}
+        missing = [url for url, soup in soups.items() if soup is None]
+        
+        for url, soup in fetch_soups(missing).items():
+            self._cache_soup(url, soup)
+            soups[url] = soup
+        return soups
+
+    def _finish_run(self):
+        """hook לסוף ריצה (שמירת מצב לדיסק וכו') - נקרא תמיד, גם בכישלון"""
+        pass
+    
+    def _drain_uploads(self):
+        """
+        המתנה להעלאות הרקע שנשארו בתור + סיכום
+        
+        Returns:
+            bool: True אם כל השורות עלו (או שאין העלאה ברקע)
+        """
+        if self.upload_worker is None:
+            return True
+        
+        worker, self.upload_worker = self.upload_worker, None
+        try:
+            self.log("⏳ Waiting for background uploads...")
+            report = worker.drain()
+        except Exception as e:
+            self.log(f"❌ Failed to drain uploads: {e}")
+            return False
+        
+        self.upload_report = report
+        self.log(
+            f"📤 Supabase uploads: {report['uploaded']} rows in {report['requests']} requests, "
+            f"{report['skipped']} unchanged, {report['failed']} failed "
+            f"({report['upload_seconds']:.1f}s in background)"
+        )
+        if report['failed'] or report['dead_lettered'] or report['worker_errors']:
+            self.log(
+                f"❌ {report['failed']} rows were not uploaded ({report['worker_errors']} worker errors) - "
+                f"{report['dead_lettered']} written to {worker.dead_letter_path} (python main.py --replay-dead-letter)"
+            )
+            return False
+        return True
+    
     def _calculate_averages(self):
         """חישוב ממוצעים - משותף לכולם"""
         from .processors.averages import AveragesCalculator
@@ -69,11 +169,22 @@ class BaseScraper(ABC):
             self.league_id,
             self.league_code,
             self.data_folder,
-            self.games_folder
+            self.games_folder,
+            season=self.league_config.get('season')
         )
         
         return calculator.calculate_all()
     
+    def averages_source(self):
+        """מקור הנתונים לממוצעים של הליגה (לחישוב המשותף לכל הליגות)"""
+        return {
+            'league_id': self.league_id,
+            'league_code': self.league_code,
+            'data_folder': self.data_folder,
+            'games_folder': self.games_folder,
+            'season': self.league_config.get('season')
+        }
+    
     def run(self):
         """הרצת תהליך הגזירה"""
         try:
@@ -89,12 +200,20 @@ class BaseScraper(ABC):
                 self.log("❌ Failed to update player details")
                 return False
             
-            # ✅ STEP 3: חישוב ממוצעים (אם יש)
-            if hasattr(self, '_calculate_averages'):
+            # ✅ STEP 3: חישוב ממוצעים (אם יש, ואם לא נדחה לחישוב המשותף)
+            if hasattr(self, '_calculate_averages') and not self.defer_averages:
                 if not self._calculate_averages():
                     self.log("❌ Failed to calculate averages")
                     return False
             
+            self.scrape_succeeded = True
+            
+            # ✅ STEP 4: העלאות הרקע - הריצה הצליחה רק אם כל השורות הגיעו ל-Supabase
+            if not self._drain_uploads():
+                self.log("=" * 60)
+                self.log("❌ SCRAPING COMPLETED WITH UPLOAD FAILURES")
+                return False
+            
             self.log("=" * 60)
             self.log("✅ SCRAPING COMPLETED SUCCESSFULLY")
             return True
@@ -103,7 +222,15 @@ class BaseScraper(ABC):
             self.log(f"❌ CRITICAL ERROR: {e}")
             import traceback
             self.log(traceback.format_exc())
-            return False    
+            return False
+        
+        finally:
+            # יציאה מוקדמת / חריגה - לא להשאיר thread העלאה פתוח
+            self._drain_uploads()
+            self._finish_run()
+            with self._soup_cache_lock:
+                self._soup_cache.clear()
+    
     def log(self, message, level='info'):
         """helper ל-logging"""
         log_message(message, self.league_code)
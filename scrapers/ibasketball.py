@@ -5,25 +5,33 @@ iBasketball JSON Scraper
 גזירה מ-ibasketball.co.il - שמירה ב-JSON עם קובץ נפרד לכל אובייקט
 """
 
-import requests
 import json
-import time
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime
 
-from utils import log_message, get_soup
+from config import SCRAPING_CONFIG
+from utils import log_message, get_soup, make_soup, bind_log_context
+from utils.fetcher import fetch_url
+from utils.http_session import http_get
+from utils.game_store import GameStore
+from utils.warehouse import get_warehouse
+from utils.db_rows import team_row, player_row, game_row, full_game_rows, history_rows as db_history_rows
 from models import generate_player_id, generate_game_id, normalize_season
 from .base_scraper import BaseScraper
-from .processors import DataNormalizer, StatsCalculator
+from .processors import DataNormalizer, StatsCalculator, PlayerIndex
 
 # 🆕 ייבוא Supabase uploader
 try:
     from utils.supabase_uploader import (
-        upsert_team, upsert_player, upsert_player_history,
-        upsert_game, upsert_game_quarters, upsert_player_stats, upsert_team_stats,
-        get_existing_teams, get_existing_players, game_has_stats
+        BatchWriter, SupabaseSnapshot
     )
+    from utils.upload_ledger import get_upload_ledger
+    from utils.upload_worker import UploadWorker
     SUPABASE_ENABLED = True
 except ImportError:
     SUPABASE_ENABLED = False
@@ -43,6 +51,51 @@ class IBasketballScraper(BaseScraper):
         
         # יצירת מבנה תיקיות JSON
         self._create_json_structure()
+        
+        # אינדקס שחקנים - נטען פעם אחת בריצה, נשמר בסוף
+        self.player_index = PlayerIndex(self.players_folder, self.league_code)
+        
+        # מחסן SQLite מקומי (None אם מבוטל)
+        self.warehouse = get_warehouse()
+        
+        # תורי upsert ל-Supabase - נשלחים בסוף כל שלב, רק שורות שהשתנו (None אם אין Supabase)
+        self.supabase_writer = None
+        if SUPABASE_ENABLED:
+            worker_settings = SCRAPING_CONFIG.get('supabase_worker', {})
+            self.supabase_writer = BatchWriter(
+                log=self.log,
+                ledger=get_upload_ledger(),
+                retries=worker_settings.get('retries', 0),
+                backoff=worker_settings.get('backoff_seconds', 1.0)
+            )
+            # ההעלאה עצמה ב-thread רקע (מתרוקן בסוף run())
+            if worker_settings.get('enabled', False):
+                self.upload_worker = UploadWorker(
+                    self.supabase_writer,
+                    queue_size=worker_settings.get('queue_size', 1000),
+                    dead_letter_path=worker_settings.get('dead_letter', 'logs/supabase_dead_letter.jsonl'),
+                    league=self.league_code,
+                    log=self.log,
+                    wrap=bind_log_context
+                )
+        
+        # מצב הליגה ב-Supabase - נטען בפעם הראשונה שצריך אותו (פעם אחת לריצה)
+        self._supabase_snapshot = None
+        self._supabase_snapshot_loaded = False
+    
+    def _finish_run(self):
+        """שמירת אינדקס השחקנים + דחיסת מאגר המשחקים בסוף הריצה"""
+        try:
+            self.player_index.flush()
+        except Exception as e:
+            self.log(f"⚠️  Failed to save player index: {e}")
+        
+        try:
+            compacted = self.game_store.compact()
+            if compacted:
+                self.log(f"🗜️  Game store compacted: {', '.join(compacted)}")
+        except Exception as e:
+            self.log(f"⚠️  Failed to compact game store: {e}")
     
     def _create_json_structure(self):
         """יצירת מבנה תיקיות למבנה JSON"""
@@ -56,6 +109,12 @@ class IBasketballScraper(BaseScraper):
         self.players_folder.mkdir(parents=True, exist_ok=True)
         self.games_folder.mkdir(parents=True, exist_ok=True)
         
+        # ✅ מאגר משחקים לעונה (טבלאות JSONL + אינדקס) - ייבוא קבצי JSON ישנים פעם אחת
+        self.game_store = GameStore(self.games_folder)
+        imported = self.game_store.import_legacy_json()
+        if imported:
+            self.log(f"   Imported {imported} legacy game files into the game store")
+        
         self.log(f"✅ JSON structure ready")
         self.log(f"   Players: {self.players_folder}")
         self.log(f"   Games: {self.games_folder}")
@@ -74,6 +133,8 @@ class IBasketballScraper(BaseScraper):
         file_path = player_folder / f'{player_id}_details.json'
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(details, f, ensure_ascii=False, indent=2)
+        
+        self.player_index.update_from_details(folder_name, details)
 
     def _save_player_history(self, player_id, folder_name, history_raw):
         """שמור היסטוריה של שחקן - פורמט שטוח לטבלה"""
@@ -197,47 +258,75 @@ class IBasketballScraper(BaseScraper):
     # ============================================
     
     def _save_game(self, game_data):
-        """שמור משחק לקובץ JSON"""
-        game_id = game_data['game_id']
+        """שמור משחק למאגר המשחקים של העונה"""
         game_data['scraped_at'] = datetime.now().isoformat()
-        
-        file_path = self.games_folder / f"{game_id}.json"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(game_data, f, ensure_ascii=False, indent=2)
+        self.game_store.save_game(game_data)
+        self._to_warehouse('upsert_full_game', game_data)
     
     def _load_game(self, game_id):
-        """טען משחק מקובץ"""
-        file_path = self.games_folder / f"{game_id}.json"
-        
-        if not file_path.exists():
-            return None
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-
+        """טען משחק מהמאגר"""
+        return self.game_store.load_game(game_id)
     
     def _game_exists(self, game_id):
-        """בדוק אם משחק קיים עם סטטיסטיקות מלאות"""
-        game_file = self.games_folder / f"{game_id}.json"
-        
-        if not game_file.exists():
-            return False
-        
-        # טען את הקובץ
+        """בדוק אם משחק קיים עם סטטיסטיקות מלאות (חיפוש במניפסט, בלי לקרוא את המשחק)"""
+        # משחק "ריק" לא יכיל player_stats
+        return self.game_store.has_stats(game_id)
+    
+    def _get_supabase_snapshot(self):
+        """קבוצות / שחקנים / משחקים / משחקים עם סטטיסטיקות ב-Supabase (None אם אין Supabase)"""
+        if not self._supabase_snapshot_loaded:
+            self._supabase_snapshot_loaded = True
+            if SUPABASE_ENABLED:
+                try:
+                    self._supabase_snapshot = SupabaseSnapshot(self.league_id)
+                    self.log(f"📥 Supabase snapshot: {self._supabase_snapshot.summary()}")
+                except Exception as e:
+                    self.log(f"⚠️  Failed to load Supabase snapshot: {e}")
+        return self._supabase_snapshot
+    
+    def _to_supabase(self, table, rows):
+        """הוספת שורות לתור של Supabase"""
+        if self.supabase_writer is not None:
+            # flush אוטומטי (תור מלא) יכול לקרות כאן - צריך כבר את force
+            self.supabase_writer.force = self.force_upload
+            if self.upload_worker is not None:
+                self.upload_worker.submit(table, rows)
+            else:
+                self.supabase_writer.add(table, rows)
+    
+    def _queue_game_upload(self, game_data, resend=False):
+        """
+        כל שורות המשחק לתורי Supabase
+        
+        Args:
+            resend: למחוק קודם מיומן ההעלאות (המשחק חסר ב-Supabase למרות שנרשם כהועלה)
+        """
+        ledger = self.supabase_writer.ledger
+        for table, rows in full_game_rows(game_data).items():
+            if resend and ledger is not None:
+                ledger.forget(table, rows)
+            self._to_supabase(table, rows)
+    
+    def _flush_supabase(self, stage):
+        """שליחת התורים ל-Supabase בסוף שלב"""
+        if self.supabase_writer is None:
+            return
+        self.supabase_writer.force = self.force_upload
+        if self.upload_worker is not None:
+            self.upload_worker.flush(stage)
+            return
+        uploaded, skipped, requests, errors = self.supabase_writer.flush()
+        status = f", {len(errors)} failed batches" if errors else ""
+        self.log(f"📤 Supabase ({stage}): {uploaded} rows in {requests} requests, {skipped} unchanged{status}")
+    
+    def _to_warehouse(self, method, *args):
+        """כתיבה למחסן המקומי - כישלון לא עוצר את הגזירה"""
+        if self.warehouse is None:
+            return
         try:
-            with open(game_file, 'r', encoding='utf-8') as f:
-                game_data = json.load(f)
-            
-            # בדוק אם יש סטטיסטיקות שחקנים
-            # משחק "ריק" לא יכיל player_stats
-            has_stats = 'player_stats' in game_data and len(game_data.get('player_stats', [])) > 0
-            
-            return has_stats
-            
+            getattr(self.warehouse, method)(*args)
         except Exception as e:
-            self.log(f"   ⚠️  Error reading {game_id}: {e}")
-            return False
+            self.log(f"   ⚠️  Warehouse {method} failed: {e}")
     
     
     
@@ -264,105 +353,139 @@ class IBasketballScraper(BaseScraper):
         
         if self.scrape_mode == 'quick':
             self.log("Loading existing data from Supabase...")
-            existing_teams = get_existing_teams(self.league_id)
-            existing_players = get_existing_players(self.league_id)
+            snapshot = self._get_supabase_snapshot()
+            if snapshot:
+                existing_teams = snapshot.teams
+                existing_players = snapshot.players
             self.log(f"  Found {len(existing_teams)} existing teams")
             self.log(f"  Found {len(existing_players)} existing players")
         
-        # שלב 3: לולאה על כל קבוצה
+        # שלב 3: הורדת כל עמודי הקבוצות במקביל (עמוד אחד לפרטים + שחקנים)
+        team_soups = self.fetch_many([team['team_url'] for team in teams])
+        
         total_new_teams = 0
         total_updated_teams = 0
         total_new_players = 0
         total_updated_players = 0
         
-        for i, team in enumerate(teams, 1):
-            self.log(f"\n[{i}/{len(teams)}] Processing: {team['team_name']} (ID={team['team_id']})")
-                        
-            # גזירת פרטי קבוצה (תמיד!)
-            self.log("  → Fetching team details...")
-            team_details = self._scrape_team_details(team['team_url'])
-            team.update(team_details)
-            
-            # בדוק אם הקבוצה קיימת
-            team_exists = team['team_id'] in existing_teams
-            
-            # שמירה ל-Supabase
-            if upsert_team(team):
+        # שלב 4: לולאה על כל קבוצה - שחקנים לגזירה נשלחים מיד ל-pool
+        crawl_workers = max(1, SCRAPING_CONFIG.get('crawl_workers', 4))
+        executor = ThreadPoolExecutor(max_workers=crawl_workers, thread_name_prefix='player-crawl')
+        scrape_player = bind_log_context(self._scrape_player_pages)
+        team_jobs = []
+        
+        try:
+            for i, team in enumerate(teams, 1):
+                self.log(f"\n[{i}/{len(teams)}] Processing: {team['team_name']} (ID={team['team_id']})")
+                team_soup = team_soups.get(team['team_url'])
+                
+                # גזירת פרטי קבוצה (תמיד!)
+                self.log("  → Fetching team details...")
+                team_details = self._scrape_team_details(team['team_url'], soup=team_soup)
+                team.update(team_details)
+                
+                # בדוק אם הקבוצה קיימת
+                team_exists = team['team_id'] in existing_teams
+                
+                self._to_warehouse('upsert_teams', [team])
+                
+                # תור ל-Supabase (נשלח בסוף השלב)
+                self._to_supabase('teams', [team_row(team)])
                 if team_exists:
                     total_updated_teams += 1
                     self.log(f"  ✅ Team updated")
                 else:
                     total_new_teams += 1
                     self.log(f"  ✅ Team created")
-            
-                    
-            # גזירת שחקנים
-            self.log("  → Fetching players...")
-            players = self._scrape_team_players(team['team_url'], team['team_id'])
-            
-            if not players:
-                self.log(f"  ⚠️  No players found")
-                continue
-            
-            self.log(f"  Found {len(players)} players")
-            
-            # לולאה על שחקנים
-            for j, player in enumerate(players, 1):
-                player_name = player['name']
                 
-                self.log(f"    [{j}/{len(players)}] {player_name}")
-                                
-                # בדוק אם השחקן קיים
-                player_key = f"{player_name}_{team['team_id']}"
-                player_exists = player_key in existing_players
+                # גזירת שחקנים
+                self.log("  → Fetching players...")
+                players = self._scrape_team_players(team['team_url'], team['team_id'], soup=team_soup)
                 
-                # במצב quick - דלג רק אם יש כבר גובה ותאריך לידה
-                if player_exists and self.scrape_mode == 'quick':
-                    existing_player = existing_players[player_key]
-                    if existing_player.get('height') and existing_player.get('date_of_birth'):
-                        self.log(f"      ⏭️  Complete data (quick mode)")
-                        total_updated_players += 1
-                        continue
-                    else:
-                        self.log(f"      ⚙️  Missing data - updating...")           
-
+                if not players:
+                    self.log(f"  ⚠️  No players found")
+                    continue
                 
-                # גזירת פרטי שחקן
-                try:
-                    player_details = self._scrape_player_details(player['player_url'])
-                    player.update(player_details)
+                self.log(f"  Found {len(players)} players")
+                
+                jobs = []
+                for player in players:
+                    player_name = player['name']
                     
-                    # יצירת player_id אמיתי
-                    from models import generate_player_id
-                    dob = player.get('date_of_birth', '')
-                    real_player_id = generate_player_id(player_name, dob, self.league_id)
-                    player['player_id'] = real_player_id
+                    # בדוק אם השחקן קיים
+                    player_key = f"{player_name}_{team['team_id']}"
+                    player_exists = player_key in existing_players
                     
-                    # גזירת היסטוריה
-                    history = self._scrape_player_history(player['player_url'])
+                    # במצב quick - דלג רק אם יש כבר גובה ותאריך לידה
+                    if player_exists and self.scrape_mode == 'quick':
+                        existing_player = existing_players[player_key]
+                        if existing_player.get('height') and existing_player.get('date_of_birth'):
+                            self.log(f"    ⏭️  {player_name}: complete data (quick mode)")
+                            total_updated_players += 1
+                            continue
+                        else:
+                            self.log(f"    ⚙️  {player_name}: missing data - updating...")
                     
-                    # המרת היסטוריה לפורמט Supabase
-                    history_rows = []
-                    for season, entries in history.items():
-                        for entry in entries:
-                            league_name = entry.get('league', '')
-                            # סינון קט סל
-                            if any(x in league_name for x in ['קט סל', 'קט-סל', 'ילדות', 'ילדים', 'קטסל']):
-                                continue
-                            
-                            history_rows.append({
-                                'player_id': real_player_id,
-                                'season': season,
-                                'team_name': entry.get('team', ''),
-                                'league_name': league_name,
-                                'league_id': self.league_id
-                            })
+                    future = executor.submit(scrape_player, player['player_url'])
+                    jobs.append((player, player_exists, future))
+                
+                team_jobs.append((team, jobs))
+            
+            # שלב 5: שמירת השחקנים לפי הסדר, כשהעמודים שלהם מוכנים
+            for team, jobs in team_jobs:
+                if not jobs:
+                    continue
+                
+                self.log(f"\n{team['team_name']}: saving {len(jobs)} players")
+                
+                for j, (player, player_exists, future) in enumerate(jobs, 1):
+                    player_name = player['name']
+                    self.log(f"    [{j}/{len(jobs)}] {player_name}")
                     
-                    # שמירה ל-Supabase
-                    if upsert_player(player):
-                        # שמירת היסטוריה
+                    try:
+                        player_details, history = future.result()
+                        player.update(player_details)
+                        
+                        # יצירת player_id אמיתי
+                        from models import generate_player_id
+                        dob = player.get('date_of_birth', '')
+                        real_player_id = generate_player_id(player_name, dob, self.league_id)
+                        player['player_id'] = real_player_id
+                        
+                        # המרת היסטוריה לפורמט Supabase
+                        history_rows = []
+                        for season, entries in history.items():
+                            for entry in entries:
+                                league_name = entry.get('league', '')
+                                # סינון קט סל
+                                if any(x in league_name for x in ['קט סל', 'קט-סל', 'ילדות', 'ילדים', 'קטסל']):
+                                    continue
+                                
+                                history_rows.append({
+                                    'player_id': real_player_id,
+                                    'season': season,
+                                    'team_name': entry.get('team', ''),
+                                    'league_name': league_name,
+                                    'league_id': self.league_id
+                                })
+                        
+                        self._to_warehouse('upsert_players', [player])
                         if history_rows:
-                            upsert_player_history(history_rows)
+                            self._to_warehouse('upsert_player_history', history_rows)
+                        
+                        # תור ל-Supabase (שחקן + היסטוריה, נשלח בסוף השלב)
+                        self._to_supabase('players', [player_row(player)])
+                        self._to_supabase('player_season_history', db_history_rows(history_rows))
+                        
+                        # עדכון אינדקס השחקנים בזיכרון
+                        self.player_index.update(
+                            player_name,
+                            player_id=real_player_id,
+                            current_team_id=team['team_id'],
+                            date_of_birth=player.get('date_of_birth'),
+                            jersey_number=player.get('jersey_number'),
+                            height=player.get('height')
+                        )
                         
                         if player_exists:
                             total_updated_players += 1
@@ -370,13 +493,12 @@ class IBasketballScraper(BaseScraper):
                         else:
                             total_new_players += 1
                             self.log(f"      ✅ Created")
-                    
-                except Exception as e:
-                    self.log(f"      ❌ Error: {e}")
-                
-                time.sleep(1)
-            
-            time.sleep(1)
+                        
+                    except Exception as e:
+                        self.log(f"      ❌ Error: {e}")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._flush_supabase('teams & players')
         
         self.log(f"\n{'='*60}")
         self.log(f"STEP 1 COMPLETED")
@@ -393,7 +515,7 @@ class IBasketballScraper(BaseScraper):
     
     def _scrape_teams_from_league(self):
         """גזירת רשימת קבוצות מעמוד הליגה"""
-        soup = get_soup(self.league_config['url'])
+        soup = self.get_soup(self.league_config['url'])
         if not soup:
             return []
         
@@ -433,9 +555,10 @@ class IBasketballScraper(BaseScraper):
         
         return teams
     
-    def _scrape_team_details(self, team_url):
-        """גזירת פרטים נוספים על קבוצה"""
-        soup = get_soup(team_url)
+    def _scrape_team_details(self, team_url, soup=None):
+        """גזירת פרטים נוספים על קבוצה (soup = עמוד הקבוצה אם כבר הורד)"""
+        if soup is None:
+            soup = self.get_soup(team_url)
         if not soup:
             return {}
         
@@ -471,9 +594,10 @@ class IBasketballScraper(BaseScraper):
         
         return details
     
-    def _scrape_team_players(self, team_url, team_id):
-        """גזירת שחקנים מעמוד קבוצה"""
-        soup = get_soup(team_url)
+    def _scrape_team_players(self, team_url, team_id, soup=None):
+        """גזירת שחקנים מעמוד קבוצה (soup = עמוד הקבוצה אם כבר הורד)"""
+        if soup is None:
+            soup = self.get_soup(team_url)
         if not soup:
             return []
         
@@ -538,78 +662,18 @@ class IBasketballScraper(BaseScraper):
 
 
     def _create_player_index(self):
-        """יצירת קובץ אינדקס לכל שחקני הליגה"""
-        self.log("Creating player index...")
-        
-        index = {}
-        
-        if not self.players_folder.exists():
-            self.log("   ⚠️  Players folder doesn't exist")
-            return
-        
-        player_count = 0
-        
-        for player_folder in self.players_folder.iterdir():
-            if not player_folder.is_dir():
-                continue
-            
-            # טען פרטים
-            details_files = list(player_folder.glob('*_details.json'))
-            if not details_files:
-                continue
-            
-            try:
-                with open(details_files[0], 'r', encoding='utf-8') as f:
-                    details = json.load(f)
-                
-                player_name = details.get('name', '')
-                if not player_name:
-                    continue
-                
-                # הוסף לאינדקס
-                index[player_name] = {
-                    'player_id': details.get('player_id', ''),
-                    'folder_name': player_folder.name,
-                    'current_team_id': details.get('current_team_id', ''),
-                    'date_of_birth': details.get('date_of_birth', ''),
-                    'jersey_number': details.get('jersey_number', ''),
-                    'height': details.get('height', '')
-                }
-                
-                player_count += 1
-                
-            except Exception as e:
-                self.log(f"   ⚠️  Error reading {player_folder.name}: {e}")
-                continue
-        
-        # שמירת אינדקס
-        index_path = self.players_folder / 'index.json'
-        with open(index_path, 'w', encoding='utf-8') as f:
-            json.dump(index, f, ensure_ascii=False, indent=2)
-        
-        self.log(f"✅ Player index created: {player_count} players")
-        self.log(f"   📄 {index_path}")
-    
+        """בנייה מחדש של אינדקס השחקנים ושמירה לדיסק"""
+        self.player_index.rebuild()
+        self.player_index.flush()
     
     def _load_player_index(self):
-        """טען קובץ אינדקס של שחקנים"""
-        index_path = self.players_folder / 'index.json'
-        
-        if not index_path.exists():
-            self.log("   ⚠️  Player index not found, creating...")
-            self._create_player_index()
-        
-        try:
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            self.log(f"   ❌ Error loading player index: {e}")
-            return {}
+        """אינדקס השחקנים כ-dict {name: entry} (נטען פעם אחת בריצה)"""
+        return self.player_index.to_dict()
     
         
     def _scrape_player_list(self):
         """גזירת רשימת שחקנים מדף הליגה"""
-        soup = get_soup(self.league_config['url'])
+        soup = self.get_soup(self.league_config['url'])
         if not soup:
             return []
         
@@ -622,9 +686,24 @@ class IBasketballScraper(BaseScraper):
         
         return players
         
-    def _scrape_player_details(self, player_url):
-        """גזירת פרטי שחקן מעמוד השחקן"""
+    def _scrape_player_pages(self, player_url):
+        """
+        פרטי שחקן + היסטוריה מהורדה ופרסור אחד של עמוד השחקן
+        (רץ ב-thread של ה-crawl)
+        
+        Returns:
+            (details, history)
+        """
         soup = get_soup(player_url)
+        return (
+            self._scrape_player_details(player_url, soup=soup),
+            self._scrape_player_history(player_url, soup=soup)
+        )
+    
+    def _scrape_player_details(self, player_url, soup=None):
+        """גזירת פרטי שחקן מעמוד השחקן (soup = העמוד אם כבר הורד)"""
+        if soup is None:
+            soup = get_soup(player_url)
         if not soup:
             return {"date_of_birth": None, "height": None, "jersey_number": None}
         
@@ -668,9 +747,10 @@ class IBasketballScraper(BaseScraper):
             "height": height_value,
             "jersey_number": number
         }    
-    def _scrape_player_history(self, player_url):
-        """גזירת היסטוריית קבוצות"""
-        soup = get_soup(player_url)
+    def _scrape_player_history(self, player_url, soup=None):
+        """גזירת היסטוריית קבוצות (soup = עמוד השחקן אם כבר הורד)"""
+        if soup is None:
+            soup = get_soup(player_url)
         if not soup:
             return {}
         
@@ -799,37 +879,31 @@ class IBasketballScraper(BaseScraper):
             json.dump(schedule_data, f, ensure_ascii=False, indent=2)
         
         self.log(f"✅ Full schedule saved: {len(schedule_data)} games")
+        self._to_warehouse('upsert_schedule', schedule_data)
         
-        # 🆕 העלאה ל-Supabase
-        if SUPABASE_ENABLED:
-            try:
-                from utils.supabase_uploader import upsert_game
-                uploaded = 0
-                skipped = 0
-                
-                for game in schedule_data:
-                    try:
-                        if upsert_game(game):
-                            uploaded += 1
-                        else:
-                            skipped += 1
-                    except Exception as e:
-                        self.log(f"   ⚠️  Failed to upload {game['game_id']}: {e}")
-                        skipped += 1
-                
-                self.log(f"📤 Supabase: {uploaded} uploaded, {skipped} skipped")
-                
-            except Exception as e:
-                self.log(f"⚠️  Supabase schedule upload failed: {e}")    
+        # 🆕 העלאה ל-Supabase - כל הלו"ז בבקשות מרוכזות
+        try:
+            self._to_supabase('games', [game_row(game) for game in schedule_data])
+            self._flush_supabase('schedule')
+        except Exception as e:
+            self.log(f"⚠️  Supabase schedule upload failed: {e}")
 
     
     def _scrape_all_games(self, games_df):
-        """גזירת משחקים - רק עם תוצאה"""
+        """
+        גזירת משחקים - רק עם תוצאה
+        pipeline: הורדה (pool) -> פרסור (pool) -> כתיבה/העלאה (ה-thread הנוכחי בלבד)
+        """
         import pandas as pd
         
         games_scraped = 0
         games_skipped = 0
         corrected_scores = []
+        jobs = []
+        
+        # משחקים שקיימים מקומית אבל חסרים ב-Supabase (העלאה קודמת נכשלה) - נשלחים שוב מהמאגר
+        snapshot = self._get_supabase_snapshot() if self.supabase_writer is not None else None
+        missing_remote = []
         
         for idx, row in games_df.iterrows():
             # דלג אם אין תוצאה
@@ -841,27 +915,49 @@ class IBasketballScraper(BaseScraper):
                 continue
             
             game_code = str(row['Code'])
-            game_url = f"https://ibasketball.co.il/match/{game_code}/"
             game_id = f"{self.league_id}_{game_code}"
             
             # בדוק אם המשחק קיים עם סטטיסטיקות
             if self._game_exists(game_id):
                 games_skipped += 1
+                if snapshot is not None and not snapshot.game_has_stats(game_id):
+                    missing_remote.append(game_id)
                 continue
             
-            self.log(f"   [{idx+1}/{len(games_df)}] Scraping game: {game_id}")
-            
-            # גזור את המשחק
-            game_data = self._scrape_single_game(game_id, game_url, row)
-            
-            if game_data:
+            jobs.append({
+                'idx': idx,
+                'row': row,
+                'game_id': game_id,
+                'game_url': f"https://ibasketball.co.il/match/{game_code}/"
+            })
+        
+        if missing_remote:
+            self.log(f"   📤 Re-sending {len(missing_remote)} stored games missing from Supabase")
+            for game_id in missing_remote:
+                game_data = self._load_game(game_id)
+                if game_data:
+                    self._queue_game_upload(game_data, resend=True)
+        
+        if jobs:
+            self.log(f"   Scraping {len(jobs)} games...")
+        
+        # closing: חריגה בלולאה סוגרת את ה-pipeline מיד (ה-threads נעצרים ולא נתקעים על תור מלא)
+        with closing(self._iter_scraped_games(jobs)) as scraped_games:
+            for done, (job, game_data) in enumerate(scraped_games, 1):
+                idx, row, game_id = job['idx'], job['row'], job['game_id']
+                
+                if not game_data:
+                    self.log(f"   [{done}/{len(jobs)}] ❌ Failed: {game_id}")
+                    continue
+                
+                self.log(f"   [{done}/{len(jobs)}] Scraped game: {game_id}")
                 self._save_game(game_data)
                 games_scraped += 1
                 
-                # 🆕 דחיפה ל-Supabase
-                if SUPABASE_ENABLED:
+                # 🆕 דחיפה ל-Supabase (תור; נשלח כשמתמלא ובסוף השלב)
+                if self.supabase_writer is not None:
                     try:
-                        upload_full_game(game_data)
+                        self._queue_game_upload(game_data)
                     except Exception as e:
                         self.log(f"   ⚠️  Supabase upload failed: {e}")
                 
@@ -881,8 +977,6 @@ class IBasketballScraper(BaseScraper):
                     # ✅ עדכן את ה-DataFrame
                     games_df.at[idx, 'Home Score'] = real_home
                     games_df.at[idx, 'Away Score'] = real_away
-            
-            time.sleep(1)
                 
         # ✅ הצג תיקונים
         if corrected_scores:
@@ -890,14 +984,125 @@ class IBasketballScraper(BaseScraper):
             for correction in corrected_scores:
                 self.log(f"   {correction['game_id']}: {correction['xls_score']} → {correction['real_score']}")
         
+        self._flush_supabase('games')
         self.log(f"✅ Games updated: {games_scraped} scraped, {games_skipped} skipped")
         return True
     
+    def _iter_scraped_games(self, jobs):
+        """
+        pipeline גזירת משחקים: fetchers -> תור חסום -> parsers -> תור חסום -> הקורא
+        
+        Args:
+            jobs: רשימת {'idx', 'row', 'game_id', 'game_url'}
+        
+        Yields:
+            (job, game_data או None) - לפי סדר הסיום
+        
+        אם הקורא מפסיק באמצע (חריגה / close()) - stop מסומן, התורים מתרוקנים
+        וה-threads יוצאים לפני שהפונקציה חוזרת
+        """
+        if not jobs:
+            return
+        
+        fetch_workers = max(1, SCRAPING_CONFIG.get('game_fetch_workers', 4))
+        parse_workers = max(1, SCRAPING_CONFIG.get('game_parse_workers', 2))
+        queue_size = max(1, SCRAPING_CONFIG.get('pipeline_queue_size', 16))
+        
+        job_queue = queue.Queue()
+        parse_queue = queue.Queue(maxsize=queue_size)
+        write_queue = queue.Queue(maxsize=queue_size)
+        done = object()
+        stop = threading.Event()
+        
+        for job in jobs:
+            job_queue.put(job)
+        
+        def put(target_queue, item):
+            """put שלא נתקע לנצח: מוותר כשה-pipeline נעצר"""
+            while not stop.is_set():
+                try:
+                    target_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def fetcher():
+            while not stop.is_set():
+                try:
+                    job = job_queue.get_nowait()
+                except queue.Empty:
+                    return
+                if not put(parse_queue, (job, fetch_url(job['game_url']))):
+                    return
+        
+        def parser():
+            while not stop.is_set():
+                try:
+                    item = parse_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is done:
+                    return
+                job, content = item
+                game_data = None
+                soup = make_soup(content, job['game_url'])
+                if soup is not None:
+                    try:
+                        game_data = self._scrape_single_game(
+                            job['game_id'], job['game_url'], job['row'], soup=soup
+                        )
+                    except Exception as e:
+                        self.log(f"   ❌ Error parsing game {job['game_id']}: {e}")
+                if not put(write_queue, (job, game_data)):
+                    return
+        
+        def start(target, count, name):
+            threads = [
+                threading.Thread(target=bind_log_context(target), name=f"{name}-{i}", daemon=True)
+                for i in range(count)
+            ]
+            for thread in threads:
+                thread.start()
+            return threads
+        
+        def supervisor():
+            # סגירת השלבים לפי הסדר: כשה-fetchers סיימו -> עצירת parsers -> סוף התור
+            for thread in fetchers:
+                thread.join()
+            for _ in parsers:
+                put(parse_queue, done)
+            for thread in parsers:
+                thread.join()
+            put(write_queue, done)
+        
+        fetchers = start(fetcher, min(fetch_workers, len(jobs)), 'game-fetch')
+        parsers = start(parser, parse_workers, 'game-parse')
+        pipeline = threading.Thread(target=supervisor, name='game-pipeline', daemon=True)
+        pipeline.start()
+        
+        try:
+            while True:
+                item = write_queue.get()
+                if item is done:
+                    return
+                yield item
+        finally:
+            # עצירה + ריקון התורים, כדי ש-thread שממתין על תור מלא ישתחרר מיד
+            stop.set()
+            for pending in (job_queue, parse_queue, write_queue):
+                while True:
+                    try:
+                        pending.get_nowait()
+                    except queue.Empty:
+                        break
+            pipeline.join()
+    
     
     def _download_games_schedule(self):
         """הורדת לוח משחקים מהאתר"""
         league_url = self.league_config['url']
-        soup = get_soup(league_url)
+        soup = self.get_soup(league_url)
         if not soup:
             return None
         
@@ -922,7 +1127,7 @@ class IBasketballScraper(BaseScraper):
             import os
             from pathlib import Path
             
-            response = requests.get(export_url, timeout=30)
+            response = http_get(export_url, timeout=30)
             response.raise_for_status()
             
             # ✅ שמור קובץ זמני
@@ -969,22 +1174,16 @@ class IBasketballScraper(BaseScraper):
         # ✅ הדפסת עמודות אחרי שינוי שם
         self.log(f"   After rename: {list(games_df.columns)}")
         
-        # נרמול בית
-        if 'Home Team' in games_df.columns:
-            games_df['Home Team'] = games_df['Home Team'].apply(
-                lambda x: self.normalizer.normalize_team_name(x)['club_name'] if pd.notna(x) else x
-            )
-        
-        # נרמול אורח
-        if 'Away Team' in games_df.columns:
-            games_df['Away Team'] = games_df['Away Team'].apply(
-                lambda x: self.normalizer.normalize_team_name(x)['club_name'] if pd.notna(x) else x
-            )
+        # נרמול בית / אורח - פעם אחת לכל קבוצה, לא לכל שורה
+        for col in ['Home Team', 'Away Team']:
+            if col in games_df.columns:
+                games_df[col] = self.normalizer.map_unique(games_df[col], self.normalizer.normalize_team_club_name)
         
+        self.log(f"   {self.normalizer.cache_stats()}")
         return games_df                
         
-    def _scrape_single_game(self, game_id, game_url, schedule_row):
-        """גזירת משחק בודד"""
+    def _scrape_single_game(self, game_id, game_url, schedule_row, soup=None):
+        """גזירת משחק בודד (soup = עמוד שכבר הורד, אחרת מורידים כאן)"""
         import pandas as pd
         from datetime import datetime
         
@@ -992,7 +1191,8 @@ class IBasketballScraper(BaseScraper):
         game_code = game_id.split('_')[-1]
         game_url = f"https://ibasketball.co.il/match/{game_code}/"
         
-        soup = get_soup(game_url)
+        if soup is None:
+            soup = get_soup(game_url)
         if not soup:
             return None
         
@@ -1003,6 +1203,7 @@ class IBasketballScraper(BaseScraper):
         game_round = schedule_row.get('Round', '')
         game_venue = schedule_row.get('Arena', '')
         
+        self.normalizer.refresh_team_mapping()
         home_team_info = self.normalizer.normalize_team_name(home_team)
         away_team_info = self.normalizer.normalize_team_name(away_team)
         
@@ -1251,16 +1452,13 @@ class IBasketballScraper(BaseScraper):
             self.log(f"   ❌ Error parsing quarters: {e}")
             import traceback
             self.log(traceback.format_exc())
-            return quarters_data, final_scoresדןנ
+            return quarters_data, final_scores
             
     def _scrape_player_stats(self, soup, game_id, game_date):
         """גזירת סטטיסטיקות שחקנים"""
         player_stats = []
         
         try:
-            # טען אינדקס
-            player_index = self._load_player_index()
-            
             performance_sections = soup.find_all('div', class_='sp-template-event-performance-values')
             
             for section in performance_sections:
@@ -1329,8 +1527,10 @@ class IBasketballScraper(BaseScraper):
                             
                             # יצירת player_id מהאינדקס
                             player_name = player_data['player_name']
-                            if player_name in player_index:
-                                player_data['player_id'] = player_index[player_name]['player_id']
+                            index_entry = (self.player_index.get_by_name_team(player_name, team_id)
+                                           or self.player_index.get(player_name))
+                            if index_entry:
+                                player_data['player_id'] = index_entry['player_id']
                             else:
                                 player_data['player_id'] = generate_player_id(player_name, '', self.league_id)
                                 self.log(f"      ⚠️  Player not in index: {player_name}")
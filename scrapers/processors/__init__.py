@@ -6,10 +6,15 @@ Processors Package
 
 from .normalizer import DataNormalizer
 from .stats_calculator import StatsCalculator
-from .averages import AveragesCalculator
+from .averages import AveragesCalculator, calculate_leagues_averages
+from .running_averages import RunningAverages
+from .player_index import PlayerIndex
 
 __all__ = [
     'DataNormalizer',
     'StatsCalculator',
-    'AveragesCalculator'
+    'AveragesCalculator',
+    'calculate_leagues_averages',
+    'RunningAverages',
+    'PlayerIndex'
 ]
@@ -4,108 +4,213 @@ Averages Calculator - FIXED
 ============================
 חישוב ממוצעי שחקנים, קבוצות ויריבים
 תוקן: משתמש ב-team_id מהמיפוי (לא מהנתונים הקיימים)
+
+כל החישובים מקובצים לפי league_id, כך שאותו קוד מחשב ליגה אחת (calculate_all)
+או כמה ליגות במעבר אחד (calculate_leagues_averages)
 """
 
 import os
+import numpy as np
 import pandas as pd
 
+from config import SCRAPING_CONFIG, DATA_ROOT
 from utils import log_message, load_global_team_mapping, normalize_team_name_global
+from utils.game_store import GameStore
+from utils.warehouse import get_warehouse
 from .stats_calculator import StatsCalculator
+from .running_averages import RunningAverages, group_sums, totals_to_frame
 
 
 class AveragesCalculator:
     """מחלקה לחישוב ממוצעים"""
     
-    def __init__(self, league_id, league_code, data_folder, games_folder):
+    def __init__(self, league_id, league_code, data_folder, games_folder, season=None, team_mapping=None):
         """
         Args:
             league_id: מזהה ליגה מספרי
             league_code: קוד ליגה
             data_folder: תיקיית נתונים ראשית
             games_folder: תיקיית משחקים
+            season: עונה (לסינון במחסן המקומי)
+            team_mapping: מיפוי קבוצות שכבר נטען (None = טעינה)
         """
         self.league_id = league_id
         self.league_code = league_code
         self.data_folder = data_folder
         self.games_folder = games_folder
+        self.season = season
         
         # טעינת מיפוי קבוצות
-        self.team_mapping = load_global_team_mapping()
+        self.team_mapping = team_mapping if team_mapping is not None else load_global_team_mapping()
+        self._team_ids = None
     
-    def _get_team_id(self, team_name):
+    def _team_id_map(self):
         """
-        קבלת team_id נכון מהמיפוי
-        ⭐ מחפש רק בליגה הרלוונטית!
-        
-        Args:
-            team_name: שם הקבוצה המנורמל
+        מיפוי (שם קבוצה, league_id) -> team_id (נבנה פעם אחת)
         
         Returns:
-            int: team_id מהמיפוי (רק מהליגה הנכונה)
+            pd.Series: index = (שם/וריאציה, league_id), values = team_id
+        """
+        if self._team_ids is None:
+            keys = list(self.team_mapping)
+            self._team_ids = pd.Series(
+                [self.team_mapping[key]['team_id'] for key in keys],
+                index=pd.MultiIndex.from_tuples(keys) if keys else None,
+                dtype=object
+            )
+        return self._team_ids
+    
+    def _with_league(self, df):
+        """עמודת league_id (אם חסרה) - כל הקיבוצים והדירוגים הם לפי ליגה"""
+        if 'league_id' not in df.columns:
+            df['league_id'] = int(self.league_id)
+        return df
+    
+    def _attach_team_ids(self, df):
+        """
+        הוספת team_id מהמיפוי לפי (team, league_id) - join אחד במקום apply לכל שורה
+        ⭐ מחפש רק בליגה של השורה!
+        
+        Args:
+            df: DataFrame עם עמודת team
         """
         if not self.team_mapping:
             log_message("⚠️  No team mapping available", self.league_code)
-            return None
+            df['team_id'] = None
+            return df
         
-        league_id_int = int(self.league_id)
+        df = self._with_league(df)
+        team_ids = self._team_id_map()
+        teams = df['team'].astype(str)
+        leagues = df['league_id'].astype(int)
         
-        # ⭐ חיפוש עם מפתח מורכב: (team_name, league_id)
-        key = (team_name, league_id_int)
-        if key in self.team_mapping:
-            return self.team_mapping[key]['team_id']
+        def lookup(names):
+            keys = pd.MultiIndex.from_arrays([names, leagues])
+            return pd.Series(team_ids.reindex(keys).to_numpy(), index=df.index, dtype=object)
         
-        # נסיון עם strip
-        key_stripped = (team_name.strip(), league_id_int)
-        if key_stripped in self.team_mapping:
-            return self.team_mapping[key_stripped]['team_id']
+        ids = lookup(teams)
         
-        log_message(f"   ⚠️  No team_id found for: {team_name} in league {self.league_id}", self.league_code)
-        return None
+        # נסיון עם strip
+        missing = ids.isna()
+        if missing.any():
+            ids[missing] = lookup(teams.str.strip())[missing]
+        
+        # שמות שלא נמצאו כמו שהם - דרך אינדקס הזיהוי, פעם אחת לכל שם (כולל log על מה שלא זוהה)
+        missing = ids.isna()
+        unmatched = pd.DataFrame({'team': teams, 'league_id': leagues})[missing].drop_duplicates()
+        resolved = {}
+        for team_name, league_id in unmatched.itertuples(index=False):
+            team_id = normalize_team_name_global(team_name, league_id, self.team_mapping)['team_id']
+            if team_id is not None:
+                resolved[(team_name, league_id)] = team_id
+        if resolved:
+            ids[missing] = [resolved.get(key) for key in zip(teams[missing], leagues[missing])]
+        
+        df['team_id'] = ids.infer_objects()
+        return df
     
-    def calculate_all(self):
-        """חישוב כל הממוצעים"""
+    def _load_stats(self):
+        """
+        טעינת סטטיסטיקות: קבצי CSV אם יש, אחרת המחסן המקומי, אחרת מאגר המשחקים של העונה
         
-        # טעינת קבצי stats
+        Returns:
+            (player_df, team_df) או (None, None)
+        """
         player_stats_file = os.path.join(self.games_folder, "game_player_stats.csv")
         team_stats_file = os.path.join(self.games_folder, "game_team_stats.csv")
         
+        warehouse = None if os.path.exists(player_stats_file) else get_warehouse()
+        if warehouse is not None:
+            try:
+                player_df, team_df = warehouse.game_stats_frames(self.league_id, self.season)
+                if not player_df.empty and not team_df.empty:
+                    return player_df, team_df
+            except Exception as e:
+                log_message(f"⚠️  Error reading warehouse: {e}", self.league_code)
+        
+        if not os.path.exists(player_stats_file) and GameStore.exists(self.games_folder):
+            try:
+                store = GameStore(self.games_folder)
+                player_df = store.to_dataframe('player_stats')
+                team_df = store.to_dataframe('team_stats')
+            except Exception as e:
+                log_message(f"❌ Error reading game store: {e}", self.league_code)
+                return None, None
+            
+            if player_df.empty:
+                log_message(f"❌ No player stats found", self.league_code)
+                return None, None
+            if team_df.empty:
+                log_message(f"❌ No team stats found", self.league_code)
+                return None, None
+            return player_df, team_df
+        
         if not os.path.exists(player_stats_file):
             log_message(f"❌ No player stats found", self.league_code)
-            return False
+            return None, None
         
         if not os.path.exists(team_stats_file):
             log_message(f"❌ No team stats found", self.league_code)
-            return False
+            return None, None
         
         try:
             player_df = pd.read_csv(player_stats_file, encoding='utf-8-sig')
             team_df = pd.read_csv(team_stats_file, encoding='utf-8-sig')
         except Exception as e:
             log_message(f"❌ Error reading stats files: {e}", self.league_code)
+            return None, None
+        
+        return player_df, team_df
+    
+    def calculate_all(self):
+        """חישוב כל הממוצעים"""
+        
+        # טעינת stats
+        player_df, team_df = self._load_stats()
+        if player_df is None:
             return False
         
+        # כל השורות שייכות לליגה הזאת
+        player_df['league_id'] = int(self.league_id)
+        team_df['league_id'] = int(self.league_id)
+        
+        state_path = os.path.join(self.data_folder, f"{self.league_code}_averages_state.pkl")
+        self.calculate_frames(player_df, team_df, [self], state_path)
+        return True
+    
+    def calculate_frames(self, player_df, team_df, calculators, state_path):
+        """
+        חישוב ממוצעים לשורות של ליגה אחת או יותר (עמודת league_id) ושמירה לכל ליגה
+        
+        Args:
+            player_df, team_df: סטטיסטיקות משחקים עם league_id
+            calculators: AveragesCalculator לכל ליגה (לנתיבי הפלט)
+            state_path: קובץ הסכומים הרצים
+        """
+        # סכומים רצים מהריצה הקודמת - רק משחקים חדשים/מתוקנים נכנסים לחישוב
+        running = None
+        if SCRAPING_CONFIG.get('incremental_averages', True):
+            running = RunningAverages(state_path, self.league_code)
+        
         # חישוב ממוצעי שחקנים
-        player_avg = self.calculate_player_averages(player_df)
-        if player_avg is not None:
-            player_averages_file = os.path.join(self.data_folder, f"{self.league_code}_player_averages.csv")
-            player_avg.to_csv(player_averages_file, index=False, encoding='utf-8-sig')
-            log_message(f"✅ Player averages: {len(player_avg)} players", self.league_code)
+        player_avg = self.calculate_player_averages(player_df, running)
         
         # חישוב ממוצעי קבוצות
-        team_avg = self.calculate_team_averages(team_df)
+        opponent_avg = None
+        team_avg = self.calculate_team_averages(team_df, running)
         if team_avg is not None:
             # חישוב ממוצעי יריבים
-            opponent_avg = self.calculate_opponent_averages(team_df)
+            opponent_avg = self.calculate_opponent_averages(team_df, running)
             
             # הוספת pts_allowed
             if opponent_avg is not None and 'opp_pts' in opponent_avg.columns:
-                opp_pts = opponent_avg[['team', 'opp_pts', 'opp_pts_rank']].copy()
+                opp_pts = opponent_avg[['league_id', 'team', 'opp_pts', 'opp_pts_rank']].copy()
                 opp_pts.rename(columns={
                     'opp_pts': 'pts_allowed',
                     'opp_pts_rank': 'pts_allowed_rank'
                 }, inplace=True)
                 
-                team_avg = pd.merge(team_avg, opp_pts, on='team', how='left')
+                team_avg = pd.merge(team_avg, opp_pts, on=['league_id', 'team'], how='left')
                 
                 # סידור עמודות
                 cols = team_avg.columns.tolist()
@@ -116,20 +221,61 @@ class AveragesCalculator:
                     cols.insert(pts_idx + 1, 'pts_allowed')
                     cols.insert(pts_idx + 2, 'pts_allowed_rank')
                     team_avg = team_avg[cols]
-            
+        
+        # שמירה - קובץ לכל ליגה
+        for calculator in calculators:
+            calculator._write_outputs(player_avg, team_avg, opponent_avg)
+        
+        if running is not None:
+            try:
+                running.save()
+                log_message(running.summary(), self.league_code)
+            except Exception as e:
+                log_message(f"⚠️  Failed to save averages state: {e}", self.league_code)
+    
+    def _write_outputs(self, player_avg, team_avg, opponent_avg):
+        """שמירת השורות של הליגה הזאת לקבצי הממוצעים שלה"""
+        league_id = int(self.league_id)
+        
+        def league_rows(df):
+            return df[df['league_id'] == league_id]
+        
+        if player_avg is not None:
+            player_avg = league_rows(player_avg)
+            player_averages_file = os.path.join(self.data_folder, f"{self.league_code}_player_averages.csv")
+            player_avg.to_csv(player_averages_file, index=False, encoding='utf-8-sig')
+            log_message(f"✅ Player averages: {len(player_avg)} players", self.league_code)
+        
+        if team_avg is not None:
+            team_avg = league_rows(team_avg)
             team_averages_file = os.path.join(self.data_folder, f"{self.league_code}_team_averages.csv")
             team_avg.to_csv(team_averages_file, index=False, encoding='utf-8-sig')
             log_message(f"✅ Team averages: {len(team_avg)} teams", self.league_code)
             
             # שמירת ממוצעי יריבים
             if opponent_avg is not None:
+                opponent_avg = league_rows(opponent_avg)
                 opponent_averages_file = os.path.join(self.data_folder, f"{self.league_code}_opponent_averages.csv")
                 opponent_avg.to_csv(opponent_averages_file, index=False, encoding='utf-8-sig')
                 log_message(f"✅ Opponent averages: {len(opponent_avg)} teams", self.league_code)
+    
+    def _aggregate(self, name, df, keys, mean_cols, sum_cols, running=None):
+        """
+        ממוצעים לפי keys, כמו groupby().agg({col: 'mean', 'game_id': 'count', sum_col: 'sum'})
         
-        return True
+        Args:
+            name: שם הטבלה במצב הסכומים הרצים
+            running: RunningAverages או None (חישוב מלא)
+        """
+        if running is None:
+            totals = group_sums(df, keys, mean_cols, sum_cols)
+        else:
+            totals = running.update(name, df, keys, mean_cols, sum_cols)
+        
+        int_sum_cols = [col for col in sum_cols if pd.api.types.is_integer_dtype(df[col])]
+        return totals_to_frame(totals, mean_cols, sum_cols, int_sum_cols)
     
-    def calculate_player_averages(self, player_df):
+    def calculate_player_averages(self, player_df, running=None):
         """חישוב ממוצעי שחקנים"""
         
         numeric_cols = [
@@ -147,33 +293,30 @@ class AveragesCalculator:
             player_df['starter'] = pd.to_numeric(player_df['starter'], errors='coerce')
         
         # הגדרת aggregation
-        agg_dict = {col: 'mean' for col in numeric_cols if col in player_df.columns}
-        agg_dict['game_id'] = 'count'
-        
-        if 'starter' in player_df.columns:
-            agg_dict['starter'] = 'sum'
+        mean_cols = [col for col in numeric_cols if col in player_df.columns]
+        sum_cols = ['starter'] if 'starter' in player_df.columns else []
         
         # קיבוץ
         if 'player_id' not in player_df.columns:
             log_message("⚠️  player_id not found", self.league_code)
             return None
         
-        player_avg = player_df.groupby(['player_id', 'player_name', 'team']).agg(agg_dict).reset_index()
+        player_df = self._with_league(player_df)
+        player_avg = self._aggregate(
+            'player', player_df, ['league_id', 'player_id', 'player_name', 'team'], mean_cols, sum_cols, running
+        )
         player_avg.rename(columns={'game_id': 'games_played'}, inplace=True)
         
         if 'starter' in player_avg.columns:
             player_avg.rename(columns={'starter': 'games_started'}, inplace=True)
         
         # ⭐ תיקון team_id - נקבל מהמיפוי!
-        player_avg['team_id'] = player_avg['team'].apply(self._get_team_id)
+        player_avg = self._attach_team_ids(player_avg)
         
         # חישוב אחוזים
         player_avg = self._add_percentages(player_avg)
         player_avg = player_avg.round(1)
         
-        # הוספת league_id
-        player_avg['league_id'] = self.league_id
-        
         # סידור עמודות
         desired_order = [
             'player_id', 'player_name', 'team', 'team_id', 'league_id',
@@ -191,7 +334,7 @@ class AveragesCalculator:
         
         return player_avg
     
-    def calculate_team_averages(self, team_df):
+    def calculate_team_averages(self, team_df, running=None):
         """חישוב ממוצעי קבוצות"""
         
         numeric_team_cols = [
@@ -210,22 +353,18 @@ class AveragesCalculator:
             log_message("⚠️  team column not found", self.league_code)
             return None
         
-        team_avg = team_df.groupby(['team']).agg({
-            **{col: 'mean' for col in numeric_team_cols if col in team_df.columns},
-            'game_id': 'count'
-        }).reset_index()
+        team_df = self._with_league(team_df)
+        mean_cols = [col for col in numeric_team_cols if col in team_df.columns]
+        team_avg = self._aggregate('team', team_df, ['league_id', 'team'], mean_cols, [], running)
         
         team_avg.rename(columns={'game_id': 'games_played'}, inplace=True)
         
         # ⭐ תיקון team_id - נקבל מהמיפוי!
-        team_avg['team_id'] = team_avg['team'].apply(self._get_team_id)
+        team_avg = self._attach_team_ids(team_avg)
         
-        # חישוב possessions
+        # חישוב possessions (על עמודות שלמות)
         if all(col in team_avg.columns for col in ['fga', 'fta', 'off', 'to']):
-            team_avg['possessions'] = team_avg.apply(
-                lambda row: StatsCalculator.calculate_possessions(row.to_dict()),
-                axis=1
-            )
+            team_avg['possessions'] = StatsCalculator.calculate_possessions(team_avg)
         
         # חישוב אחוזים
         team_avg = self._add_percentages(team_avg)
@@ -234,9 +373,6 @@ class AveragesCalculator:
         # דירוגים
         team_avg = self._add_rankings(team_avg)
         
-        # הוספת league_id
-        team_avg['league_id'] = self.league_id
-        
         # סידור עמודות
         final_cols = ['team', 'team_id', 'league_id', 'games_played']
         for col in team_avg.columns:
@@ -250,7 +386,7 @@ class AveragesCalculator:
         
         return team_avg
     
-    def calculate_opponent_averages(self, team_df):
+    def calculate_opponent_averages(self, team_df, running=None):
         """חישוב ממוצעי יריבים"""
         
         numeric_team_cols = [
@@ -261,41 +397,19 @@ class AveragesCalculator:
             'points_in_paint', 'pts_off_turnovers'
         ]
         
-        opponent_stats = []
-        
-        for game_id in team_df['game_id'].unique():
-            game_teams = team_df[team_df['game_id'] == game_id]
-            if len(game_teams) == 2:
-                team1 = game_teams.iloc[0]
-                team2 = game_teams.iloc[1]
-                
-                opp1 = {'team': team1['team'], 'game_id': game_id}
-                opp2 = {'team': team2['team'], 'game_id': game_id}
-                
-                for col in numeric_team_cols:
-                    if col in team2:
-                        opp1[f"opp_{col}"] = team2[col]
-                    if col in team1:
-                        opp2[f"opp_{col}"] = team1[col]
-                
-                opponent_stats.append(opp1)
-                opponent_stats.append(opp2)
+        team_df = self._with_league(team_df)
         
-        if not opponent_stats:
+        opp_df = self._opponent_rows(team_df, [col for col in numeric_team_cols if col in team_df.columns])
+        if opp_df is None:
             return None
         
-        opp_df = pd.DataFrame(opponent_stats)
-        
         opp_cols = [col for col in opp_df.columns if col.startswith('opp_')]
-        opponent_avg = opp_df.groupby(['team']).agg({
-            **{col: 'mean' for col in opp_cols},
-            'game_id': 'count'
-        }).reset_index()
+        opponent_avg = self._aggregate('opponent', opp_df, ['league_id', 'team'], opp_cols, [], running)
         
         opponent_avg.rename(columns={'game_id': 'games_played'}, inplace=True)
         
         # ⭐ תיקון team_id - נקבל מהמיפוי!
-        opponent_avg['team_id'] = opponent_avg['team'].apply(self._get_team_id)
+        opponent_avg = self._attach_team_ids(opponent_avg)
         
         # חישוב אחוזים
         if 'opp_2ptm' in opponent_avg.columns and 'opp_2pta' in opponent_avg.columns:
@@ -329,16 +443,7 @@ class AveragesCalculator:
         
         # דירוגים (גבוה = גרוע בהגנה, חוץ מ-TO)
         opp_stat_cols = [col for col in opponent_avg.columns if col.startswith('opp_') and col != 'opp_to']
-        
-        for col in opp_stat_cols:
-            rank_col = f"{col}_rank"
-            opponent_avg[rank_col] = opponent_avg[col].rank(ascending=True, method='min').astype(int)
-        
-        if 'opp_to' in opponent_avg.columns:
-            opponent_avg['opp_to_rank'] = opponent_avg['opp_to'].rank(ascending=False, method='min').astype(int)
-        
-        # הוספת league_id
-        opponent_avg['league_id'] = self.league_id
+        opponent_avg = self._add_ranks(opponent_avg, ascending_cols=opp_stat_cols, descending_cols=['opp_to'])
         
         # סידור עמודות
         final_opp_cols = ['team', 'team_id', 'league_id', 'games_played']
@@ -353,6 +458,30 @@ class AveragesCalculator:
         
         return opponent_avg
     
+    @staticmethod
+    def _opponent_rows(team_df, stat_cols):
+        """
+        שורה לכל קבוצה במשחק עם הסטטיסטיקות של היריבה (opp_<col>)
+        רק משחקים עם בדיוק 2 קבוצות, בסדר הופעה - החלפת זוגות במקום לולאה על משחקים
+        
+        Returns:
+            DataFrame: league_id, team, game_id, opp_* (או None אם אין משחקים)
+        """
+        games = team_df[team_df.groupby('game_id')['game_id'].transform('size') == 2]
+        if games.empty:
+            return None
+        
+        games = games.assign(
+            _game_order=pd.factorize(games['game_id'])[0],
+            _slot=games.groupby('game_id').cumcount()
+        ).sort_values(['_game_order', '_slot'], kind='stable')
+        
+        opp_df = games[stat_cols].iloc[np.arange(len(games)) ^ 1].reset_index(drop=True).add_prefix('opp_')
+        opp_df.insert(0, 'league_id', games['league_id'].to_numpy())
+        opp_df.insert(1, 'team', games['team'].to_numpy())
+        opp_df.insert(2, 'game_id', games['game_id'].to_numpy())
+        return opp_df
+    
     def _add_percentages(self, df):
         """הוספת אחוזים ל-DataFrame"""
         
@@ -383,14 +512,79 @@ class AveragesCalculator:
         
         lower_better_cols = ['to', 'pf', 'blka']
         
-        for col in higher_better_cols:
-            if col in team_avg.columns:
-                rank_col = f"{col}_rank"
-                team_avg[rank_col] = team_avg[col].rank(ascending=False, method='min').astype(int)
-        
-        for col in lower_better_cols:
-            if col in team_avg.columns:
-                rank_col = f"{col}_rank"
-                team_avg[rank_col] = team_avg[col].rank(ascending=True, method='min').astype(int)
+        return self._add_ranks(team_avg, ascending_cols=lower_better_cols, descending_cols=higher_better_cols)
+    
+    @staticmethod
+    def _add_ranks(df, ascending_cols, descending_cols):
+        """
+        כל עמודות הדירוג בקריאת rank אחת (עמודות בסדר יורד מוכפלות ב-1-), בתוך כל ליגה
         
-        return team_avg
\ No newline at end of file
+        Returns:
+            DataFrame עם עמודות <col>_rank
+        """
+        ascending_cols = [col for col in ascending_cols if col in df.columns]
+        descending_cols = [col for col in descending_cols if col in df.columns]
+        cols = ascending_cols + descending_cols
+        if not cols:
+            return df
+        
+        signs = pd.Series([1] * len(ascending_cols) + [-1] * len(descending_cols), index=cols)
+        signed = df[cols] * signs
+        if 'league_id' in df.columns:
+            signed = signed.groupby(df['league_id'])
+        ranks = signed.rank(method='min').astype(int).add_suffix('_rank')
+        return pd.concat([df, ranks], axis=1)
+
+
+def calculate_leagues_averages(sources):
+    """
+    ממוצעים לכמה ליגות במעבר אחד: מיפוי הקבוצות נטען פעם אחת, השורות של כל הליגות
+    נכנסות למסגרת אחת, והחישוב הוא groupby אחד לפי (league_id, ...)
+    
+    Args:
+        sources: list של dicts עם league_id, league_code, data_folder, games_folder, season
+    
+    Returns:
+        dict: {league_id: True אם הממוצעים נשמרו}
+    """
+    team_mapping = load_global_team_mapping()
+    results = {}
+    loaded, player_frames, team_frames = [], [], []
+    
+    for source in sources:
+        calculator = AveragesCalculator(
+            source['league_id'],
+            source['league_code'],
+            source['data_folder'],
+            source['games_folder'],
+            season=source.get('season'),
+            team_mapping=team_mapping
+        )
+        player_df, team_df = calculator._load_stats()
+        results[source['league_id']] = player_df is not None
+        if player_df is None:
+            continue
+        
+        player_df['league_id'] = int(calculator.league_id)
+        team_df['league_id'] = int(calculator.league_id)
+        player_frames.append(player_df)
+        team_frames.append(team_df)
+        loaded.append(calculator)
+    
+    if not loaded:
+        return results
+    
+    log_message(f"Calculating averages for {len(loaded)} leagues in one pass")
+    runner = AveragesCalculator(None, 'averages', DATA_ROOT, DATA_ROOT, team_mapping=team_mapping)
+    try:
+        runner.calculate_frames(
+            pd.concat(player_frames, ignore_index=True),
+            pd.concat(team_frames, ignore_index=True),
+            loaded,
+            os.path.join(DATA_ROOT, 'averages_state.pkl')
+        )
+    except Exception as e:
+        log_message(f"❌ Cross-league averages failed: {e}")
+        return {league_id: False for league_id in results}
+    
+    return results
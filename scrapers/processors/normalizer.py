@@ -6,11 +6,16 @@ Data Normalizer - UPDATED
 """
 
 from datetime import datetime
+from functools import lru_cache
 import pandas as pd
 
 from utils import log_message, load_global_team_mapping, normalize_team_name_global
 
 
+# גודל המטמון של שמות קבוצות / תאריכים (ערכים שונים, לא שורות)
+NORMALIZER_CACHE_SIZE = 2048
+
+
 class DataNormalizer:
     """מחלקה לנרמול כל סוגי הנתונים"""
     
@@ -23,18 +28,32 @@ class DataNormalizer:
         self.league_id = league_id
         self.league_code = league_code
         self.team_mapping = None
+        
+        # נרמול חוזר של אותו ערך (לו"ז: ~240 שורות, ~14 קבוצות) - מהמטמון
+        self._team_cache = lru_cache(maxsize=NORMALIZER_CACHE_SIZE)(self._normalize_team_name)
+        self._date_cache = lru_cache(maxsize=NORMALIZER_CACHE_SIZE)(self._normalize_date)
     
     def load_team_mapping(self):
-        """טעינת מיפוי קבוצות גלובלי"""
-        if self.team_mapping is None:
-            self.team_mapping = load_global_team_mapping()
-            
-            if not self.team_mapping:
-                log_message("⚠️  No team mapping loaded", self.league_code)
-                return False
+        """טעינת מיפוי קבוצות גלובלי (משותף לכל התהליך, נקרא מחדש רק כש-teams.csv משתנה)"""
+        self.refresh_team_mapping()
+        
+        if not self.team_mapping:
+            log_message("⚠️  No team mapping loaded", self.league_code)
+            return False
         
         return True
     
+    def refresh_team_mapping(self):
+        """
+        בדיקת mtime של teams.csv - פעם אחת ללו"ז / למשחק, לא בכל שם
+        המיפוי עצמו נטען פעם אחת; מיפוי חדש = מטמון חדש
+        """
+        team_mapping = load_global_team_mapping()
+        if team_mapping is not self.team_mapping:
+            self.team_mapping = team_mapping
+            self._team_cache.cache_clear()
+        return team_mapping
+    
     def normalize_team_name(self, team_name_raw):
         """
         נרמול שם קבוצה
@@ -46,9 +65,16 @@ class DataNormalizer:
         Returns:
             dict: {team_id, league_id, club_name, short_name, bg_color, text_color, all_variations}
         """
-        if not self.team_mapping:
-            self.load_team_mapping()
+        # בלי גישה לדיסק - המיפוי מתרענן ב-refresh_team_mapping() (לו"ז / משחק)
+        if self.team_mapping is None:
+            self.refresh_team_mapping()
         
+        try:
+            return self._team_cache(team_name_raw)
+        except TypeError:
+            return self._normalize_team_name(team_name_raw)
+    
+    def _normalize_team_name(self, team_name_raw):
         # נרמול HTML entities (כמו &quot; → ")
         import html
         team_name_normalized = html.unescape(team_name_raw) if team_name_raw else team_name_raw
@@ -69,6 +95,12 @@ class DataNormalizer:
         Returns:
             str: DD/MM/YYYY או None
         """
+        try:
+            return self._date_cache(date_str)
+        except TypeError:
+            return self._normalize_date(date_str)
+    
+    def _normalize_date(self, date_str):
         if not date_str or pd.isna(date_str):
             return None
         
@@ -123,6 +155,7 @@ class DataNormalizer:
             DataFrame מנורמל
         """
         log_message("   Normalizing schedule teams...", self.league_code)
+        self.refresh_team_mapping()
         
         # שינוי שמות עמודות לאנגלית
         column_renames = {
@@ -136,34 +169,47 @@ class DataNormalizer:
             if k in games_df.columns
         })
         
-        # נרמול Home Team (כולל team_id)
-        if 'Home Team' in games_df.columns:
-            def normalize_home(team_name):
-                if pd.notna(team_name):
-                    team_info = self.normalize_team_name(team_name)
-                    return team_info['club_name']
-                return team_name
-            
-            games_df['Home Team'] = games_df['Home Team'].apply(normalize_home)
-        
-        # נרמול Away Team (כולל team_id)
-        if 'Away Team' in games_df.columns:
-            def normalize_away(team_name):
-                if pd.notna(team_name):
-                    team_info = self.normalize_team_name(team_name)
-                    return team_info['club_name']
-                return team_name
-            
-            games_df['Away Team'] = games_df['Away Team'].apply(normalize_away)
+        # נרמול Home Team / Away Team (כולל team_id)
+        for col in ['Home Team', 'Away Team']:
+            if col in games_df.columns:
+                games_df[col] = self.map_unique(games_df[col], self.normalize_team_club_name)
         
         # נרמול תאריכים
         if 'Date' in games_df.columns:
-            games_df['Date'] = games_df['Date'].apply(self.normalize_date)
+            games_df['Date'] = self.map_unique(games_df['Date'], self.normalize_date, skip_na=False)
         
         log_message(f"   ✅ Normalized {len(games_df)} games", self.league_code)
+        log_message(f"   {self.cache_stats()}", self.league_code)
         
         return games_df
     
+    def normalize_team_club_name(self, team_name_raw):
+        """שם מנורמל בלבד (club_name)"""
+        return self.normalize_team_name(team_name_raw)['club_name']
+    
+    @staticmethod
+    def map_unique(series, func, skip_na=True):
+        """
+        הפעלת func פעם אחת לכל ערך שונה והחזרה לכל השורות
+        
+        Args:
+            series: עמודה לנרמול
+            func: פונקציית נרמול לערך בודד
+            skip_na: ערכים חסרים נשארים כמו שהם (בלי func)
+        """
+        uniques = series.dropna().unique() if skip_na else series.unique()
+        mapping = {value: func(value) for value in uniques}
+        result = series.map(mapping)
+        return result.where(series.notna(), series) if skip_na else result
+    
+    def cache_stats(self):
+        """שורת log עם hits/misses של מטמוני הנרמול"""
+        teams, dates = self._team_cache.cache_info(), self._date_cache.cache_info()
+        return (
+            f"🧠 Normalizer cache: teams {teams.hits} hits / {teams.misses} misses, "
+            f"dates {dates.hits} hits / {dates.misses} misses"
+        )
+    
     def normalize_minutes(self, min_str):
         """
         המרת דקות מ-MM:SS לדקות שלמות (עיגול לפי 30 שניות)
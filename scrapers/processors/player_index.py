@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Player Index
+============
+אינדקס שחקנים של ליגה בזיכרון (players/<league>/index.json):
+- נטען פעם אחת בריצה (lazy), לא בכל משחק
+- עדכון אינקרמנטלי: index_meta.json שומר mtime/size של קובץ ה-details בכל תיקייה,
+  וקוראים מחדש רק תיקיות שהשתנו (או חדשות)
+- חיפוש לפי שם, player_id, (שם, team_id) ותיקייה
+- מתעדכן בזיכרון כששחקן נשמר, ונכתב לדיסק פעם אחת בסוף הריצה (flush)
+"""
+
+import json
+import os
+import threading
+
+from utils import log_message
+
+
+class PlayerIndex:
+    """אינדקס שחקנים עם חיפושים משניים (thread-safe)"""
+
+    # שדות שנשמרים לכל שחקן באינדקס
+    FIELDS = ['player_id', 'folder_name', 'current_team_id', 'date_of_birth', 'jersey_number', 'height']
+
+    def __init__(self, players_folder, league_code):
+        """
+        Args:
+            players_folder: תיקיית השחקנים של הליגה (Path)
+            league_code: קוד ליגה (לlogים)
+        """
+        self.players_folder = players_folder
+        self.league_code = league_code
+        self.index_path = players_folder / 'index.json'
+        self.meta_path = players_folder / 'index_meta.json'
+
+        # records: {folder_name או 'id:<player_id>': entry} - entry כולל גם 'name'
+        # files: {folder_name: [mtime, size]} של קובץ ה-details שממנו נקרא ה-entry
+        self.records = None
+        self.files = {}
+        self.dirty = False
+        self.lock = threading.RLock()
+
+        # חיפושים משניים
+        self.by_name = {}
+        self.by_id = {}
+        self.by_name_team = {}
+
+    # ============================================
+    # LOADING
+    # ============================================
+
+    def _ensure_loaded(self):
+        """טעינה מהדיסק + רענון אינקרמנטלי בפעם הראשונה"""
+        with self.lock:
+            if self.records is not None:
+                return
+
+            self.records, self.files = {}, {}
+            if self.meta_path.exists():
+                try:
+                    with open(self.meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    self.records = meta.get('players', {})
+                    self.files = meta.get('files', {})
+                except Exception as e:
+                    log_message(f"   ⚠️  Player index metadata unreadable, rebuilding: {e}", self.league_code)
+                    self.records, self.files = {}, {}
+            else:
+                log_message("   ⚠️  Player index metadata not found, creating...", self.league_code)
+
+            self.refresh()
+
+    @staticmethod
+    def _details_file(folder_path):
+        """קובץ ה-details הראשון בתיקיית שחקן (DirEntry) או None"""
+        with os.scandir(folder_path) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.name.endswith('_details.json') and entry.is_file():
+                    return entry
+        return None
+
+    def refresh(self):
+        """
+        סנכרון מול תיקיות השחקנים - קורא רק קבצי details שה-mtime/size שלהם השתנו
+
+        Returns:
+            int: מספר התיקיות שנקראו מחדש
+        """
+        with self.lock:
+            if self.records is None:
+                self.records, self.files = {}, {}
+
+            if not self.players_folder.exists():
+                log_message("   ⚠️  Players folder doesn't exist", self.league_code)
+                self._rebuild_lookups()
+                return 0
+
+            seen = set()
+            changed = 0
+
+            with os.scandir(self.players_folder) as folders:
+                for folder in folders:
+                    if not folder.is_dir():
+                        continue
+
+                    details_file = self._details_file(folder.path)
+                    if details_file is None:
+                        continue
+
+                    seen.add(folder.name)
+                    stat = details_file.stat()
+                    signature = [stat.st_mtime, stat.st_size]
+                    if self.files.get(folder.name) == signature and folder.name in self.records:
+                        continue
+
+                    try:
+                        with open(details_file.path, 'r', encoding='utf-8') as f:
+                            details = json.load(f)
+                    except Exception as e:
+                        log_message(f"   ⚠️  Error reading {folder.name}: {e}", self.league_code)
+                        continue
+
+                    self._set_record(folder.name, details)
+                    self.files[folder.name] = signature
+                    changed += 1
+
+            # תיקיות שנמחקו
+            removed = [name for name in self.files if name not in seen]
+            for name in removed:
+                self.files.pop(name, None)
+                self.records.pop(name, None)
+
+            if changed or removed:
+                self.dirty = True
+                log_message(
+                    f"✅ Player index refreshed: {changed} changed, {len(removed)} removed, "
+                    f"{len(self.records)} players",
+                    self.league_code
+                )
+
+            self._rebuild_lookups()
+            return changed
+
+    def rebuild(self):
+        """בנייה מחדש מלאה מכל תיקיות השחקנים (מתעלם מה-metadata)"""
+        log_message("Creating player index...", self.league_code)
+        with self.lock:
+            self.records, self.files = {}, {}
+            self.dirty = True
+            self.refresh()
+        log_message(f"✅ Player index created: {len(self.records)} players", self.league_code)
+
+    # ============================================
+    # RECORDS & LOOKUPS
+    # ============================================
+
+    def _set_record(self, key, details):
+        """יצירת entry מ-details ושמירה תחת key"""
+        entry = {'name': details.get('name', '')}
+        for field in self.FIELDS:
+            entry[field] = details.get(field, '')
+        if key and not key.startswith('id:'):
+            entry['folder_name'] = key
+        self.records[key] = entry
+        return entry
+
+    def _add_lookups(self, entry):
+        if entry['name']:
+            self.by_name[entry['name']] = entry
+            self.by_name_team[(entry['name'], str(entry.get('current_team_id', '')))] = entry
+        if entry.get('player_id'):
+            self.by_id[entry['player_id']] = entry
+
+    def _drop_lookups(self, entry):
+        """הסרת החיפושים שמצביעים על entry (לפני החלפה / שינוי מזהים)"""
+        keys = (
+            (self.by_name, entry['name']),
+            (self.by_name_team, (entry['name'], str(entry.get('current_team_id', '')))),
+            (self.by_id, entry.get('player_id'))
+        )
+        for lookup, key in keys:
+            if lookup.get(key) is entry:
+                del lookup[key]
+
+    def _rebuild_lookups(self):
+        self.by_name, self.by_id, self.by_name_team = {}, {}, {}
+        for entry in self.records.values():
+            self._add_lookups(entry)
+
+    def get(self, player_name):
+        """רשומת שחקן לפי שם, או None"""
+        self._ensure_loaded()
+        return self.by_name.get(player_name)
+
+    def get_by_id(self, player_id):
+        """רשומת שחקן לפי player_id, או None"""
+        self._ensure_loaded()
+        return self.by_id.get(player_id)
+
+    def get_by_name_team(self, player_name, team_id):
+        """רשומת שחקן לפי (שם, team_id), או None"""
+        self._ensure_loaded()
+        return self.by_name_team.get((player_name, str(team_id)))
+
+    def get_by_folder(self, folder_name):
+        """רשומת שחקן לפי שם תיקייה, או None"""
+        self._ensure_loaded()
+        return self.records.get(folder_name)
+
+    def __contains__(self, player_name):
+        return self.get(player_name) is not None
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self.records)
+
+    def to_dict(self):
+        """האינדקס בפורמט index.json - {name: entry}"""
+        self._ensure_loaded()
+        with self.lock:
+            return {
+                name: {field: entry.get(field, '') for field in self.FIELDS}
+                for name, entry in self.by_name.items()
+            }
+
+    # ============================================
+    # UPDATES
+    # ============================================
+
+    def update(self, player_name, **fields):
+        """
+        עדכון (או הוספה) של שחקן בזיכרון - שדות שלא הועברו נשמרים
+
+        Args:
+            player_name: שם השחקן
+            **fields: ערכים מתוך FIELDS
+        """
+        if not player_name:
+            return
+
+        self._ensure_loaded()
+        with self.lock:
+            player_id = fields.get('player_id')
+
+            def same_player(candidate):
+                # שחקן אחר עם אותו שם (player_id אחר) לא נדרס
+                return candidate is not None and (
+                    not player_id or not candidate.get('player_id') or candidate['player_id'] == player_id
+                )
+
+            entry = self.by_id.get(player_id) if player_id else None
+            if entry is None and fields.get('current_team_id') is not None:
+                candidate = self.by_name_team.get((player_name, str(fields['current_team_id'])))
+                entry = candidate if same_player(candidate) else None
+            if entry is None:
+                candidate = self.by_name.get(player_name)
+                entry = candidate if same_player(candidate) else None
+
+            if entry is None:
+                key = f"id:{player_id or player_name}"
+                entry = self._set_record(key, {'name': player_name})
+            else:
+                self._drop_lookups(entry)
+
+            entry['name'] = player_name
+            for field, value in fields.items():
+                if field in self.FIELDS and value is not None:
+                    entry[field] = value
+
+            self._add_lookups(entry)
+            self.dirty = True
+
+    def update_from_details(self, folder_name, details):
+        """עדכון מתוך קובץ details של שחקן שנשמר עכשיו"""
+        self._ensure_loaded()
+        with self.lock:
+            previous = self.records.get(folder_name)
+            if previous is not None:
+                self._drop_lookups(previous)
+            entry = self._set_record(folder_name, details)
+
+            details_file = self._details_file(self.players_folder / folder_name)
+            if details_file is not None:
+                stat = details_file.stat()
+                self.files[folder_name] = [stat.st_mtime, stat.st_size]
+
+            self._add_lookups(entry)
+            self.dirty = True
+
+    def flush(self):
+        """כתיבה לדיסק (index.json + index_meta.json) - רק אם היו שינויים"""
+        with self.lock:
+            if not self.dirty or self.records is None:
+                return False
+
+            self.players_folder.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+            tmp_path = self.meta_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'players': self.records, 'files': self.files}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.meta_path)
+
+            self.dirty = False
+
+        log_message(f"📄 Player index saved: {len(self.records)} players", self.league_code)
+        return True
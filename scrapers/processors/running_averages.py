@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Running Averages
+================
+סכומים ומונים רצים לממוצעי ליגה, נשמרים בין ריצות (<league>_averages_state.pkl):
+- לכל משחק נשמר hash של השורות שלו + התרומה שלו לסכומים
+- בריצה הבאה מתווספים רק משחקים חדשים; משחק שהשורות שלו השתנו (תיקון סטטיסטיקה)
+  מוסר מהסכומים ומתווסף מחדש, ומשחק שנעלם מהנתונים מוסר
+- ממוצע = סכום / מספר ערכים (כמו groupby().mean()), כך שהתוצאה זהה לחישוב מלא
+"""
+
+import os
+
+import pandas as pd
+
+from utils import log_message
+
+STATE_VERSION = 1
+
+# עמודות עזר בטבלת הסכומים
+COUNT_SUFFIX = '__n'
+GAMES_COLUMN = '__games'
+ROWS_COLUMN = '__rows'
+
+# עיגול הסכומים לפני חלוקה - הוספה והסרה חוזרות של שברים צוברות שגיאת float זעירה,
+# והעיגול מבטל אותה כך שסכום רץ וסכום מלא נותנים בדיוק אותו ממוצע
+SUM_DECIMALS = 9
+
+
+def group_sums(df, keys, mean_cols, sum_cols):
+    """
+    סכומים ומונים לכל קבוצה
+
+    Args:
+        df: DataFrame עם עמודות מספריות + game_id
+        keys: עמודות הקיבוץ
+        mean_cols: עמודות לממוצע (סכום + מספר ערכים שאינם NaN)
+        sum_cols: עמודות לסכום בלבד
+
+    Returns:
+        DataFrame עם index לפי keys
+    """
+    grouped = df.groupby(keys)
+    return pd.concat([
+        grouped[mean_cols + sum_cols].sum(),
+        grouped[mean_cols].count().add_suffix(COUNT_SUFFIX),
+        grouped['game_id'].count().rename(GAMES_COLUMN),
+        grouped.size().rename(ROWS_COLUMN)
+    ], axis=1)
+
+
+def totals_to_frame(totals, mean_cols, sum_cols, int_sum_cols=()):
+    """
+    טבלת סכומים -> טבלה כמו groupby().agg({col: 'mean', 'game_id': 'count', ...}).reset_index()
+    """
+    totals = totals[totals[ROWS_COLUMN] > 0].sort_index()
+    frame = pd.DataFrame(index=totals.index)
+    for col in mean_cols:
+        frame[col] = totals[col].round(SUM_DECIMALS) / totals[col + COUNT_SUFFIX]
+    frame['game_id'] = totals[GAMES_COLUMN].astype('int64')
+    for col in sum_cols:
+        frame[col] = totals[col].astype('int64') if col in int_sum_cols else totals[col]
+    return frame.reset_index()
+
+
+def game_hashes(df, columns):
+    """hash לכל משחק מתוך השורות שלו (לא תלוי בסדר השורות)"""
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    sums = pd.Series(row_hashes.to_numpy(), index=df['game_id'].to_numpy()).groupby(level=0).sum()
+    return {str(game_id): format(int(value), 'x') for game_id, value in sums.items()}
+
+
+class RunningAverages:
+    """מצב הסכומים הרצים של ליגה אחת"""
+
+    def __init__(self, state_path, league_code=None):
+        """
+        Args:
+            state_path: קובץ המצב (pickle של pandas - טבלאות מספריות גדולות)
+            league_code: קוד ליגה (לlogים)
+        """
+        self.state_path = state_path
+        self.league_code = league_code
+        self.tables = {}
+        self.changes = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            state = pd.read_pickle(self.state_path)
+            if state.get('version') == STATE_VERSION:
+                self.tables = state['tables']
+        except Exception as e:
+            log_message(f"⚠️  Averages state unreadable, recomputing: {e}", self.league_code)
+            self.tables = {}
+
+    def save(self):
+        """כתיבת המצב לדיסק (כתיבה אטומית)"""
+        tmp_path = f"{self.state_path}.tmp"
+        pd.to_pickle({'version': STATE_VERSION, 'tables': self.tables}, tmp_path)
+        os.replace(tmp_path, self.state_path)
+
+    def update(self, name, df, keys, mean_cols, sum_cols):
+        """
+        עדכון הסכומים של טבלה מול הנתונים הנוכחיים
+
+        Args:
+            name: שם הטבלה במצב ('player' / 'team' / 'opponent')
+            df: כל השורות הנוכחיות (אחרי המרה למספרים)
+            keys, mean_cols, sum_cols: כמו ב-group_sums
+
+        Returns:
+            DataFrame: טבלת הסכומים המעודכנת (index לפי keys)
+        """
+        signature = [list(keys), list(mean_cols), list(sum_cols)]
+        value_cols = mean_cols + sum_cols
+        table = self.tables.get(name)
+
+        # שינוי בעמודות = חישוב מלא מחדש
+        if table is None or table['signature'] != signature:
+            table = {
+                'signature': signature,
+                'hashes': {},
+                'contrib': group_sums(df.iloc[:0], ['game_id'] + keys, mean_cols, sum_cols),
+                'totals': group_sums(df.iloc[:0], keys, mean_cols, sum_cols)
+            }
+
+        df = df.assign(game_id=df['game_id'].astype(str))
+        hashes = game_hashes(df, ['game_id'] + keys + value_cols)
+        old_hashes = table['hashes']
+
+        changed = [game_id for game_id, value in hashes.items() if old_hashes.get(game_id) != value]
+        retract = [game_id for game_id in old_hashes if hashes.get(game_id) != old_hashes[game_id]]
+
+        contrib, totals = table['contrib'], table['totals']
+
+        # הסרת התרומה הקודמת של משחקים שהשתנו / נעלמו
+        if retract:
+            mask = contrib.index.get_level_values('game_id').isin(retract)
+            totals = totals.sub(contrib[mask].groupby(level=keys).sum(), fill_value=0)
+            contrib = contrib[~mask]
+
+        # הוספת משחקים חדשים / מתוקנים
+        if changed:
+            added = group_sums(df[df['game_id'].isin(changed)], ['game_id'] + keys, mean_cols, sum_cols)
+            totals = totals.add(added.groupby(level=keys).sum(), fill_value=0)
+            contrib = pd.concat([contrib, added])
+
+        table['contrib'] = contrib
+        table['totals'] = totals[totals[ROWS_COLUMN] > 0]
+        table['hashes'] = hashes
+        self.tables[name] = table
+
+        removed = len([game_id for game_id in old_hashes if game_id not in hashes])
+        self.changes[name] = (len(changed), removed)
+        return table['totals']
+
+    def summary(self):
+        """שורת סיכום - כמה משחקים נוספו/הוסרו בכל טבלה"""
+        parts = [f"{name}: +{added}/-{removed}" for name, (added, removed) in self.changes.items()]
+        return f"🔁 Incremental averages ({', '.join(parts)} games)"
@@ -7,14 +7,13 @@ Scraper לליגת Winner (basket.co.il) - עם נורמליזציה של קבו
 גרסה מעודכנת: משתמש ב-DataNormalizer כמו IBasketballScraper
 """
 
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import re, unicodedata
-import time
 from pathlib import Path
 
 from utils import log_message, save_to_csv, get_soup
+from utils.team_mapping import get_team_mapping
 from .base_scraper import BaseScraper
 from .processors import DataNormalizer
 from models import generate_player_id
@@ -132,8 +131,6 @@ class WinnerScraper(BaseScraper):
                     else:
                         new_players += 1
     
-                time.sleep(1)
-    
         # 🟩 שלב 5: שמירה משולבת
         new_details_df = pd.DataFrame(all_details)
         new_history_df = pd.DataFrame(all_history)
@@ -199,13 +196,10 @@ class WinnerScraper(BaseScraper):
         team_id_map = self.league_config.get('team_id_map', {})
         team_id_official = team_id_map.get(web_team_id)
         
-        # קבל שם מנורמל מ-data/teams.csv
+        # קבל שם מנורמל מ-data/teams.csv (מיפוי משותף, בלי קריאה חוזרת של הקובץ)
         if team_id_official:
-            # טען את השם מ-teams.csv לפי team_id
-            import pandas as pd
-            teams_df = pd.read_csv('data/teams.csv', encoding='utf-8-sig')
-            team_row = teams_df[teams_df['Team_ID'] == team_id_official]
-            team_name_normalized = team_row['Team_Name'].values[0] if not team_row.empty else f"Team_{web_team_id}"
+            team_info = get_team_mapping().team(team_id_official)
+            team_name_normalized = team_info['club_name'] if team_info else f"Team_{web_team_id}"
         else:
             self.log(f"  ⚠️ No team_id mapping for web_id: {web_team_id}")
             team_name_normalized = f"Team_{web_team_id}"        
@@ -408,8 +402,6 @@ class WinnerScraper(BaseScraper):
             if stats:
                 game_file = games_folder / f"{game_id}_stats.csv"
                 save_to_csv(pd.DataFrame(stats), game_file)
-            
-            time.sleep(1)
         
         self.log(f"✅ Game stats updated: {len(to_scrape)} new games")
         return True
@@ -419,9 +411,16 @@ class WinnerScraper(BaseScraper):
         all_games = {}
         current_round = None
         
-        for board_id in self.board_ids:
-            url = f"{self.base_url}/results.asp?Board={board_id}&RoundNumber=0&TeamId=0&cYear=2026"
-            soup = get_soup(url)
+        # הורדת כל ה-boards במקביל
+        board_urls = [
+            f"{self.base_url}/results.asp?Board={board_id}&RoundNumber=0&TeamId=0&cYear=2026"
+            for board_id in self.board_ids
+        ]
+        board_soups = self.fetch_many(board_urls)
+        self.normalizer.refresh_team_mapping()
+        
+        for url in board_urls:
+            soup = board_soups.get(url)
             
             if not soup:
                 continue
@@ -571,6 +570,8 @@ class WinnerScraper(BaseScraper):
         if not soup:
             return None
         
+        self.normalizer.refresh_team_mapping()
+        
         tables = soup.select("table.stats_tbl")
         if not tables:
             return None
@@ -407,6 +407,36 @@ class SupabaseUploader:
             log_message(f"❌ Error upserting quarters: {e}")
             return False
     
+    # ============================================
+    # GENERIC (CHUNKED)
+    # ============================================
+    
+    def upsert_rows(self, table: str, rows: List[Dict[str, Any]], on_conflict: str,
+                    chunk_size: int = 500) -> bool:
+        """
+        העלאה/עדכון לכל טבלה בבקשות של עד chunk_size שורות
+        
+        Args:
+            table: שם הטבלה
+            rows: רשימת מילונים (כבר מנוקים - בלי NaN)
+            on_conflict: עמודות המפתח, מופרדות בפסיק
+            chunk_size: מקסימום שורות לבקשה
+        
+        Returns:
+            bool: הצלחה/כישלון (כישלון עוצר את שאר ה-chunks)
+        """
+        try:
+            for i in range(0, len(rows), chunk_size):
+                self.client.table(table).upsert(
+                    rows[i:i + chunk_size],
+                    on_conflict=on_conflict
+                ).execute()
+            return True
+            
+        except Exception as e:
+            log_message(f"❌ Error upserting {table}: {e}")
+            return False
+    
     # ============================================
     # HELPER METHODS
     # ============================================
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+# הטסטים מייבאים את המודולים של הפרויקט (config, scrapers, utils) מהשורש
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
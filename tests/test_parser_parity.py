@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Parser Parity
+=============
+עמודי /match/ שמורים (tests/fixtures) נגזרים עם html.parser ועם lxml -
+_scrape_player_stats / _scrape_team_stats / _scrape_quarter_scores חייבים להחזיר אותן שורות
+"""
+
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from scrapers.ibasketball import IBasketballScraper
+from scrapers.processors import DataNormalizer, StatsCalculator
+from utils import helpers, team_mapping
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = sorted((REPO_ROOT / 'tests' / 'fixtures').glob('match_*.html'))
+
+pytest.importorskip('lxml')
+
+
+class _EmptyPlayerIndex:
+    """אינדקס שחקנים ריק - player_id נוצר מהשם, זהה בשני ה-parsers"""
+
+    def get_by_name_team(self, name, team_id):
+        return None
+
+    def get(self, name):
+        return None
+
+
+@pytest.fixture(scope='module')
+def scraper(tmp_path_factory):
+    # log לתיקייה זמנית (לא logs/update_log.txt של ה-repo), מיפוי הקבוצות מ-data/teams.csv של ה-repo
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(helpers, 'LOG_FILE', str(tmp_path_factory.mktemp('logs') / 'update_log.txt'))
+        mp.setattr(team_mapping, '_team_mapping', team_mapping.TeamMapping(REPO_ROOT / 'data' / 'teams.csv'))
+
+        scraper = IBasketballScraper.__new__(IBasketballScraper)
+        scraper.league_id = '1'
+        scraper.league_code = 'leumit'
+        scraper.log = lambda message: None
+        scraper.normalizer = DataNormalizer('1', 'leumit')
+        assert scraper.normalizer.load_team_mapping()
+        scraper.stats_calc = StatsCalculator()
+        scraper.player_index = _EmptyPlayerIndex()
+        yield scraper
+
+
+def _scrape(scraper, path, parser):
+    soup = BeautifulSoup(path.read_bytes(), parser)
+    game_id = f"1_{path.stem.split('_')[1]}"
+    return {
+        'quarters': scraper._scrape_quarter_scores(soup, game_id, ''),
+        'player_stats': scraper._scrape_player_stats(soup, game_id, ''),
+        'team_stats': scraper._scrape_team_stats(soup, game_id, '')
+    }
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=lambda p: p.stem)
+def test_lxml_matches_html_parser(scraper, path):
+    expected = _scrape(scraper, path, 'html.parser')
+    actual = _scrape(scraper, path, 'lxml')
+
+    quarters, final_scores = expected['quarters']
+    assert quarters and final_scores
+    assert expected['player_stats']
+    assert len(expected['team_stats']) == 2
+
+    assert actual == expected
+
+
+def test_fixture_matches_stored_game(scraper):
+    """העמוד של 1_741605 נותן את אותם רבעים ונקודות כמו ה-CSV השמור של המשחק"""
+    result = _scrape(scraper, REPO_ROOT / 'tests' / 'fixtures' / 'match_741605.html', 'html.parser')
+    quarters, final_scores = result['quarters']
+
+    assert final_scores['home_score'] == 87 and final_scores['away_score'] == 76
+    assert [(q['team_id'], q['quarter'], q['score']) for q in quarters[:4]] == [
+        (168, 'Q1', 23), (168, 'Q2', 17), (168, 'Q3', 28), (168, 'Q4', 19)
+    ]
+    points = {row['player_name']: row['pts'] for row in result['player_stats']}
+    assert points['איאן מרטינז'] == 29 and points["סי ג'יי ווקר"] == 33
@@ -7,7 +7,11 @@ Utils Package
 
 from .helpers import (
     log_message,
+    league_log,
+    bind_log_context,
     get_soup,
+    make_soup,
+    fetch_soups,
     save_to_csv,
     append_to_csv,
     load_global_team_mapping,
@@ -19,7 +23,11 @@ from .helpers import (
 
 __all__ = [
     'log_message',
+    'league_log',
+    'bind_log_context',
     'get_soup',
+    'make_soup',
+    'fetch_soups',
     'save_to_csv',
     'append_to_csv',
     'load_global_team_mapping',
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+DB Rows
+=======
+המרת נתונים גזורים (dicts של scraper) לשורות לפי הסכמה ב-'DB SCHEMA SUPA.txt'
+משותף ל-warehouse המקומי (SQLite) ול-uploaders של Supabase
+"""
+
+from datetime import datetime
+
+# מפתח ראשי לכל טבלה, לפי סדר התלויות (טבלה מופיעה אחרי הטבלאות שהיא מפנה אליהן)
+PRIMARY_KEYS = {
+    'leagues': ('league_id',),
+    'teams': ('team_id', 'league_id'),
+    'players': ('player_id',),
+    'player_season_history': ('player_id', 'season'),
+    'games': ('game_id',),
+    'game_quarters': ('game_id', 'team_id', 'quarter'),
+    'game_player_stats': ('game_id', 'player_id'),
+    'game_team_stats': ('game_id', 'team_id')
+}
+
+# עמודות סטטיסטיקה משותפות ל-game_player_stats ול-game_team_stats
+STAT_FIELDS = [
+    'pts', 'fgm', 'fga', 'fg_pct', '2ptm', '2pta', '2pt_pct',
+    '3ptm', '3pta', '3pt_pct', 'ftm', 'fta', 'ft_pct',
+    'def', 'off', 'reb', 'ast', 'stl', 'to', 'pf', 'pfa',
+    'blk', 'blka', 'rate'
+]
+
+# עמודות נוספות ב-game_team_stats: עמודה בטבלה -> שם השדה בעמוד המשחק
+TEAM_EXTRA_FIELDS = {
+    'second_chance_pts': '2nd_chance_pts',
+    'bench_pts': 'bench_pts',
+    'fast_break_pts': 'fast_break_pts',
+    'points_in_paint': 'points_in_paint',
+    'pts_off_turnovers': 'pts_from_tov',
+    'starters_pts': 'starters_pts'
+}
+
+
+def convert_date(date_str):
+    """ממיר תאריכים לפורמט SQL (YYYY-MM-DD)"""
+    if not date_str:
+        return None
+    try:
+        if '/' in date_str:
+            return datetime.strptime(date_str, "%Y/%m/%d").strftime("%Y-%m-%d")
+        elif '-' in date_str:
+            parts = date_str.split('-')
+            if len(parts[0]) == 4:
+                return date_str
+            return datetime.strptime(date_str, "%d-%m-%Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+# ============================================
+# TEAMS / PLAYERS
+# ============================================
+
+def team_row(team_data):
+    """שורה לטבלת teams"""
+    return {
+        'team_id': int(team_data['team_id']),
+        'league_id': int(team_data['league_id']),
+        'team_name': team_data['team_name'],
+        'short_name': team_data.get('short_name', team_data['team_name']),
+        'logo_url': team_data.get('logo_url'),
+        'club_id': team_data.get('club_id'),
+        'facebook': team_data.get('facebook'),
+        'instagram': team_data.get('instagram')
+    }
+
+
+def player_row(player_data):
+    """שורה לטבלת players"""
+    return {
+        'player_id': player_data['player_id'],
+        'name': player_data['name'],
+        'current_team_id': player_data.get('current_team_id'),
+        'league_id': int(player_data['league_id']),
+        'date_of_birth': convert_date(player_data.get('date_of_birth')),
+        'height': float(player_data['height']) if player_data.get('height') else None,
+        'jersey_number': player_data.get('jersey_number'),
+        'ibba_url': f"https://ibba.co.il/Players/Profile/{player_data['player_id']}"
+    }
+
+
+def history_rows(history_data):
+    """שורות לטבלת player_season_history"""
+    return [
+        {
+            'player_id': record['player_id'],
+            'season': record['season'],
+            'team_name': record['team_name'],
+            'league_name': record['league_name'],
+            'league_id': int(record['league_id']) if record.get('league_id') else None
+        }
+        for record in history_data
+    ]
+
+
+# ============================================
+# GAMES
+# ============================================
+
+def game_row(game_data):
+    """שורה לטבלת games"""
+    return {
+        'game_id': game_data['game_id'],
+        'league_id': int(game_data['league_id']),
+        'season': game_data.get('season'),
+        'code': game_data.get('code'),
+        'date': convert_date(game_data['date']),
+        'time': game_data.get('time'),
+        'round': int(game_data['round']) if game_data.get('round') else None,
+        'home_team': game_data['home_team'],
+        'home_team_id': game_data.get('home_team_id'),
+        'away_team': game_data['away_team'],
+        'away_team_id': game_data.get('away_team_id'),
+        'venue': game_data.get('venue'),
+        'home_score': game_data.get('home_score'),
+        'away_score': game_data.get('away_score'),
+        'status': game_data.get('status', 'scheduled'),
+        'overtimes': game_data.get('overtimes', 0),
+        'close_game': game_data.get('close_game', False),
+        'winner': game_data.get('winner'),
+        'loser': game_data.get('loser')
+    }
+
+
+def quarter_rows(game_id, league_id, quarters_data):
+    """שורות לטבלת game_quarters ({team_id: [quarters]} -> שורה לכל רבע)"""
+    rows = []
+    for team_id, quarters in quarters_data.items():
+        for i, quarter in enumerate(quarters, 1):
+            rows.append({
+                'game_id': game_id,
+                'team_id': int(team_id),
+                'league_id': int(league_id),
+                'quarter': i,
+                'score': quarter['score'],
+                'score_against': quarter['score_against']
+            })
+    return rows
+
+
+def player_stat_rows(game_id, league_id, player_stats):
+    """שורות לטבלת game_player_stats"""
+    rows = []
+    for stat in player_stats:
+        row = {
+            'game_id': game_id,
+            'player_id': stat['player_id'],
+            'league_id': int(league_id),
+            'player_name': stat.get('player_name'),
+            'team': stat.get('team'),
+            'team_id': stat.get('team_id'),
+            'min': stat.get('min')
+        }
+        row.update({field: stat.get(field) for field in STAT_FIELDS})
+        row['starter'] = stat.get('starter', 0)
+        row['number'] = stat.get('number')
+        rows.append(row)
+    return rows
+
+
+def team_stat_rows(game_id, league_id, team_stats):
+    """שורות לטבלת game_team_stats"""
+    rows = []
+    for stat in team_stats:
+        row = {
+            'game_id': game_id,
+            'team_id': stat['team_id'],
+            'league_id': int(league_id),
+            'team': stat.get('team'),
+            'opponent': stat.get('opponent'),
+            'opponent_id': stat.get('opponent_id')
+        }
+        row.update({field: stat.get(field) for field in STAT_FIELDS})
+        row.update({column: stat.get(source) for column, source in TEAM_EXTRA_FIELDS.items()})
+        rows.append(row)
+    return rows
+
+
+def full_game_rows(game_data):
+    """
+    כל השורות של משחק מלא
+
+    Returns:
+        dict: {table: [rows]} עבור games, game_quarters, game_player_stats, game_team_stats
+    """
+    game_id = game_data['game_id']
+    league_id = game_data['league_id']
+    return {
+        'games': [game_row(game_data)],
+        'game_quarters': quarter_rows(game_id, league_id, game_data.get('quarters') or {}),
+        'game_player_stats': player_stat_rows(game_id, league_id, game_data.get('player_stats') or []),
+        'game_team_stats': team_stat_rows(game_id, league_id, game_data.get('team_stats') or [])
+    }
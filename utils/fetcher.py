@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Async Fetch Engine
+==================
+מנוע הורדה אסינכרוני (asyncio / aiohttp) עם הגבלת מקביליות לכל host
+- לולאת asyncio רצה ב-thread רקע, כך שאפשר לקרוא לה גם מקוד סינכרוני וגם מ-Jupyter
+- get_soup() ב-helpers נשאר עטיפה סינכרונית מעל המנוע
+- fetch_many(urls) מוריד אצווה של עמודים במקביל
+- כל בקשה עוברת דרך ה-rate limiter המשותף (Token Bucket לכל host)
+- retries עם exponential backoff וסטטיסטיקות latency משותפות עם http_session
+- Conditional GET דרך המטמון על הדיסק (http_cache), כמו ב-http_get
+"""
+
+import asyncio
+import atexit
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import SCRAPING_CONFIG
+from .rate_limiter import get_rate_limiter, parse_retry_after
+from .http_cache import get_http_cache
+from .http_session import (
+    http_get, backoff_delay, get_request_stats,
+    RETRY_STATUSES, DEFAULT_HEADERS
+)
+
+# aiohttp אופציונלי - בלעדיו ההורדות רצות ב-thread pool עם http_get (session משותף)
+try:
+    import aiohttp
+    AIOHTTP_ENABLED = True
+except ImportError:
+    AIOHTTP_ENABLED = False
+
+
+class AsyncFetchEngine:
+    """מנוע הורדה אסינכרוני עם Semaphore נפרד לכל host"""
+
+    def __init__(self, max_per_host=None, timeout=None):
+        """
+        Args:
+            max_per_host: מספר בקשות מקבילות מקסימלי לכל host
+            timeout: timeout ברירת מחדל לבקשה (שניות)
+        """
+        self.max_per_host = max_per_host or SCRAPING_CONFIG.get('max_concurrency_per_host', 4)
+        self.timeout = timeout or SCRAPING_CONFIG.get('timeout', 10)
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    # ============================================
+    # EVENT LOOP
+    # ============================================
+
+    def _ensure_loop(self):
+        """הפעלת לולאת asyncio ב-thread רקע (פעם אחת)"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='fetch-engine',
+                    daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    def _run(self, coro):
+        """הרצת coroutine בלולאת הרקע והמתנה לתוצאה"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def _semaphore(self, host):
+        """Semaphore לכל host (נקרא רק מתוך לולאת הרקע)"""
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+    # ============================================
+    # FETCHING
+    # ============================================
+
+    async def _get_session(self):
+        """session משותף של aiohttp (connection pool אחד לכל הריצה)"""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit_per_host=self.max_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+        return self._session
+
+    async def _fetch_aiohttp(self, url, timeout):
+        """הורדה עם aiohttp - rate limiting + retries עם exponential backoff"""
+        limiter = get_rate_limiter()
+        stats = get_request_stats()
+        session = await self._get_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        attempts = max(1, SCRAPING_CONFIG.get('retry_attempts', 3))
+
+        cache = get_http_cache()
+        cached = cache.lookup(url) if cache else None
+        if cached and cache.is_fresh(cached):
+            return cache.load_body(cached)
+        headers = cache.conditional_headers(cached) if cached else {}
+
+        last_error = None
+        for attempt in range(attempts):
+            await limiter.wait_async(url)
+            start = time.monotonic()
+
+            try:
+                async with session.get(url, timeout=client_timeout, headers=headers) as response:
+                    body = await response.read()
+                    status = response.status
+                    response_headers = response.headers
+                    retry_after = parse_retry_after(response_headers.get('Retry-After'))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                stats.record(url, time.monotonic() - start, None, retried=attempt > 0)
+                limiter.report(url, None)
+                last_error = e
+                if attempt < attempts - 1:
+                    await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            stats.record(url, time.monotonic() - start, status, retried=attempt > 0)
+            limiter.report(url, status, retry_after)
+
+            if status in RETRY_STATUSES and attempt < attempts - 1:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if status == 304 and cached:
+                return cache.revalidated(cached)
+            if status == 200 and cache:
+                cache.store(url, body, response_headers)
+
+            return body
+
+        raise last_error
+
+    async def _fetch(self, url, timeout):
+        """הורדת URL בודד - מחזיר bytes"""
+        host = urlparse(url).netloc
+
+        async with self._semaphore(host):
+            if AIOHTTP_ENABLED:
+                return await self._fetch_aiohttp(url, timeout)
+
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                None, lambda: http_get(url, timeout=timeout)
+            )
+            return response.content
+
+    async def _fetch_safe(self, url, timeout):
+        """הורדה עם טיפול בשגיאות - מחזיר None בכישלון"""
+        try:
+            return await self._fetch(url, timeout)
+        except Exception as e:
+            from .helpers import log_message
+            log_message(f"❌ Error fetching {url}: {e}")
+            return None
+
+    async def fetch_many_async(self, urls, timeout=None):
+        """
+        הורדת רשימת URLs במקביל (בתוך לולאת asyncio)
+
+        Returns:
+            dict: {url: bytes או None}
+        """
+        timeout = timeout or self.timeout
+        unique_urls = list(dict.fromkeys(urls))
+
+        results = await asyncio.gather(
+            *(self._fetch_safe(url, timeout) for url in unique_urls)
+        )
+        return dict(zip(unique_urls, results))
+
+    def fetch_many(self, urls, timeout=None):
+        """
+        הורדת רשימת URLs במקביל (סינכרוני)
+
+        Args:
+            urls: רשימת כתובות (כפילויות מורדות פעם אחת)
+            timeout: timeout לבקשה
+
+        Returns:
+            dict: {url: bytes או None} לפי סדר ההופעה
+        """
+        if not urls:
+            return {}
+        return self._run(self.fetch_many_async(urls, timeout))
+
+    def fetch(self, url, timeout=None):
+        """הורדת URL בודד (סינכרוני)"""
+        return self.fetch_many([url], timeout)[url]
+
+    def close(self):
+        """סגירת ה-session ועצירת לולאת הרקע"""
+        if self._loop is None:
+            return
+
+        if self._session is not None:
+            self._run(self._session.close())
+            self._session = None
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+        self._semaphores = {}
+
+
+# ============================================
+# MODULE-LEVEL ENGINE
+# ============================================
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """מנוע הורדה משותף לכל ה-scrapers"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncFetchEngine()
+    return _engine
+
+
+def fetch_many(urls, timeout=None):
+    """הורדת אצווה של URLs דרך המנוע המשותף - {url: bytes או None}"""
+    return get_engine().fetch_many(urls, timeout)
+
+
+def fetch_url(url, timeout=None):
+    """הורדת URL בודד דרך המנוע המשותף - bytes או None"""
+    return get_engine().fetch(url, timeout)
+
+
+@atexit.register
+def _close_engine():
+    if _engine is not None:
+        _engine.close()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Game Manifest
+=============
+מניפסט משחקים לעונה ב-SQLite (manifest.sqlite בתיקיית העונה):
+game_id -> revision, has_stats, status, scraped_at, checksum + מיקום השורות בטבלאות
+ושם הקובץ הנוכחי של כל טבלה (compact כותב קובץ חדש ומחליף שם + offsets ביחד)
+- כל עדכון הוא טרנזקציה אחת (אטומי, בלי לכתוב מחדש קובץ שלם)
+- כל המניפסט נטען לזיכרון פעם אחת, כך שבדיקת "יש סטטיסטיקות" היא חיפוש ב-dict
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+MANIFEST_FILE = 'manifest.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id    TEXT PRIMARY KEY,
+    rev        INTEGER NOT NULL,
+    has_stats  INTEGER NOT NULL,
+    status     TEXT,
+    scraped_at TEXT,
+    checksum   TEXT,
+    blocks     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stale_rows (
+    table_name TEXT PRIMARY KEY,
+    row_count  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS table_files (
+    table_name TEXT PRIMARY KEY,
+    file_name  TEXT NOT NULL
+);
+"""
+
+
+class GameManifest:
+    """מניפסט משחקים (thread-safe) עם עותק בזיכרון"""
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder: תיקיית העונה
+        """
+        self.path = Path(folder) / MANIFEST_FILE
+        self.lock = threading.RLock()
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+        self.games = {}
+        for game_id, rev, has_stats, status, scraped_at, checksum, blocks in self.conn.execute(
+            "SELECT game_id, rev, has_stats, status, scraped_at, checksum, blocks FROM games"
+        ):
+            self.games[game_id] = {
+                'rev': rev,
+                'has_stats': bool(has_stats),
+                'status': status,
+                'scraped_at': scraped_at,
+                'checksum': checksum,
+                'blocks': json.loads(blocks)
+            }
+        self.stale = dict(self.conn.execute("SELECT table_name, row_count FROM stale_rows"))
+        self.files = dict(self.conn.execute("SELECT table_name, file_name FROM table_files"))
+
+    @staticmethod
+    def exists(folder):
+        return (Path(folder) / MANIFEST_FILE).exists()
+
+    # ============================================
+    # LOOKUPS (מהזיכרון)
+    # ============================================
+
+    def get(self, game_id):
+        return self.games.get(game_id)
+
+    def has_stats(self, game_id):
+        entry = self.games.get(game_id)
+        return bool(entry and entry['has_stats'])
+
+    def __contains__(self, game_id):
+        return game_id in self.games
+
+    def __len__(self):
+        return len(self.games)
+
+    # ============================================
+    # UPDATES (טרנזקציה אחת לכל קריאה)
+    # ============================================
+
+    def put_many(self, entries, stale_delta=None):
+        """
+        עדכון אטומי של כמה משחקים + מוני שורות ישנות
+
+        Args:
+            entries: {game_id: entry}
+            stale_delta: {table: מספר שורות שהתיישנו}
+        """
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO games "
+                    "(game_id, rev, has_stats, status, scraped_at, checksum, blocks) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (game_id, e['rev'], int(e['has_stats']), e.get('status'),
+                         e.get('scraped_at'), e.get('checksum'), json.dumps(e['blocks']))
+                        for game_id, e in entries.items()
+                    ]
+                )
+                for table, delta in (stale_delta or {}).items():
+                    if delta:
+                        self.conn.execute(
+                            "INSERT INTO stale_rows (table_name, row_count) VALUES (?, ?) "
+                            "ON CONFLICT(table_name) DO UPDATE SET row_count = row_count + excluded.row_count",
+                            (table, delta)
+                        )
+
+            self.games.update(entries)
+            for table, delta in (stale_delta or {}).items():
+                self.stale[table] = self.stale.get(table, 0) + delta
+
+    def put(self, game_id, entry, stale_delta=None):
+        self.put_many({game_id: entry}, stale_delta)
+
+    def switch_table(self, table, file_name, entries):
+        """
+        מעבר לקובץ טבלה חדש (אחרי compact): שם הקובץ, ה-offsets של כל המשחקים
+        ואיפוס מונה השורות הישנות - בטרנזקציה אחת
+
+        Args:
+            table: שם הטבלה
+            file_name: שם קובץ ה-JSONL החדש בתיקיית העונה
+            entries: {game_id: entry} עם ה-blocks החדשים
+        """
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE games SET blocks = ? WHERE game_id = ?",
+                    [(json.dumps(e['blocks']), game_id) for game_id, e in entries.items()]
+                )
+                self.conn.execute(
+                    "INSERT INTO table_files (table_name, file_name) VALUES (?, ?) "
+                    "ON CONFLICT(table_name) DO UPDATE SET file_name = excluded.file_name",
+                    (table, file_name)
+                )
+                self.conn.execute("DELETE FROM stale_rows WHERE table_name = ?", (table,))
+
+            self.games.update(entries)
+            self.files[table] = file_name
+            self.stale[table] = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
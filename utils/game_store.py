@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Game Store
+==========
+מאגר משחקים לעונה (במקום קובץ JSON לכל משחק):
+- 4 טבלאות append-only בפורמט JSONL: games, player_stats, team_stats, quarters
+- מניפסט SQLite (game_manifest): לכל משחק revision, has_stats, checksum ומיקום (offset, length)
+  של השורות שלו בכל טבלה - בדיקת "יש סטטיסטיקות" ב-O(1) וקריאת משחק בודד בלי לסרוק
+- שמירה חוזרת של משחק מוסיפה שורות חדשות; רק הבלוקים שהמניפסט מצביע עליהם נקראים,
+  כך ששורות ישנות (או שורות משמירה שנקטעה לפני עדכון המניפסט) לא נספרות
+  ו-compact() כותב את הטבלאות לקובץ חדש כשיש יותר מדי שורות ישנות
+- read_table() / to_dataframe() לקריאה מרוכזת (ממוצעים)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from .game_manifest import GameManifest
+
+TABLES = ('games', 'player_stats', 'team_stats', 'quarters')
+
+# שדות ב-game_data שנשמרים בטבלאות נפרדות
+NESTED_FIELDS = ('player_stats', 'team_stats', 'quarters')
+
+
+class GameStore:
+    """מאגר משחקים לתיקיית עונה אחת (thread-safe)"""
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder: תיקיית העונה (data/games/<league>/<season>)
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+
+        self.manifest = GameManifest(self.folder)
+        self._remove_orphan_files()
+
+    @property
+    def games(self):
+        """{game_id: entry} - עותק המניפסט בזיכרון"""
+        return self.manifest.games
+
+    @staticmethod
+    def exists(folder):
+        """האם יש מאגר בתיקייה"""
+        return GameManifest.exists(folder)
+
+    def _table_path(self, table):
+        return self.folder / self.manifest.files.get(table, f"{table}.jsonl")
+
+    def _remove_orphan_files(self):
+        """מחיקת קבצי טבלה שהמניפסט לא מצביע עליהם (compact שנקטע לפני/אחרי המעבר)"""
+        for table in TABLES:
+            current = self._table_path(table).name
+            for path in self.folder.glob(f"{table}.*jsonl"):
+                if path.name != current:
+                    path.unlink()
+
+    def _next_table_file(self, table):
+        """שם קובץ חדש לטבלה: player_stats.jsonl -> player_stats.1.jsonl -> player_stats.2.jsonl"""
+        parts = self._table_path(table).name.split('.')
+        generation = int(parts[1]) + 1 if len(parts) == 3 and parts[1].isdigit() else 1
+        return f"{table}.{generation}.jsonl"
+
+    # ============================================
+    # WRITE
+    # ============================================
+
+    @staticmethod
+    def _split_game(game_data):
+        """פירוק game_data לשורות לכל טבלה"""
+        game_id = game_data['game_id']
+        game_row = {k: v for k, v in game_data.items() if k not in NESTED_FIELDS}
+
+        quarters = []
+        for team_id, team_quarters in (game_data.get('quarters') or {}).items():
+            for q in team_quarters:
+                quarters.append({'game_id': game_id, 'team_id': team_id, **q})
+
+        return {
+            'games': [game_row],
+            'player_stats': [{'game_id': game_id, **row} for row in game_data.get('player_stats') or []],
+            'team_stats': [{'game_id': game_id, **row} for row in game_data.get('team_stats') or []],
+            'quarters': quarters
+        }
+
+    @staticmethod
+    def checksum(game_data):
+        """checksum של תוכן המשחק (בלי scraped_at) - לזיהוי משחק שלא השתנה"""
+        content = {k: v for k, v in game_data.items() if k != 'scraped_at'}
+        payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def save_game(self, game_data):
+        """
+        שמירת משחק (מחליף גרסה קודמת של אותו משחק)
+        השורות נוספות לטבלאות, ואז המניפסט מתעדכן בטרנזקציה אחת
+
+        Args:
+            game_data: dict של משחק (כמו שנבנה ב-_scrape_single_game)
+        """
+        self.save_games([game_data])
+
+    def save_games(self, games):
+        """שמירת כמה משחקים עם עדכון מניפסט אחד"""
+        with self.lock:
+            entries = {}
+            stale_delta = {}
+
+            for game_data in games:
+                game_id = game_data['game_id']
+                previous = entries.get(game_id) or self.games.get(game_id)
+                rev = previous['rev'] + 1 if previous else 1
+
+                blocks = {}
+                for table, rows in self._split_game(game_data).items():
+                    if not rows:
+                        continue
+                    payload = "".join(
+                        json.dumps({**row, '_rev': rev}, ensure_ascii=False) + "\n" for row in rows
+                    ).encode('utf-8')
+
+                    with open(self._table_path(table), 'ab') as f:
+                        offset = f.tell()
+                        f.write(payload)
+                    blocks[table] = [offset, len(payload), len(rows)]
+
+                if previous:
+                    for table, block in previous['blocks'].items():
+                        stale_delta[table] = stale_delta.get(table, 0) + block[2]
+
+                entries[game_id] = {
+                    'rev': rev,
+                    'has_stats': bool(game_data.get('player_stats')),
+                    'status': game_data.get('status'),
+                    'scraped_at': game_data.get('scraped_at'),
+                    'checksum': self.checksum(game_data),
+                    'blocks': blocks
+                }
+
+            if entries:
+                self.manifest.put_many(entries, stale_delta)
+
+    # ============================================
+    # READ
+    # ============================================
+
+    def has_stats(self, game_id):
+        """האם למשחק יש סטטיסטיקות שחקנים (O(1), בלי לקרוא את הטבלאות)"""
+        return self.manifest.has_stats(game_id)
+
+    def __contains__(self, game_id):
+        return game_id in self.games
+
+    def __len__(self):
+        return len(self.games)
+
+    def game_ids(self):
+        return list(self.games)
+
+    def _read_block(self, table, block):
+        offset, length, _ = block
+        with open(self._table_path(table), 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        rows = []
+        for line in data.decode('utf-8').splitlines():
+            row = json.loads(line)
+            row.pop('_rev', None)
+            rows.append(row)
+        return rows
+
+    def load_game(self, game_id):
+        """
+        טעינת משחק בודד במבנה המקורי (player_stats/team_stats/quarters מקוננים)
+
+        Returns:
+            dict או None
+        """
+        entry = self.manifest.get(game_id)
+        if entry is None:
+            return None
+        blocks = dict(entry['blocks'])
+
+        game_data = self._read_block('games', blocks['games'])[0]
+
+        for table in ('player_stats', 'team_stats'):
+            if table in blocks:
+                rows = self._read_block(table, blocks[table])
+                game_data[table] = [{k: v for k, v in row.items() if k != 'game_id'} for row in rows]
+
+        if 'quarters' in blocks:
+            quarters = {}
+            for row in self._read_block('quarters', blocks['quarters']):
+                team_id = str(row.pop('team_id'))
+                row.pop('game_id', None)
+                quarters.setdefault(team_id, []).append(row)
+            game_data['quarters'] = quarters
+
+        return game_data
+
+    def read_table(self, table):
+        """
+        כל השורות העדכניות של טבלה - הבלוקים מהמניפסט, לפי סדר ה-offset (קריאה קדימה אחת)
+
+        Args:
+            table: אחת מ-TABLES
+
+        Returns:
+            list של dicts
+        """
+        rows = []
+        with self.lock:
+            path = self._table_path(table)
+            if not path.exists():
+                return []
+
+            blocks = sorted(entry['blocks'][table] for entry in self.games.values() if table in entry['blocks'])
+            with open(path, 'rb') as f:
+                for offset, length, _ in blocks:
+                    f.seek(offset)
+                    for line in f.read(length).decode('utf-8').splitlines():
+                        row = json.loads(line)
+                        row.pop('_rev', None)
+                        rows.append(row)
+        return rows
+
+    def to_dataframe(self, table):
+        """טבלה כ-DataFrame"""
+        import pandas as pd
+        return pd.DataFrame(self.read_table(table))
+
+    # ============================================
+    # MAINTENANCE
+    # ============================================
+
+    def compact(self, min_stale_ratio=0.5):
+        """
+        כתיבה מחדש של טבלאות שרוב השורות בהן ישנות
+
+        Returns:
+            list: הטבלאות שנכתבו מחדש
+        """
+        compacted = []
+        with self.lock:
+            for table in TABLES:
+                live = sum(e['blocks'][table][2] for e in self.games.values() if table in e['blocks'])
+                stale = self.manifest.stale.get(table, 0)
+                if not stale or stale < (live + stale) * min_stale_ratio:
+                    continue
+
+                path = self._table_path(table)
+                new_path = self.folder / self._next_table_file(table)
+                updated = {}
+                with open(path, 'rb') as src, open(new_path, 'wb') as out:
+                    for game_id, entry in self.games.items():
+                        if table not in entry['blocks']:
+                            continue
+                        offset, length, count = entry['blocks'][table]
+                        src.seek(offset)
+                        new_offset = out.tell()
+                        out.write(src.read(length))
+                        updated[game_id] = {
+                            **entry,
+                            'blocks': {**entry['blocks'], table: [new_offset, length, count]}
+                        }
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                # שם הקובץ וה-offsets מתחלפים ביחד; קריסה לפני כן משאירה את הקובץ הישן בתוקף
+                self.manifest.switch_table(table, new_path.name, updated)
+                path.unlink()
+                compacted.append(table)
+
+        return compacted
+
+    def import_legacy_json(self):
+        """
+        ייבוא קבצי <game_id>.json ישנים שעוד לא במאגר (הקבצים עצמם לא נמחקים)
+
+        Returns:
+            int: מספר המשחקים שיובאו
+        """
+        legacy_games = []
+        with self.lock:
+            for path in sorted(self.folder.glob('*.json')):
+                game_id = path.stem
+                if game_id == 'schedule' or game_id in self.games:
+                    continue
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        game_data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if not isinstance(game_data, dict) or game_data.get('game_id') != game_id:
+                    continue
+                legacy_games.append(game_data)
+
+            self.save_games(legacy_games)
+        return len(legacy_games)
@@ -5,35 +5,113 @@ Helper Functions - FINAL FIXED
 פונקציות עזר: עם מפתח מורכב (variation, league_id)
 """
 
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
+from config import SCRAPING_CONFIG
+from .fetcher import fetch_url, fetch_many
+from .team_mapping import get_team_mapping
+
+# lxml אופציונלי - פרסור מהיר פי כמה מ-html.parser בעמודי משחק גדולים
+try:
+    import lxml  # noqa: F401
+    LXML_ENABLED = True
+except ImportError:
+    LXML_ENABLED = False
+
 LOG_FILE = "logs/update_log.txt"
 
+# כתיבה ל-log מכמה threads (ליגות במקביל)
+_log_lock = threading.Lock()
+_log_local = threading.local()
+
 def log_message(message, league_id=None):
+    # בתוך league_log() שורה בלי ליגה מקבלת את הקידומת של הליגה שרצה ב-thread
+    if not league_id:
+        league_id = getattr(_log_local, 'league', None)
+
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     if league_id:
         log_entry = f"[{timestamp}] [{league_id.upper()}] {message}"
     else:
         log_entry = f"[{timestamp}] {message}"
-    print(log_entry)
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
-        f.write(log_entry + "\n")
 
-def get_soup(url, timeout=10):
+    _write_log_lines([log_entry])
+
+def _write_log_lines(lines):
+    """הדפסה + כתיבה לקובץ ה-log (תחת נעילה)"""
+    with _log_lock:
+        for line in lines:
+            print(line)
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write("".join(line + "\n" for line in lines))
+
+@contextmanager
+def league_log(league_code):
+    """
+    כל שורות ה-log של ה-thread הנוכחי מקבלות קידומת של הליגה ונכתבות מיד
+    (ליגות שרצות במקביל: התקדמות חיה, וקריסה לא מאבדת את ה-log; grep לפי [CODE])
+    """
+    previous = getattr(_log_local, 'league', None)
+    _log_local.league = league_code
     try:
-        response = requests.get(url, timeout=timeout)
-        response.encoding = 'utf-8'
-        return BeautifulSoup(response.content, 'html.parser')
+        yield
+    finally:
+        _log_local.league = previous
+
+def bind_log_context(func):
+    """
+    עטיפת פונקציה שתרוץ ב-thread עובד כך שה-log שלה יקבל
+    את קידומת הליגה של ה-thread הקורא (אם יש כזו)
+    """
+    league = getattr(_log_local, 'league', None)
+
+    def wrapper(*args, **kwargs):
+        previous = getattr(_log_local, 'league', None)
+        _log_local.league = league
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _log_local.league = previous
+    return wrapper
+
+def get_html_parser():
+    """ה-parser של BeautifulSoup לפי SCRAPING_CONFIG['html_parser'] (fallback ל-html.parser)"""
+    parser = SCRAPING_CONFIG.get('html_parser', 'html.parser')
+    if parser == 'lxml' and not LXML_ENABLED:
+        return 'html.parser'
+    return parser
+
+def make_soup(content, url=None):
+    """פרסור תוכן שהורד ל-BeautifulSoup - None בכישלון"""
+    if content is None:
+        return None
+    try:
+        return BeautifulSoup(content, get_html_parser())
     except Exception as e:
-        log_message(f"❌ Error fetching {url}: {e}")
+        log_message(f"❌ Error parsing {url}: {e}")
         return None
 
+def get_soup(url, timeout=10):
+    """הורדת עמוד והחזרת BeautifulSoup - עטיפה סינכרונית מעל מנוע ההורדה"""
+    return make_soup(fetch_url(url, timeout=timeout), url)
+
+def fetch_soups(urls, timeout=10):
+    """
+    הורדת אצווה של עמודים במקביל
+    מחזיר {url: BeautifulSoup או None}
+    """
+    return {
+        url: make_soup(content, url)
+        for url, content in fetch_many(urls, timeout=timeout).items()
+    }
+
 def save_to_csv(data, filepath, columns=None):
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     df = pd.DataFrame(data)
@@ -91,95 +169,26 @@ def load_global_team_mapping():
     """
     טעינת מיפוי קבוצות גלובלי
     ⭐ משתמש במפתח מורכב: (variation, league_id)
+    המיפוי משותף לכל התהליך ונקרא מהדיסק רק כש-teams.csv משתנה (utils/team_mapping.py)
     """
-    teams_file = "data/teams.csv"
+    service = get_team_mapping()
     
     try:
-        if not os.path.exists(teams_file):
-            log_message(f"⚠️  Global teams mapping file not found: {teams_file}")
-            return {}
-        
-        df = pd.read_csv(teams_file, encoding='utf-8-sig')
-        columns = df.columns.tolist()
-        
-        # זיהוי עמודות
-        column_mapping = {
-            'team_id': ['Team_ID', 'team_id', 'TeamID'],
-            'league_id': ['League_ID', 'league_id', 'LeagueID'],
-            'club_name': ['Team_Name', 'club_name', 'team_name', 'name'],
-            'short_name': ['short_name', 'ShortName'],
-            'variations': ['name_variations', 'variations', 'Variations'],
-            'bg_color': ['bg_color', 'BgColor'],
-            'text_color': ['text_color', 'TextColor']
-        }
-        
-        actual_columns = {}
-        for key, possible_names in column_mapping.items():
-            for name in possible_names:
-                if name in columns:
-                    actual_columns[key] = name
-                    break
-        
-        # יצירת מיפוי עם מפתח מורכב
-        mapping = {}
-        teams_count = 0
-        
-        for _, row in df.iterrows():
-            team_id = row[actual_columns['team_id']] if 'team_id' in actual_columns else None
-            league_id = row[actual_columns['league_id']] if 'league_id' in actual_columns else None
-            club_name = row[actual_columns['club_name']] if 'club_name' in actual_columns else None
-            
-            if pd.isna(team_id) or pd.isna(league_id) or pd.isna(club_name):
-                continue
-            
-            try:
-                league_id_int = int(league_id)
-                if league_id_int == 0:
-                    continue
-            except:
-                continue
-            
-            teams_count += 1
-            
-            variations = row[actual_columns['variations']] if 'variations' in actual_columns else club_name
+        if service.refresh():
+            if not service.exists:
+                log_message(f"⚠️  Global teams mapping file not found: {service.path}")
+                return {}
             
-            import html
-            club_name = html.unescape(str(club_name)).strip()
-            variations_str = html.unescape(str(variations)).strip()
+            mapping = service.by_variation
+            log_message(f"✅ Loaded global team mapping: {len(service.by_team_id)} teams, {len(mapping)} name variations")
             
-            variation_list = []
-            for v in variations_str.split('|'):
-                v_clean = html.unescape(v.strip())
-                if v_clean:
-                    variation_list.append(v_clean)
-            
-            team_info = {
-                'team_id': int(team_id) if pd.notna(team_id) else None,
-                'league_id': int(league_id_int),
-                'club_name': club_name,
-                'short_name': row[actual_columns['short_name']] if 'short_name' in actual_columns else club_name,
-                'bg_color': row[actual_columns['bg_color']] if 'bg_color' in actual_columns else '#000000',
-                'text_color': row[actual_columns['text_color']] if 'text_color' in actual_columns else '#FFFFFF',
-                'all_variations': variation_list
-            }
-            
-            # ⭐ מפתח מורכב: (variation, league_id)
-            for variation in variation_list:
-                if variation:
-                    key = (variation, int(league_id_int))
-                    if key not in mapping:
-                        mapping[key] = team_info
-        
-        total_variations = len(mapping)
-        log_message(f"✅ Loaded global team mapping: {teams_count} teams, {total_variations} name variations")
+            # Debug מפורט
+            league_1_keys = [k for k in mapping.keys() if k[1] == 1]
+            if league_1_keys:
+                unique_teams_l1 = len(set(mapping[k]['team_id'] for k in league_1_keys))
+                log_message(f"   League 1: {unique_teams_l1} teams, {len(league_1_keys)} variations")
         
-        # Debug מפורט
-        league_1_keys = [k for k in mapping.keys() if k[1] == 1]
-        if league_1_keys:
-            unique_teams_l1 = len(set(mapping[k]['team_id'] for k in league_1_keys))
-            log_message(f"   League 1: {unique_teams_l1} teams, {len(league_1_keys)} variations")
-        
-        return mapping
+        return service.by_variation
         
     except Exception as e:
         log_message(f"⚠️  Error loading global team mapping: {e}")
@@ -217,8 +226,21 @@ def normalize_team_name_global(team_name, league_id, team_mapping):
     if key_stripped in team_mapping:
         return team_mapping[key_stripped]
     
-    # לא נמצא
-    log_message(f"   ⚠️  No mapping found for: '{team_name}' in league {league_id}")
+    # אינדקס הזיהוי (גרשיים / רווחים / ספונסר / שם חתוך / התאמה מקורבת) - רק למיפוי המשותף
+    service = get_team_mapping()
+    if team_mapping is service.by_variation:
+        index = service.index
+        team_info, method = index.resolve(team_name, league_id_int)
+        if index.first_report(team_name, league_id_int):
+            if team_info:
+                log_message(f"   🔎 Resolved '{team_name}' → '{team_info['club_name']}' in league {league_id} ({method})")
+            else:
+                log_message(f"   ⚠️  No mapping found for: '{team_name}' in league {league_id}")
+        if team_info:
+            return team_info
+    else:
+        # לא נמצא
+        log_message(f"   ⚠️  No mapping found for: '{team_name}' in league {league_id}")
     
     return {
         'team_id': None,
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP Cache
+==========
+מטמון תגובות HTTP על הדיסק (לפי URL) עם Conditional GET:
+- גוף התגובה נשמר דחוס (gzip) תחת data/http_cache/
+- בבקשה הבאה נשלחים If-None-Match / If-Modified-Since, ו-304 מוגש מהמטמון
+- TTL (ttl_days) + פינוי לפי גודל כולל (max_size_mb, הכי פחות בשימוש יוצא ראשון)
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from config import SCRAPING_CONFIG
+
+# כל כמה שינויים לשמור את האינדקס לדיסק
+INDEX_FLUSH_EVERY = 50
+
+
+class HttpCache:
+    """מטמון HTTP על הדיסק (thread-safe)"""
+
+    def __init__(self, folder='data/http_cache', ttl_days=14, max_size_mb=200, fresh_minutes=0):
+        """
+        Args:
+            folder: תיקיית המטמון
+            ttl_days: אחרי כמה ימים רשומה נמחקת גם אם לא השתנתה
+            max_size_mb: גודל מקסימלי (דחוס) לכל המטמון
+            fresh_minutes: בתוך חלון זה מגישים מהמטמון בלי לפנות לשרת (0 = תמיד לאמת)
+        """
+        self.folder = Path(folder)
+        self.ttl = ttl_days * 86400
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.fresh = fresh_minutes * 60
+
+        self.index_path = self.folder / 'index.json'
+        self.lock = threading.RLock()
+        self.pending = 0
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.index = self._load_index()
+        self.total_size = sum(entry.get('size', 0) for entry in self.index.values())
+
+    # ============================================
+    # INDEX
+    # ============================================
+
+    def _load_index(self):
+        """טעינת אינדקס המטמון"""
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def flush(self):
+        """שמירת האינדקס לדיסק (כתיבה אטומית)"""
+        with self.lock:
+            if not self.pending:
+                return
+            tmp_path = self.index_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+            self.pending = 0
+
+    def _changed(self):
+        self.pending += 1
+        if self.pending >= INDEX_FLUSH_EVERY:
+            self.flush()
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key):
+        return self.folder / key[:2] / f"{key}.gz"
+
+    # ============================================
+    # LOOKUP
+    # ============================================
+
+    def lookup(self, url):
+        """
+        חיפוש רשומה במטמון
+
+        Returns:
+            dict או None (רשומה שפג תוקפה נמחקת)
+        """
+        key = self._key(url)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+
+            if time.time() - entry['stored_at'] > self.ttl or not self._body_path(key).exists():
+                self._remove(key)
+                return None
+
+            return dict(entry, key=key)
+
+    def is_fresh(self, entry):
+        """האם אפשר להגיש בלי לפנות לשרת"""
+        return self.fresh > 0 and time.time() - entry['validated_at'] < self.fresh
+
+    @staticmethod
+    def conditional_headers(entry):
+        """headers של Conditional GET לרשומה"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def load_body(self, entry):
+        """קריאת הגוף (לא דחוס) של רשומה - מעדכן זמן שימוש"""
+        with open(self._body_path(entry['key']), 'rb') as f:
+            body = gzip.decompress(f.read())
+
+        with self.lock:
+            if entry['key'] in self.index:
+                self.index[entry['key']]['accessed_at'] = time.time()
+        return body
+
+    def revalidated(self, entry):
+        """השרת החזיר 304 - הרשומה עדיין תקפה"""
+        with self.lock:
+            if entry['key'] in self.index:
+                self.index[entry['key']]['validated_at'] = time.time()
+                self._changed()
+        return self.load_body(entry)
+
+    # ============================================
+    # STORE / EVICT
+    # ============================================
+
+    def store(self, url, body, headers):
+        """
+        שמירת תגובת 200 במטמון
+
+        Args:
+            url: הכתובת
+            body: גוף התגובה (bytes)
+            headers: headers של התגובה (ETag / Last-Modified)
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+
+        # בלי validators אין טעם לשמור (אלא אם מגישים מהמטמון בלי אימות)
+        if not etag and not last_modified and not self.fresh:
+            return
+
+        key = self._key(url)
+        compressed = gzip.compress(body)
+        body_path = self._body_path(key)
+        body_path.parent.mkdir(exist_ok=True)
+
+        with self.lock:
+            tmp_path = body_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, body_path)
+
+            old = self.index.get(key)
+            if old:
+                self.total_size -= old.get('size', 0)
+
+            now = time.time()
+            self.index[key] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': len(compressed),
+                'stored_at': now,
+                'validated_at': now,
+                'accessed_at': now
+            }
+            self.total_size += len(compressed)
+            self._changed()
+
+            if self.total_size > self.max_bytes:
+                self._evict()
+
+    def _remove(self, key):
+        entry = self.index.pop(key, None)
+        if entry:
+            self.total_size -= entry.get('size', 0)
+            self._changed()
+        try:
+            self._body_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """פינוי הרשומות הכי פחות בשימוש עד 90% מהגודל המקסימלי"""
+        target = self.max_bytes * 0.9
+        for key, _ in sorted(self.index.items(), key=lambda item: item[1]['accessed_at']):
+            if self.total_size <= target:
+                break
+            self._remove(key)
+
+    def prune(self):
+        """מחיקת כל הרשומות שפג תוקפן"""
+        now = time.time()
+        with self.lock:
+            expired = [key for key, entry in self.index.items() if now - entry['stored_at'] > self.ttl]
+            for key in expired:
+                self._remove(key)
+        return len(expired)
+
+
+# ============================================
+# MODULE-LEVEL CACHE
+# ============================================
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """המטמון המשותף, או None אם הוא מבוטל ב-SCRAPING_CONFIG"""
+    global _cache
+    settings = SCRAPING_CONFIG.get('http_cache', {})
+    if not settings.get('enabled', False):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(
+                folder=settings.get('folder', 'data/http_cache'),
+                ttl_days=settings.get('ttl_days', 14),
+                max_size_mb=settings.get('max_size_mb', 200),
+                fresh_minutes=settings.get('fresh_minutes', 0)
+            )
+            _cache.prune()
+    return _cache
+
+
+@atexit.register
+def _flush_cache():
+    if _cache is not None:
+        _cache.flush()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP Session Layer
+==================
+שכבת HTTP משותפת לכל ה-scrapers:
+- requests.Session אחד ברמת המודול עם connection pool (keep-alive, בלי TLS handshake לכל בקשה)
+- retries עם exponential backoff לפי SCRAPING_CONFIG['retry_attempts']
+- סטטיסטיקות latency לכל host
+- Conditional GET דרך המטמון על הדיסק (http_cache) - 304 מוגש מהמטמון
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import SCRAPING_CONFIG
+from .rate_limiter import get_rate_limiter, parse_retry_after
+from .http_cache import get_http_cache
+
+# סטטוסים שמצדיקים ניסיון נוסף
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; BasketballScraper/1.0)'
+}
+
+
+# ============================================
+# POOLED SESSION
+# ============================================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """requests.Session משותף עם connection pool"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = SCRAPING_CONFIG.get('http_pool_size', 16)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+def backoff_delay(attempt):
+    """
+    זמן המתנה לפני ניסיון חוזר (exponential backoff + jitter)
+
+    Args:
+        attempt: מספר הניסיון שנכשל (0 = הראשון)
+    """
+    base = SCRAPING_CONFIG.get('retry_backoff', 0.5)
+    return base * (2 ** attempt) + random.uniform(0, base)
+
+
+# ============================================
+# REQUEST STATS
+# ============================================
+
+class RequestStats:
+    """איסוף latency ותוצאות בקשות לכל host (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def record(self, url, latency, status=None, retried=False):
+        """
+        רישום בקשה בודדת
+
+        Args:
+            url: הכתובת
+            latency: זמן הבקשה בשניות
+            status: HTTP status (None = שגיאת רשת)
+            retried: האם זה ניסיון חוזר
+        """
+        host = urlparse(url).netloc
+        with self.lock:
+            entry = self.hosts.setdefault(
+                host, {'latencies': [], 'errors': 0, 'retries': 0, 'not_modified': 0}
+            )
+            entry['latencies'].append(latency)
+            if status is None or status >= 400:
+                entry['errors'] += 1
+            elif status == 304:
+                entry['not_modified'] += 1
+            if retried:
+                entry['retries'] += 1
+
+    def summary(self):
+        """{host: {requests, errors, retries, not_modified, avg_ms, p50_ms, p95_ms}}"""
+        result = {}
+        with self.lock:
+            for host, entry in self.hosts.items():
+                latencies = sorted(entry['latencies'])
+                if not latencies:
+                    continue
+                count = len(latencies)
+                result[host] = {
+                    'requests': count,
+                    'errors': entry['errors'],
+                    'retries': entry['retries'],
+                    'not_modified': entry['not_modified'],
+                    'avg_ms': round(sum(latencies) / count * 1000),
+                    'p50_ms': round(latencies[count // 2] * 1000),
+                    'p95_ms': round(latencies[min(count - 1, int(count * 0.95))] * 1000)
+                }
+        return result
+
+    def summary_lines(self):
+        """שורות סיכום ל-log"""
+        return [
+            f"⏱️  {host}: {s['requests']} requests | avg {s['avg_ms']}ms | "
+            f"p50 {s['p50_ms']}ms | p95 {s['p95_ms']}ms | "
+            f"304: {s['not_modified']} | retries: {s['retries']} | errors: {s['errors']}"
+            for host, s in self.summary().items()
+        ]
+
+
+_stats = RequestStats()
+
+
+def get_request_stats():
+    """אובייקט הסטטיסטיקות המשותף"""
+    return _stats
+
+
+# ============================================
+# GET WITH RETRIES
+# ============================================
+
+def _cached_response(url, body):
+    """requests.Response סינתטי (200) עם גוף מהמטמון"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    return response
+
+
+def http_get(url, timeout=None, **kwargs):
+    """
+    GET דרך ה-session המשותף, עם rate limiting ו-retries
+
+    Args:
+        url: כתובת
+        timeout: timeout לבקשה (ברירת מחדל מ-SCRAPING_CONFIG)
+        **kwargs: פרמטרים נוספים ל-session.get (headers וכו')
+
+    Returns:
+        requests.Response - התגובה האחרונה (גם אם הסטטוס שגוי); 304 מוחזר כ-200 מהמטמון
+
+    Raises:
+        requests.RequestException - אם כל הניסיונות נכשלו בשגיאת רשת
+    """
+    timeout = timeout or SCRAPING_CONFIG.get('timeout', 10)
+    attempts = max(1, SCRAPING_CONFIG.get('retry_attempts', 3))
+    limiter = get_rate_limiter()
+    session = get_session()
+
+    cache = get_http_cache()
+    cached = cache.lookup(url) if cache else None
+    if cached and cache.is_fresh(cached):
+        return _cached_response(url, cache.load_body(cached))
+
+    if cached:
+        kwargs['headers'] = {**cache.conditional_headers(cached), **kwargs.get('headers', {})}
+
+    last_error = None
+    for attempt in range(attempts):
+        limiter.wait(url)
+        start = time.monotonic()
+
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            _stats.record(url, time.monotonic() - start, None, retried=attempt > 0)
+            limiter.report(url, None)
+            last_error = e
+            if attempt < attempts - 1:
+                time.sleep(backoff_delay(attempt))
+            continue
+
+        _stats.record(url, time.monotonic() - start, response.status_code, retried=attempt > 0)
+        limiter.report(url, response.status_code,
+                       parse_retry_after(response.headers.get('Retry-After')))
+
+        if response.status_code in RETRY_STATUSES and attempt < attempts - 1:
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code == 304 and cached:
+            return _cached_response(url, cache.revalidated(cached))
+        if response.status_code == 200 and cache:
+            cache.store(url, response.content, response.headers)
+
+        return response
+
+    raise last_error
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Rate Limiter
+============
+הגבלת קצב בקשות לכל אתר (host) בשיטת Token Bucket
+- קצב בסיסי + burst מוגדרים ב-SCRAPING_CONFIG['rate_limits']
+- backoff אדפטיבי: 429/5xx מורידים את הקצב, הצלחות מחזירות אותו בהדרגה
+- כל ההמתנות עוברות דרך ה-limiter, כך שהקצב בפועל מדיד (stats)
+"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import SCRAPING_CONFIG
+
+# סטטוסים שמפעילים backoff
+BACKOFF_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token Bucket לאתר בודד (thread-safe)"""
+
+    def __init__(self, rate, burst, min_rate=None):
+        """
+        Args:
+            rate: קצב בסיסי (בקשות לשנייה)
+            burst: מספר בקשות מקסימלי ברצף
+            min_rate: קצב מינימלי אחרי backoff
+        """
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else self.base_rate / 8
+        self.burst = float(burst)
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+        # סטטיסטיקות
+        self.requests = 0
+        self.total_wait = 0.0
+        self.backoffs = 0
+        self.last_penalty = None
+        self.first_request = None
+        self.last_request = None
+
+    def reserve(self):
+        """
+        שמירת token לבקשה הבאה
+
+        Returns:
+            float: כמה שניות להמתין לפני שליחת הבקשה
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+            self.requests += 1
+            self.total_wait += wait
+            if self.first_request is None:
+                self.first_request = now + wait
+            self.last_request = now + wait
+
+            return wait
+
+    def penalize(self, retry_after=None):
+        """הורדת קצב אחרי 429/5xx (multiplicative decrease)"""
+        with self.lock:
+            # כמה תגובות שגויות מאותו burst נספרות כ-backoff אחד
+            now = time.monotonic()
+            if self.last_penalty is None or now - self.last_penalty >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.backoffs += 1
+                self.last_penalty = now
+
+            # ריקון ה-bucket + כיבוד Retry-After
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.tokens -= retry_after * self.rate
+
+    def reward(self):
+        """החזרת הקצב בהדרגה אחרי הצלחה (additive increase)"""
+        with self.lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+    def stats(self):
+        """סטטיסטיקות לאתר"""
+        with self.lock:
+            elapsed = 0.0
+            if self.first_request is not None and self.last_request is not None:
+                elapsed = self.last_request - self.first_request
+
+            effective_rate = (self.requests - 1) / elapsed if elapsed > 0 else 0.0
+
+            return {
+                'requests': self.requests,
+                'total_wait': round(self.total_wait, 2),
+                'backoffs': self.backoffs,
+                'current_rate': round(self.rate, 2),
+                'effective_rate': round(effective_rate, 2)
+            }
+
+
+class HostRateLimiter:
+    """מאגר Token Buckets לפי host"""
+
+    def __init__(self, limits=None):
+        """
+        Args:
+            limits: {host: {'rate': ..., 'burst': ...}} - ברירת מחדל מ-SCRAPING_CONFIG
+        """
+        self.limits = limits if limits is not None else SCRAPING_CONFIG.get('rate_limits', {})
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _host(url):
+        """host מנורמל (ללא www.)"""
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def _bucket(self, host):
+        """Token Bucket ל-host (נוצר בפעם הראשונה)"""
+        with self.lock:
+            if host not in self.buckets:
+                delay = SCRAPING_CONFIG.get('delay_between_requests', 1) or 1
+                default = self.limits.get('default', {'rate': 1.0 / delay, 'burst': 1})
+                limit = self.limits.get(host, default)
+
+                self.buckets[host] = TokenBucket(
+                    rate=limit.get('rate', default['rate']),
+                    burst=limit.get('burst', default.get('burst', 1)),
+                    min_rate=limit.get('min_rate')
+                )
+            return self.buckets[host]
+
+    def wait(self, url):
+        """המתנה (חוסמת) עד שמותר לשלוח בקשה ל-url"""
+        wait = self._bucket(self._host(url)).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def wait_async(self, url):
+        """המתנה אסינכרונית עד שמותר לשלוח בקשה ל-url"""
+        wait = self._bucket(self._host(url)).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def report(self, url, status, retry_after=None):
+        """
+        דיווח על תוצאת בקשה - מפעיל backoff אדפטיבי
+
+        Args:
+            url: הכתובת שנשלחה
+            status: HTTP status (או None בשגיאת רשת)
+            retry_after: ערך Retry-After בשניות (אם התקבל)
+        """
+        bucket = self._bucket(self._host(url))
+        if status in BACKOFF_STATUSES:
+            bucket.penalize(retry_after)
+        elif status is not None and status < 400:
+            bucket.reward()
+
+    def stats(self):
+        """{host: stats} לכל האתרים"""
+        with self.lock:
+            hosts = list(self.buckets.items())
+        return {host: bucket.stats() for host, bucket in hosts}
+
+    def summary_lines(self):
+        """שורות סיכום ל-log"""
+        lines = []
+        for host, s in self.stats().items():
+            lines.append(
+                f"🌐 {host}: {s['requests']} requests | "
+                f"{s['effective_rate']} req/s effective | "
+                f"waited {s['total_wait']}s | backoffs: {s['backoffs']}"
+            )
+        return lines
+
+
+def parse_retry_after(value):
+    """המרת header של Retry-After לשניות (רק הפורמט המספרי)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# ============================================
+# MODULE-LEVEL LIMITER
+# ============================================
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """limiter משותף לכל ה-scrapers"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = HostRateLimiter()
+    return _limiter
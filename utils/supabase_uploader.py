@@ -2,8 +2,16 @@
 from supabase import create_client
 from datetime import datetime
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from config import SCRAPING_CONFIG
+from .db_rows import (
+    PRIMARY_KEYS, convert_date, team_row, player_row, history_rows,
+    game_row, quarter_rows, player_stat_rows, team_stat_rows, full_game_rows
+)
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv('SUPABASE_URL')
@@ -11,65 +19,212 @@ SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# מקסימום שורות לבקשת upsert אחת
+BATCH_SIZE = SCRAPING_CONFIG.get('supabase_batch_size', 500)
+
+# שורות לעמוד ב-select (PostgREST חותך תשובה אחת ב-max-rows, ברירת מחדל 1000)
+PAGE_SIZE = 1000
+
 # === פונקציות עזר ===
 
-def convert_date(date_str):
-    """ממיר תאריכים לפורמט SQL"""
-    if not date_str:
-        return None
-    try:
-        if '/' in date_str:
-            return datetime.strptime(date_str, "%Y/%m/%d").strftime("%Y-%m-%d")
-        elif '-' in date_str:
-            parts = date_str.split('-')
-            if len(parts[0]) == 4:
-                return date_str
-            return datetime.strptime(date_str, "%d-%m-%Y").strftime("%Y-%m-%d")
-    except:
-        return None
+def _stamp(rows):
+    """הוספת updated_at לכל שורה"""
+    now = datetime.now().isoformat()
+    return [{**row, 'updated_at': now} for row in rows]
+
+
+def _dedupe(table, rows):
+    """
+    שורה אחת לכל מפתח ראשי (האחרונה קובעת, כמו upsert שורה-שורה)
+    Postgres דוחה upsert שמעדכן את אותה שורה פעמיים באותה בקשה
+    """
+    pk = PRIMARY_KEYS.get(table)
+    if not pk:
+        return rows
+    unique = {}
+    for row in rows:
+        unique[tuple(row.get(col) for col in pk)] = row
+    return list(unique.values())
+
+
+def upsert_rows(table, rows, batch_size=None, on_success=None, retries=0, backoff=1.0, on_failure=None):
+    """
+    upsert של שורות בבקשות של עד batch_size שורות
+
+    Args:
+        on_success: נקרא עם כל chunk שעלה בהצלחה
+        retries: נסיונות חוזרים ל-chunk שנכשל (המתנה backoff, 2*backoff, 4*backoff...)
+        on_failure: נקרא עם (chunk, error) כשכל הנסיונות נכשלו
+
+    Returns:
+        (uploaded, requests, errors): שורות שעלו, מספר בקשות, הודעות שגיאה
+    """
+    rows = _dedupe(table, _stamp(rows))
+    batch_size = batch_size or BATCH_SIZE
+    uploaded, requests, errors = 0, 0, []
+    for i in range(0, len(rows), batch_size):
+        chunk = rows[i:i + batch_size]
+        for attempt in range(retries + 1):
+            requests += 1
+            try:
+                supabase.table(table).upsert(chunk).execute()
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt < retries:
+                    time.sleep(backoff * 2 ** attempt)
+        if error is not None:
+            errors.append(f"{table} [{i}:{i + len(chunk)}]: {error}")
+            if on_failure:
+                on_failure(chunk, error)
+            continue
+        uploaded += len(chunk)
+        if on_success:
+            on_success(chunk)
+    return uploaded, requests, errors
+
+
+class BatchWriter:
+    """
+    כותב מרוכז ל-Supabase: תור לכל טבלה, נשלח בבקשות של עד BATCH_SIZE שורות
+    - flush() בסוף כל שלב (קבוצות/שחקנים, לו"ז, משחקים)
+    - flush אוטומטי כשתור מגיע ל-BATCH_SIZE (כל התורים, לפי סדר התלויות)
+    - עם ledger: נשלחות רק שורות שהתוכן שלהן השתנה מאז ההעלאה האחרונה (force = הכל)
+    """
+
+    def __init__(self, batch_size=None, log=print, ledger=None, force=False, retries=0, backoff=1.0, on_failure=None):
+        """
+        Args:
+            batch_size: מקסימום שורות לבקשה
+            log: פונקציית log
+            ledger: UploadLedger (None = שולחים הכל)
+            force: לשלוח גם שורות שלא השתנו (ה-ledger עדיין מתעדכן)
+            retries, backoff: נסיונות חוזרים ל-chunk שנכשל (ראה upsert_rows)
+            on_failure: נקרא עם (table, chunk, error) כשכל הנסיונות נכשלו
+        """
+        self.batch_size = batch_size or BATCH_SIZE
+        self.log = log
+        self.ledger = ledger
+        self.force = force
+        self.retries = retries
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self.queues = {}
+        self.uploaded = 0
+        self.skipped = 0
+        self.requests = 0
+        self.failed_rows = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def add(self, table, rows):
+        """הוספת שורות לתור של טבלה"""
+        if not rows:
+            return
+        with self._lock:
+            queue = self.queues.setdefault(table, [])
+            queue.extend(rows)
+            full = len(queue) >= self.batch_size
+        if full:
+            self.flush()
+
+    def add_full_game(self, game_data):
+        """כל השורות של משחק מלא (משחק, רבעים, שחקנים, קבוצות)"""
+        for table, rows in full_game_rows(game_data).items():
+            self.add(table, rows)
+
+    def flush(self):
+        """
+        שליחת כל התורים לפי סדר התלויות (games לפני game_player_stats וכו')
+
+        Returns:
+            (uploaded, skipped, requests, errors) של ה-flush הזה (skipped = לא השתנו)
+        """
+        with self._lock:
+            queues, self.queues = self.queues, {}
+
+        order = list(PRIMARY_KEYS) + [table for table in queues if table not in PRIMARY_KEYS]
+        uploaded, skipped, requests, errors = 0, 0, 0, []
+        for table in order:
+            rows = queues.get(table)
+            if not rows:
+                continue
+
+            # התורים כבר הוצאו מ-self.queues - שגיאה כאן לא מפילה את שאר הטבלאות,
+            # והשורות של הטבלה נספרות כנכשלות (dead letter) במקום להיעלם
+            try:
+                rows = _dedupe(table, rows)
+                if self.ledger is not None and not self.force:
+                    changed = self.ledger.changed(table, rows)
+                    skipped += len(rows) - len(changed)
+                    rows = changed
+                if not rows:
+                    continue
+
+                on_success = (lambda chunk, table=table: self._uploaded(table, chunk)) if self.ledger is not None else None
+                on_failure = (lambda chunk, error, table=table: self._failed(table, chunk, error))
+                table_uploaded, table_requests, table_errors = upsert_rows(
+                    table, rows, self.batch_size, on_success,
+                    retries=self.retries, backoff=self.backoff, on_failure=on_failure
+                )
+            except Exception as e:
+                errors.append(f"{table}: {e}")
+                self._failed(table, rows, e)
+                continue
+            uploaded += table_uploaded
+            requests += table_requests
+            errors += table_errors
+
+        for error in errors:
+            self.log(f"❌ Supabase batch error {error}")
+
+        with self._lock:
+            self.uploaded += uploaded
+            self.skipped += skipped
+            self.requests += requests
+            self.errors += errors
+        return uploaded, skipped, requests, errors
+
+    def _uploaded(self, table, chunk):
+        # ה-chunk כבר ב-Supabase - ledger שלא התעדכן רק גורם לשליחה חוזרת בריצה הבאה
+        try:
+            self.ledger.record(table, chunk)
+        except Exception as e:
+            self.log(f"⚠️  Failed to record {table} uploads in ledger: {e}")
+
+    def _failed(self, table, chunk, error):
+        with self._lock:
+            self.failed_rows += len(chunk)
+        if self.on_failure:
+            try:
+                self.on_failure(table, chunk, error)
+            except Exception as e:
+                self.log(f"❌ Failed to save {len(chunk)} {table} rows to dead letter: {e}")
+
+    def pending(self):
+        """מספר השורות שממתינות בתורים"""
+        with self._lock:
+            return sum(len(rows) for rows in self.queues.values())
 
 # === שחקנים ===
 
 def upsert_player(player_data):
     """מעלה/מעדכן שחקן"""
-    data = {
-        'player_id': player_data['player_id'],
-        'name': player_data['name'],
-        'current_team_id': player_data.get('current_team_id'),
-        'league_id': int(player_data['league_id']),
-        'date_of_birth': convert_date(player_data.get('date_of_birth')),
-        'height': float(player_data['height']) if player_data.get('height') else None,
-        'jersey_number': player_data.get('jersey_number'),
-        'ibba_url': f"https://ibba.co.il/Players/Profile/{player_data['player_id']}",
-        'updated_at': datetime.now().isoformat()
-    }
-    
-    try:
-        supabase.table('players').upsert(data).execute()
+    data = player_row(player_data)
+    uploaded, _, errors = upsert_rows('players', [data])
+    if uploaded:
         print(f"✅ Player: {data['name']}")
         return True
-    except Exception as e:
-        print(f"❌ Error player {data['name']}: {e}")
-        return False
+    print(f"❌ Error player {data['name']}: {errors[0]}")
+    return False
 
 def upsert_player_history(history_data):
     """מעלה היסטוריית עונות"""
-    success_count = 0
-    for record in history_data:
-        data = {
-            'player_id': record['player_id'],
-            'season': record['season'],
-            'team_name': record['team_name'],
-            'league_name': record['league_name'],
-            'league_id': int(record['league_id']) if record.get('league_id') else None,
-            'updated_at': datetime.now().isoformat()
-        }
-        try:
-            supabase.table('player_season_history').upsert(data).execute()
-            success_count += 1
-        except Exception as e:
-            print(f"❌ Error season {record['season']}: {e}")
-    
+    success_count, _, errors = upsert_rows('player_season_history', history_rows(history_data))
+    for error in errors:
+        print(f"❌ Error history: {error}")
+
     print(f"✅ History: {success_count}/{len(history_data)}")
     return success_count
 
@@ -78,41 +233,47 @@ def upsert_player_history(history_data):
 
 def upsert_team(team_data):
     """מעלה/מעדכן קבוצה"""
-    data = {
-        'team_id': int(team_data['team_id']),
-        'league_id': int(team_data['league_id']),
-        'team_name': team_data['team_name'],
-        'short_name': team_data.get('short_name', team_data['team_name']),
-        'logo_url': team_data.get('logo_url'),
-        'club_id': team_data.get('club_id'),
-        'facebook': team_data.get('facebook'),
-        'instagram': team_data.get('instagram'),
-        'updated_at': datetime.now().isoformat()
-    }
-    
-    try:
-        result = supabase.table('teams').upsert(data).execute()
+    data = team_row(team_data)
+    uploaded, _, errors = upsert_rows('teams', [data])
+    if uploaded:
         print(f"✅ Team: {data['team_name']}")
         return True
-    except Exception as e:
-        print(f"❌ Error team {data['team_name']}: {e}")
-        return False
+    print(f"❌ Error team {data['team_name']}: {errors[0]}")
+    return False
 
 # === קריאת נתונים קיימים ===
 
+def fetch_all(table, columns, league_id=None, order=None, page_size=PAGE_SIZE):
+    """
+    select מלא בעמודים (range) - בלי להיחתך במגבלת השורות של PostgREST
+
+    Args:
+        table: שם טבלה
+        columns: עמודות ל-select
+        league_id: סינון לפי ליגה (None = הכל)
+        order: עמודות למיון יציב בין עמודים (ברירת מחדל: המפתח הראשי)
+    """
+    order = order or PRIMARY_KEYS.get(table, ())
+    rows = []
+    start = 0
+    while True:
+        query = supabase.table(table).select(columns)
+        if league_id is not None:
+            query = query.eq('league_id', league_id)
+        for col in order:
+            query = query.order(col)
+        page = query.range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
 def get_existing_teams(league_id):
     """מחזיר dictionary של קבוצות קיימות: {team_id: team_data}"""
     try:
-        response = supabase.table('teams')\
-            .select('team_id, team_name, club_id, logo_url')\
-            .eq('league_id', league_id)\
-            .execute()
-        
-        teams_dict = {}
-        for team in response.data:
-            teams_dict[team['team_id']] = team
-        
-        return teams_dict
+        teams = fetch_all('teams', 'team_id, team_name, club_id, logo_url', league_id)
+        return {team['team_id']: team for team in teams}
     except Exception as e:
         print(f"❌ Error getting teams: {e}")
         return {}
@@ -121,23 +282,47 @@ def get_existing_teams(league_id):
 def get_existing_players(league_id):
     """מחזיר dictionary של שחקנים קיימים: {name_teamid: player_data}"""
     try:
-        response = supabase.table('players')\
-            .select('player_id, name, current_team_id, date_of_birth, height, jersey_number')\
-            .eq('league_id', league_id)\
-            .execute()
-        
-        players_dict = {}
-        for player in response.data:
-            # מפתח: name_teamid
-            key = f"{player['name']}_{player['current_team_id']}"
-            players_dict[key] = player
-        
-        return players_dict
+        players = fetch_all(
+            'players', 'player_id, name, current_team_id, date_of_birth, height, jersey_number', league_id
+        )
+        # מפתח: name_teamid
+        return {f"{player['name']}_{player['current_team_id']}": player for player in players}
     except Exception as e:
         print(f"❌ Error getting players: {e}")
         return {}
 
 
+class SupabaseSnapshot:
+    """
+    מצב הליגה ב-Supabase, נטען פעם אחת לריצה (בעמודים) במקום שאילתה לכל משחק/שחקן
+    - teams: {team_id: row}
+    - players: {name_teamid: row}
+    - games: {game_id: row}
+    - stats_game_ids: משחקים שיש להם game_player_stats
+    """
+
+    def __init__(self, league_id):
+        self.league_id = int(league_id)
+        self.teams = get_existing_teams(self.league_id)
+        self.players = get_existing_players(self.league_id)
+
+        games = fetch_all('games', 'game_id, status, home_score, away_score', self.league_id)
+        self.games = {game['game_id']: game for game in games}
+
+        stats = fetch_all('game_player_stats', 'game_id', self.league_id, order=('game_id', 'player_id'))
+        self.stats_game_ids = {row['game_id'] for row in stats}
+
+    def game_has_stats(self, game_id):
+        """כמו game_has_stats(), בלי שאילתה"""
+        return game_id in self.stats_game_ids
+
+    def summary(self):
+        return (
+            f"{len(self.teams)} teams, {len(self.players)} players, "
+            f"{len(self.games)} games ({len(self.stats_game_ids)} with stats)"
+        )
+
+
 def game_has_stats(game_id):
     """בדוק אם למשחק יש סטטיסטיקות שחקנים"""
     try:
@@ -145,7 +330,7 @@ def game_has_stats(game_id):
             .select('game_id', count='exact')\
             .eq('game_id', game_id)\
             .execute()
-        
+
         # אם יש לפחות שחקן אחד - המשחק נגזר
         return response.count > 0
     except Exception as e:
@@ -156,188 +341,77 @@ def game_has_stats(game_id):
 
 def upsert_game(game_data):
     """מעלה משחק"""
-    data = {
-        'game_id': game_data['game_id'],
-        'league_id': int(game_data['league_id']),
-        'season': game_data.get('season'),
-        'code': game_data.get('code'),
-        'date': convert_date(game_data['date']),
-        'time': game_data.get('time'),
-        'round': int(game_data['round']) if game_data.get('round') else None,
-        'home_team': game_data['home_team'],
-        'home_team_id': game_data.get('home_team_id'),
-        'away_team': game_data['away_team'],
-        'away_team_id': game_data.get('away_team_id'),
-        'venue': game_data.get('venue'),
-        'home_score': game_data.get('home_score'),
-        'away_score': game_data.get('away_score'),
-        'status': game_data.get('status', 'scheduled'),
-        'overtimes': game_data.get('overtimes', 0),
-        'close_game': game_data.get('close_game', False),
-        'winner': game_data.get('winner'),
-        'loser': game_data.get('loser'),
-        'updated_at': datetime.now().isoformat()
-    }
-    
-    try:
-        supabase.table('games').upsert(data).execute()
+    data = game_row(game_data)
+    uploaded, _, errors = upsert_rows('games', [data])
+    if uploaded:
         print(f"✅ Game: {data['game_id']}")
         return True
-    except Exception as e:
-        print(f"❌ Error game {data['game_id']}: {e}")
-        return False
+    print(f"❌ Error game {data['game_id']}: {errors[0]}")
+    return False
+
+def upsert_games(games_data):
+    """מעלה רשימת משחקים (למשל לו"ז מלא) בבקשות מרוכזות"""
+    uploaded, requests, errors = upsert_rows('games', [game_row(game) for game in games_data])
+    for error in errors:
+        print(f"❌ Error games: {error}")
+
+    print(f"✅ Games: {uploaded}/{len(games_data)} ({requests} requests)")
+    return uploaded
 
 def upsert_game_quarters(game_id, league_id, quarters_data):
     """מעלה רבעים"""
-    success_count = 0
-    for team_id, quarters in quarters_data.items():
-        for i, quarter in enumerate(quarters, 1):
-            data = {
-                'game_id': game_id,
-                'team_id': int(team_id),
-                'league_id': int(league_id),
-                'quarter': i,
-                'score': quarter['score'],
-                'score_against': quarter['score_against'],
-                'updated_at': datetime.now().isoformat()
-            }
-            try:
-                supabase.table('game_quarters').upsert(data).execute()
-                success_count += 1
-            except Exception as e:
-                print(f"❌ Error quarter {i}: {e}")
-    
+    success_count, _, errors = upsert_rows('game_quarters', quarter_rows(game_id, league_id, quarters_data))
+    for error in errors:
+        print(f"❌ Error quarters: {error}")
+
     print(f"✅ Quarters: {success_count}")
     return success_count
 
 def upsert_player_stats(game_id, league_id, player_stats):
     """מעלה סטטיסטיקות שחקנים"""
-    success_count = 0
-    for stat in player_stats:
-        data = {
-            'game_id': game_id,
-            'player_id': stat['player_id'],
-            'league_id': int(league_id),
-            'player_name': stat.get('player_name'),
-            'team': stat.get('team'),
-            'team_id': stat.get('team_id'),
-            'min': stat.get('min'),
-            'pts': stat.get('pts'),
-            'fgm': stat.get('fgm'),
-            'fga': stat.get('fga'),
-            'fg_pct': stat.get('fg_pct'),
-            '2ptm': stat.get('2ptm'),
-            '2pta': stat.get('2pta'),
-            '2pt_pct': stat.get('2pt_pct'),
-            '3ptm': stat.get('3ptm'),
-            '3pta': stat.get('3pta'),
-            '3pt_pct': stat.get('3pt_pct'),
-            'ftm': stat.get('ftm'),
-            'fta': stat.get('fta'),
-            'ft_pct': stat.get('ft_pct'),
-            'def': stat.get('def'),
-            'off': stat.get('off'),
-            'reb': stat.get('reb'),
-            'ast': stat.get('ast'),
-            'stl': stat.get('stl'),
-            'to': stat.get('to'),
-            'pf': stat.get('pf'),
-            'pfa': stat.get('pfa'),
-            'blk': stat.get('blk'),
-            'blka': stat.get('blka'),
-            'rate': stat.get('rate'),
-            'starter': stat.get('starter', 0),
-            'number': stat.get('number'),
-            'updated_at': datetime.now().isoformat()
-        }
-        try:
-            supabase.table('game_player_stats').upsert(data).execute()
-            success_count += 1
-        except Exception as e:
-            print(f"❌ Error player stat {stat.get('player_name')}: {e}")
-    
+    success_count, _, errors = upsert_rows('game_player_stats', player_stat_rows(game_id, league_id, player_stats))
+    for error in errors:
+        print(f"❌ Error player stats: {error}")
+
     print(f"✅ Player stats: {success_count}/{len(player_stats)}")
     return success_count
 
 def upsert_team_stats(game_id, league_id, team_stats):
     """מעלה סטטיסטיקות קבוצות"""
-    success_count = 0
-    for stat in team_stats:
-        data = {
-            'game_id': game_id,
-            'team_id': stat['team_id'],
-            'league_id': int(league_id),
-            'team': stat.get('team'),
-            'opponent': stat.get('opponent'),
-            'opponent_id': stat.get('opponent_id'),
-            'pts': stat.get('pts'),
-            'fgm': stat.get('fgm'),
-            'fga': stat.get('fga'),
-            'fg_pct': stat.get('fg_pct'),
-            '2ptm': stat.get('2ptm'),
-            '2pta': stat.get('2pta'),
-            '2pt_pct': stat.get('2pt_pct'),
-            '3ptm': stat.get('3ptm'),
-            '3pta': stat.get('3pta'),
-            '3pt_pct': stat.get('3pt_pct'),
-            'ftm': stat.get('ftm'),
-            'fta': stat.get('fta'),
-            'ft_pct': stat.get('ft_pct'),
-            'def': stat.get('def'),
-            'off': stat.get('off'),
-            'reb': stat.get('reb'),
-            'ast': stat.get('ast'),
-            'stl': stat.get('stl'),
-            'to': stat.get('to'),
-            'pf': stat.get('pf'),
-            'pfa': stat.get('pfa'),
-            'blk': stat.get('blk'),
-            'blka': stat.get('blka'),
-            'rate': stat.get('rate'),
-            'second_chance_pts': stat.get('2nd_chance_pts'),
-            'bench_pts': stat.get('bench_pts'),
-            'fast_break_pts': stat.get('fast_break_pts'),
-            'points_in_paint': stat.get('points_in_paint'),
-            'pts_off_turnovers': stat.get('pts_from_tov'),
-            'starters_pts': stat.get('starters_pts'),
-            'updated_at': datetime.now().isoformat()
-        }
-        try:
-            supabase.table('game_team_stats').upsert(data).execute()
-            success_count += 1
-        except Exception as e:
-            print(f"❌ Error team stat {stat.get('team')}: {e}")
-    
+    success_count, _, errors = upsert_rows('game_team_stats', team_stat_rows(game_id, league_id, team_stats))
+    for error in errors:
+        print(f"❌ Error team stats: {error}")
+
     print(f"✅ Team stats: {success_count}/{len(team_stats)}")
     return success_count
 
 # === פונקציות מורכבות ===
 
 def upload_full_game(game_data):
-    """מעלה משחק מלא עם כל הנתונים"""
+    """מעלה משחק מלא עם כל הנתונים (בקשה אחת לכל טבלה)"""
     print(f"\n{'='*50}")
     print(f"📤 Uploading game: {game_data['game_id']}")
     print(f"{'='*50}")
-    
+
     # 🔧 תיקון: שימוש בפונקציה הנכונה
     if not upsert_game(game_data):
         return False
-    
+
     league_id = game_data['league_id']
     game_id = game_data['game_id']
-    
+
     # רבעים
     if 'quarters' in game_data:
         upsert_game_quarters(game_id, league_id, game_data['quarters'])
-    
+
     # סטטיסטיקות שחקנים
     if 'player_stats' in game_data:
         upsert_player_stats(game_id, league_id, game_data['player_stats'])
-    
+
     # סטטיסטיקות קבוצות
     if 'team_stats' in game_data:
         upsert_team_stats(game_id, league_id, game_data['team_stats'])
-    
+
     print(f"✅ Game {game_id} uploaded successfully!\n")
     return True
 
@@ -347,12 +421,12 @@ def upload_player_full(player_details, player_history):
     print(f"\n{'='*50}")
     print(f"📤 Uploading player: {player_details['name']}")
     print(f"{'='*50}")
-    
+
     if not upsert_player(player_details):
         return False
-    
+
     if player_history:
         upsert_player_history(player_history)
-    
+
     print(f"✅ Player uploaded successfully!\n")
-    return True
\ No newline at end of file
+    return True
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Team Mapping
+============
+מיפוי קבוצות גלובלי (data/teams.csv) שנטען פעם אחת לכל התהליך:
+- נטען מחדש רק כשזמן השינוי (mtime) של הקובץ משתנה
+- חיפוש O(1) לפי (variation, league_id) ולפי team_id
+- הבנייה וקטורית (pandas) - בלי iterrows ובלי html.unescape חוזר לכל שורה
+- אינדקס זיהוי לשמות שלא מופיעים כמו שהם: מפתח מנורמל (גרשיים, רווחים, HTML entities)
+  ואחריו התאמה מקורבת (trigrams) בתוך הליגה ועם אותו סוג מועדון, עם LRU לשמות שכבר זוהו;
+  קבוצה נוספת של מועדון ("מכבי חיפה ב") לא מותאמת לקבוצה הראשונה
+"""
+
+import html
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+from config import GLOBAL_FILES, SCRAPING_CONFIG
+
+# שמות עמודות אפשריים בקובץ
+COLUMN_ALIASES = {
+    'team_id': ['Team_ID', 'team_id', 'TeamID'],
+    'league_id': ['League_ID', 'league_id', 'LeagueID'],
+    'club_name': ['Team_Name', 'club_name', 'team_name', 'name'],
+    'short_name': ['short_name', 'ShortName'],
+    'variations': ['name_variations', 'variations', 'Variations'],
+    'bg_color': ['bg_color', 'BgColor'],
+    'text_color': ['text_color', 'TextColor']
+}
+
+DEFAULT_COLORS = {'bg_color': '#000000', 'text_color': '#FFFFFF'}
+
+# גרש/גרשיים עבריים ומרכאות למיניהן - מוסרים (רמה"ש = רמה״ש = רמהש)
+_QUOTES = str.maketrans('', '', '\'"`\u05f3\u05f4\u2018\u2019\u201c\u201d\u00b4')
+# סימני פיסוק שמפרידים מילים (א.ס. אשקלון-קרית גת = א ס אשקלון קרית גת)
+_SEPARATORS = re.compile(r'[.\-/_,()]+')
+# אורך מינימלי לשם חתוך שמותאם לתחילת שם מלא
+PREFIX_MIN_LENGTH = 10
+# סוג המועדון בתחילת השם (במפתח מנורמל: בית"ר -> ביתר, א.ס -> א ס) - בהתאמה מקורבת חייב להיות זהה
+CLUB_TYPE_WORDS = ('הפועל', 'מכבי', 'עירוני', 'אליצור', 'ביתר', 'בני', 'הכח', 'אחי', 'א ס', 'מ ס', 'מ כ')
+
+
+def _unescape(value):
+    return html.unescape(str(value)).strip()
+
+
+def _split_variations(value):
+    return [v for v in (html.unescape(part.strip()) for part in _unescape(value).split('|')) if v]
+
+
+def fold_name(name):
+    """מפתח מנורמל לשם קבוצה"""
+    name = unicodedata.normalize('NFKC', html.unescape(html.unescape(str(name))))
+    name = _SEPARATORS.sub(' ', name.translate(_QUOTES))
+    return ' '.join(name.split()).lower()
+
+
+def club_type(key):
+    """המילה שמציינת את סוג המועדון בתחילת מפתח מנורמל, או None"""
+    for word in CLUB_TYPE_WORDS:
+        if key == word or key.startswith(word + ' '):
+            return word
+    return None
+
+
+def _is_team_marker(suffix):
+    """סיומת של קבוצה נוספת של אותו מועדון ("ב", "2") - לא ספונסר ולא שם חתוך"""
+    suffix = suffix.strip()
+    return len(suffix) == 1 or suffix.isdigit()
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TeamNameIndex:
+    """
+    זיהוי שם קבוצה בתוך ליגה: מפתח מדויק -> מפתח מנורמל -> התאמה מקורבת
+    התוצאות נשמרות ב-LRU, כך ששם שכבר נראה עולה O(1)
+    """
+
+    def __init__(self, by_variation, min_score=0.85, cache_size=4096):
+        """
+        Args:
+            by_variation: {(variation, league_id): team_info}
+            min_score: דמיון trigram מינימלי להתאמה מקורבת
+            cache_size: מספר שמות שנשמרים ב-LRU
+        """
+        self.by_variation = by_variation
+        self.min_score = min_score
+        self.folded = {}
+        self.candidates = {}
+        self._reported = set()
+
+        teams = {}
+        for (_, league_id), info in by_variation.items():
+            teams.setdefault((info['team_id'], league_id), info)
+
+        for (team_id, league_id), info in teams.items():
+            names = list(info['all_variations']) + [info['club_name'], info['short_name']]
+            for key in {fold_name(n) for n in names if isinstance(n, str) and n.strip()}:
+                # מפתח מנורמל של שתי קבוצות שונות באותה ליגה - לא חד-משמעי, לא משתמשים בו
+                if (key, league_id) not in self.folded:
+                    self.folded[(key, league_id)] = info
+                elif self.folded[(key, league_id)] and self.folded[(key, league_id)]['team_id'] != team_id:
+                    self.folded[(key, league_id)] = None
+                self.candidates.setdefault(league_id, []).append((key, _trigrams(key), info))
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, team_name, league_id):
+        """
+        Returns:
+            (team_info או None, שיטה: 'exact' / 'folded' / 'prefix' / 'fuzzy' / None)
+        """
+        info = self.by_variation.get((team_name, league_id)) or self.by_variation.get((team_name.strip(), league_id))
+        if info:
+            return info, 'exact'
+
+        key = fold_name(team_name)
+        info = self.folded.get((key, league_id))
+        if info:
+            return info, 'folded'
+
+        # "מכבי חיפה ב" / "מכבי חיפה 2" שלא מופיע במיפוי - קבוצה נוספת של המועדון, לא מנחשים
+        base, _, last = key.rpartition(' ')
+        if base and _is_team_marker(last):
+            return None, None
+
+        candidates = self.candidates.get(league_id, ())
+
+        # שם + ספונסר ("מכבי חיפה גיא נתן") או שם שנחתך באתר ("הפועל מגדל העמק יזרע")
+        # אבל לא קבוצה נוספת של המועדון ("מכבי חיפה ב") - זו קבוצה אחרת
+        prefixed = [
+            (len(name), candidate) for name, _, candidate in candidates
+            if (key.startswith(name + ' ') and ' ' in name and not _is_team_marker(key[len(name):]))
+            or (len(key) >= PREFIX_MIN_LENGTH and name.startswith(key) and not _is_team_marker(name[len(key):]))
+        ]
+        if prefixed:
+            longest = max(length for length, _ in prefixed)
+            teams = {candidate['team_id']: candidate for length, candidate in prefixed if length == longest}
+            if len(teams) == 1:
+                return next(iter(teams.values())), 'prefix'
+
+        # התאמה מקורבת - רק מול השמות של אותה ליגה (עשרות בודדות) ורק עם אותו סוג מועדון
+        # ("הפועל ציונה" אינו "עירוני נס ציונה")
+        query = _trigrams(key)
+        query_type = club_type(key)
+        best = {}
+        for name, grams, candidate in candidates:
+            if club_type(name) != query_type:
+                continue
+            score = 2 * len(query & grams) / (len(query) + len(grams))
+            if score > best.get(candidate['team_id'], (0, None))[0]:
+                best[candidate['team_id']] = (score, candidate)
+
+        ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)
+        if ranked and ranked[0][0] >= self.min_score:
+            # תיקו בין שתי קבוצות - לא מנחשים
+            if len(ranked) == 1 or ranked[1][0] < ranked[0][0]:
+                return ranked[0][1], 'fuzzy'
+        return None, None
+
+    def first_report(self, team_name, league_id):
+        """True בפעם הראשונה שמדווחים על שם (כדי לא להציף את ה-log)"""
+        key = (team_name, league_id)
+        if key in self._reported:
+            return False
+        self._reported.add(key)
+        return True
+
+
+def build_team_mapping(df):
+    """
+    בניית המיפוי מתוך DataFrame של teams.csv
+
+    Returns:
+        (by_variation, by_team_id): {(variation, league_id): team_info}, {team_id: team_info}
+    """
+    df = df.rename(columns={
+        name: key
+        for key, names in COLUMN_ALIASES.items()
+        for name in [next((n for n in names if n in df.columns), None)] if name
+    })
+    if not {'team_id', 'league_id', 'club_name'}.issubset(df.columns):
+        return {}, {}
+
+    team_ids = pd.to_numeric(df['team_id'], errors='coerce')
+    league_ids = pd.to_numeric(df['league_id'], errors='coerce')
+    valid = team_ids.notna() & league_ids.notna() & df['club_name'].notna() & (league_ids.fillna(0).astype(int) != 0)
+
+    teams = pd.DataFrame({
+        'team_id': team_ids[valid].astype(int),
+        'league_id': league_ids[valid].astype(int),
+        'club_name': df.loc[valid, 'club_name'].map(_unescape)
+    })
+    teams['short_name'] = df.loc[valid, 'short_name'].fillna(teams['club_name']) if 'short_name' in df else teams['club_name']
+    for col, default in DEFAULT_COLORS.items():
+        teams[col] = df.loc[valid, col].fillna(default) if col in df else default
+
+    raw_variations = df.loc[valid, 'variations'].fillna(teams['club_name']) if 'variations' in df else teams['club_name']
+    teams['all_variations'] = raw_variations.map(_split_variations)
+
+    infos = teams.to_dict('records')
+
+    # שורה לכל וריאציה; הופעה ראשונה של (variation, league_id) קובעת
+    keys = pd.DataFrame({
+        'variation': teams['all_variations'].to_numpy(),
+        'league_id': teams['league_id'].to_numpy(),
+        'position': range(len(teams))
+    }).explode('variation').dropna(subset=['variation'])
+    keys = keys.drop_duplicates(subset=['variation', 'league_id'], keep='first')
+
+    by_variation = {
+        (variation, int(league_id)): infos[position]
+        for variation, league_id, position in zip(keys['variation'], keys['league_id'], keys['position'])
+    }
+    by_team_id = {}
+    for info in infos:
+        by_team_id.setdefault(info['team_id'], info)
+    return by_variation, by_team_id
+
+
+class TeamMapping:
+    """מיפוי הקבוצות המשותף (thread-safe, נטען מחדש לפי mtime)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.by_variation = {}
+        self.by_team_id = {}
+        self.index = TeamNameIndex({})
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        טעינה מחדש אם הקובץ השתנה מאז הטעינה האחרונה
+
+        Returns:
+            bool: True אם המיפוי נטען עכשיו
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            if mtime is None:
+                by_variation, by_team_id = {}, {}
+            else:
+                by_variation, by_team_id = build_team_mapping(pd.read_csv(self.path, encoding='utf-8-sig'))
+            settings = SCRAPING_CONFIG.get('team_resolution', {})
+            index = TeamNameIndex(
+                by_variation,
+                min_score=settings.get('fuzzy_min_score', 0.85),
+                cache_size=settings.get('cache_size', 4096)
+            )
+            # החלפה אטומית - קוראים מקבילים רואים תמיד מיפוי שלם
+            self.by_variation, self.by_team_id, self.index = by_variation, by_team_id, index
+            self._mtime = mtime
+        return True
+
+    @property
+    def exists(self):
+        return self._mtime is not None
+
+    def lookup(self, variation, league_id):
+        """team_info לפי (שם, league_id), או None"""
+        self.refresh()
+        return self.by_variation.get((variation, int(league_id)))
+
+    def resolve(self, team_name, league_id):
+        """team_info לפי שם בכל צורה (מדויק / מנורמל / מקורב), או None"""
+        self.refresh()
+        return self.index.resolve(team_name, int(league_id))[0]
+
+    def team(self, team_id):
+        """team_info לפי team_id, או None"""
+        self.refresh()
+        try:
+            return self.by_team_id.get(int(team_id))
+        except (TypeError, ValueError):
+            return None
+
+
+_team_mapping = None
+_team_mapping_lock = threading.Lock()
+
+
+def get_team_mapping():
+    """מיפוי הקבוצות המשותף לכל התהליך"""
+    global _team_mapping
+    with _team_mapping_lock:
+        if _team_mapping is None:
+            _team_mapping = TeamMapping(GLOBAL_FILES['teams'])
+    return _team_mapping
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Upload Ledger
+=============
+יומן העלאות ל-Supabase (SQLite): לכל טבלה, מפתח ראשי -> hash של התוכן שהועלה
+- לפני העלאה מסננים שורות שה-hash שלהן לא השתנה מאז ההעלאה המוצלחת האחרונה
+- hash נרשם רק אחרי upsert מוצלח, כך שכישלון נשלח שוב בריצה הבאה
+- שינוי ידני ב-Supabase לא נראה כאן - בשביל זה יש --force-upload
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from config import SCRAPING_CONFIG
+from .db_rows import PRIMARY_KEYS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    table_name TEXT NOT NULL,
+    row_key    TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    PRIMARY KEY (table_name, row_key)
+);
+"""
+
+# עמודות שלא נכנסות ל-hash (משתנות בכל ריצה)
+IGNORED_COLUMNS = ('updated_at',)
+
+
+def row_key(table, row):
+    """מפתח השורה (ערכי המפתח הראשי), או השורה כולה לטבלה בלי מפתח ידוע"""
+    pk = PRIMARY_KEYS.get(table)
+    values = [row.get(col) for col in pk] if pk else row
+    return json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def row_hash(row):
+    """hash של תוכן השורה"""
+    payload = {k: v for k, v in row.items() if k not in IGNORED_COLUMNS}
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:20]
+
+
+class UploadLedger:
+    """יומן ה-hash של מה שכבר הועלה (thread-safe, טבלה נטענת לזיכרון בשימוש הראשון)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._hashes = {}
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _table(self, table):
+        hashes = self._hashes.get(table)
+        if hashes is None:
+            cursor = self._conn.execute("SELECT row_key, hash FROM uploads WHERE table_name = ?", (table,))
+            hashes = self._hashes[table] = dict(cursor.fetchall())
+        return hashes
+
+    def changed(self, table, rows):
+        """השורות שחדשות או שהתוכן שלהן השתנה מאז ההעלאה האחרונה"""
+        with self._lock:
+            hashes = self._table(table)
+            return [row for row in rows if hashes.get(row_key(table, row)) != row_hash(row)]
+
+    def record(self, table, rows):
+        """רישום שורות שהועלו בהצלחה"""
+        entries = [(table, row_key(table, row), row_hash(row)) for row in rows]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO uploads (table_name, row_key, hash) VALUES (?, ?, ?) "
+                    "ON CONFLICT(table_name, row_key) DO UPDATE SET hash = excluded.hash",
+                    entries
+                )
+            self._table(table).update((key, value) for _, key, value in entries)
+
+    def forget(self, table, rows):
+        """מחיקת שורות מהיומן - יישלחו שוב גם אם לא השתנו (למשל חסרות ב-Supabase)"""
+        keys = [row_key(table, row) for row in rows]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM uploads WHERE table_name = ? AND row_key = ?",
+                    [(table, key) for key in keys]
+                )
+            hashes = self._table(table)
+            for key in keys:
+                hashes.pop(key, None)
+
+    def count(self, table=None):
+        """מספר השורות ביומן (לטבלה או בסך הכל)"""
+        with self._lock:
+            if table:
+                return self._conn.execute("SELECT COUNT(*) FROM uploads WHERE table_name = ?", (table,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_upload_ledger():
+    """היומן המשותף, או None אם הוא מבוטל ב-SCRAPING_CONFIG"""
+    global _ledger
+    settings = SCRAPING_CONFIG.get('upload_ledger', {})
+    if not settings.get('enabled', False):
+        return None
+
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UploadLedger(settings.get('path', 'data/upload_ledger.sqlite'))
+    return _ledger
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Upload Worker
+=============
+העלאה ל-Supabase ב-thread נפרד, כך שהגזירה לא מחכה לרשת:
+- ה-scraper מוסיף שורות לתור חסום (queue_size) וממשיך מיד; תור מלא = המתנה (backpressure)
+- ה-worker מעביר אותן ל-BatchWriter (תור לכל טבלה, chunks, ledger)
+- chunk שנכשל מנוסה שוב עם backoff; אחרי הנסיון האחרון נכתב ל-dead letter (JSONL תחת logs/)
+- drain() בסוף הריצה: שולח את מה שנשאר, עוצר את ה-thread ומחזיר סיכום
+- replay_dead_letter(): שליחה חוזרת של ה-dead letter (python main.py --replay-dead-letter)
+"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+_STOP = object()
+
+# כתיבה ל-dead letter מכמה workers (ליגות במקביל)
+_dead_letter_lock = threading.Lock()
+
+
+def write_dead_letter(path, table, rows, error, league=None):
+    """הוספת payload שנכשל לקובץ ה-dead letter (שורת JSON אחת ל-chunk)"""
+    record = {
+        'failed_at': datetime.now().isoformat(),
+        'league': league,
+        'table': table,
+        'error': str(error),
+        'rows': rows
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _dead_letter_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+def replay_dead_letter(path, upsert, log=print):
+    """
+    שליחה חוזרת של כל ה-chunks בקובץ ה-dead letter
+
+    Args:
+        upsert: פונקציה (table, rows) -> רשימת שגיאות (ריקה = הצליח)
+
+    Returns:
+        (replayed, remaining): שורות שעלו, שורות שנשארו בקובץ
+    """
+    path = Path(path)
+    with _dead_letter_lock:
+        if not path.exists():
+            log(f"✅ No dead letter file at {path}")
+            return 0, 0
+
+        records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+        failed = []
+        replayed = 0
+        for record in records:
+            errors = upsert(record['table'], record['rows'])
+            if errors:
+                record['error'] = errors[0]
+                record['failed_at'] = datetime.now().isoformat()
+                failed.append(record)
+            else:
+                replayed += len(record['rows'])
+
+        # רק מה שנכשל שוב נשאר בקובץ
+        if failed:
+            tmp = path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in failed))
+            tmp.replace(path)
+        else:
+            path.unlink()
+
+    remaining = sum(len(record['rows']) for record in failed)
+    log(f"📤 Dead letter replay: {replayed} rows uploaded, {remaining} rows still failing ({len(failed)} chunks)")
+    return replayed, remaining
+
+
+class UploadWorker:
+    """thread רקע שמעלה שורות דרך BatchWriter"""
+
+    def __init__(self, writer, queue_size=1000, dead_letter_path='logs/supabase_dead_letter.jsonl',
+                 league=None, log=print, wrap=None):
+        """
+        Args:
+            writer: BatchWriter (retries/backoff מוגדרים בו)
+            queue_size: מקסימום פריטים שממתינים (כל פריט = שורות של טבלה אחת)
+            dead_letter_path: קובץ JSONL ל-chunks שנכשלו סופית
+            league: קוד ליגה (נרשם ב-dead letter)
+            log: פונקציית log
+            wrap: עטיפה לפונקציית ה-thread (למשל bind_log_context כדי שה-log יקבל את קידומת הליגה)
+        """
+        self.writer = writer
+        self.dead_letter_path = dead_letter_path
+        self.league = league
+        self.log = log
+        self.dead_lettered = 0
+        self.lost_rows = 0          # שורות שאבדו בשגיאה שלא נתפסה ב-BatchWriter
+        self.worker_errors = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._started = time.perf_counter()
+        self._busy_seconds = 0.0
+
+        writer.on_failure = self._dead_letter
+        target = wrap(self._run) if wrap else self._run
+        self._thread = threading.Thread(target=target, name=f"upload-{league or 'worker'}", daemon=True)
+        self._thread.start()
+
+    def submit(self, table, rows):
+        """הוספת שורות לתור (חוסם רק כשהתור מלא)"""
+        if rows:
+            self._queue.put(('rows', table, rows))
+
+    def flush(self, stage):
+        """בקשת flush בסוף שלב - מתבצע ב-thread של ה-worker, לפי הסדר"""
+        self._queue.put(('flush', stage, None))
+
+    def _dead_letter(self, table, rows, error):
+        write_dead_letter(self.dead_letter_path, table, rows, error, self.league)
+        self.dead_lettered += len(rows)
+
+    def _flush(self, stage):
+        uploaded, skipped, requests, errors = self.writer.flush()
+        if uploaded or errors:
+            status = f", {len(errors)} failed batches" if errors else ""
+            self.log(f"📤 Supabase ({stage}): {uploaded} rows in {requests} requests, {skipped} unchanged{status}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    self._flush('final')
+                    return
+                kind, name, rows = item
+                start = time.perf_counter()
+                if kind == 'rows':
+                    self.writer.add(name, rows)
+                else:
+                    self._flush(name)
+                self._busy_seconds += time.perf_counter() - start
+            except Exception as e:
+                # לא להעלים שורות בשקט - נספרות כנכשלות, וה-drain מכשיל את הריצה
+                self.worker_errors += 1
+                self.log(f"❌ Upload worker error: {e}")
+                if item is not _STOP and item[0] == 'rows':
+                    self.lost_rows += len(item[2])
+                    try:
+                        self._dead_letter(item[1], item[2], e)
+                    except Exception as dead_letter_error:
+                        self.log(f"❌ Failed to save {len(item[2])} {item[1]} rows to dead letter: {dead_letter_error}")
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """
+        שליחת כל מה שנשאר ועצירת ה-thread
+
+        Returns:
+            dict: uploaded, skipped, requests, failed, dead_lettered, worker_errors, upload_seconds
+        """
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        return {
+            'uploaded': self.writer.uploaded,
+            'skipped': self.writer.skipped,
+            'requests': self.writer.requests,
+            'failed': self.writer.failed_rows + self.lost_rows,
+            'dead_lettered': self.dead_lettered,
+            'worker_errors': self.worker_errors,
+            'upload_seconds': self._busy_seconds
+        }
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+Warehouse
+=========
+מחסן נתונים מקומי ב-SQLite (data/warehouse.sqlite, WAL) לכל הישויות הגזורות:
+leagues, teams, players, player_season_history, games, game_quarters,
+game_player_stats, game_team_stats - באותם שמות עמודות ומפתחות כמו ב-'DB SCHEMA SUPA.txt'
+- upsert בכמויות (executemany, טרנזקציה אחת לכל קריאה)
+- אינדקסים על league_id / game_id / player_id
+- קריאה כ-DataFrame (ממוצעים, העלאות) בלי לפרסר מחדש CSV/JSON
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+from config import SCRAPING_CONFIG
+from . import db_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leagues (
+    league_id  INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL,
+    name_en    TEXT,
+    country    TEXT,
+    season     TEXT,
+    url        TEXT,
+    is_active  INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS teams (
+    team_id         INTEGER NOT NULL,
+    league_id       INTEGER NOT NULL,
+    team_name       TEXT NOT NULL,
+    short_name      TEXT,
+    bg_color        TEXT DEFAULT '#000000',
+    text_color      TEXT DEFAULT '#FFFFFF',
+    name_variations TEXT,
+    club_id         INTEGER,
+    facebook        TEXT,
+    instagram       TEXT,
+    logo_url        TEXT,
+    created_at      TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at      TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (team_id, league_id)
+);
+CREATE TABLE IF NOT EXISTS players (
+    player_id       TEXT PRIMARY KEY,
+    name            TEXT NOT NULL,
+    current_team_id INTEGER,
+    league_id       INTEGER NOT NULL,
+    date_of_birth   TEXT,
+    height          REAL,
+    jersey_number   INTEGER,
+    ibba_url        TEXT,
+    created_at      TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at      TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS player_season_history (
+    player_id   TEXT NOT NULL,
+    season      TEXT NOT NULL,
+    team_name   TEXT,
+    league_name TEXT,
+    league_id   INTEGER,
+    created_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (player_id, season)
+);
+CREATE TABLE IF NOT EXISTS games (
+    game_id      TEXT PRIMARY KEY,
+    league_id    INTEGER NOT NULL,
+    season       TEXT,
+    code         TEXT,
+    date         TEXT,
+    time         TEXT,
+    round        INTEGER,
+    home_team    TEXT NOT NULL,
+    home_team_id INTEGER,
+    away_team    TEXT NOT NULL,
+    away_team_id INTEGER,
+    venue        TEXT,
+    home_score   INTEGER,
+    away_score   INTEGER,
+    status       TEXT DEFAULT 'scheduled',
+    overtimes    INTEGER DEFAULT 0,
+    close_game   INTEGER DEFAULT 0,
+    winner       TEXT,
+    loser        TEXT,
+    created_at   TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at   TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS game_quarters (
+    game_id       TEXT NOT NULL,
+    team_id       INTEGER NOT NULL,
+    league_id     INTEGER NOT NULL,
+    quarter       INTEGER NOT NULL,
+    team          TEXT,
+    opponent      TEXT,
+    opponent_id   INTEGER,
+    game_date     TEXT,
+    score         INTEGER,
+    score_against INTEGER,
+    created_at    TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at    TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (game_id, team_id, quarter)
+);
+CREATE TABLE IF NOT EXISTS game_player_stats (
+    game_id     TEXT NOT NULL,
+    player_id   TEXT NOT NULL,
+    league_id   INTEGER NOT NULL,
+    player_name TEXT,
+    team        TEXT,
+    team_id     INTEGER,
+    opponent    TEXT,
+    game_date   TEXT,
+    "min" INTEGER, pts INTEGER, fgm INTEGER, fga INTEGER, fg_pct REAL,
+    "2ptm" INTEGER, "2pta" INTEGER, "2pt_pct" REAL,
+    "3ptm" INTEGER, "3pta" INTEGER, "3pt_pct" REAL,
+    ftm INTEGER, fta INTEGER, ft_pct REAL,
+    "def" INTEGER, "off" INTEGER, reb INTEGER, ast INTEGER, stl INTEGER, "to" INTEGER,
+    pf INTEGER, pfa INTEGER, blk INTEGER, blka INTEGER, rate REAL,
+    starter     INTEGER DEFAULT 0,
+    number      INTEGER,
+    created_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (game_id, player_id)
+);
+CREATE TABLE IF NOT EXISTS game_team_stats (
+    game_id     TEXT NOT NULL,
+    team_id     INTEGER NOT NULL,
+    league_id   INTEGER NOT NULL,
+    team        TEXT,
+    opponent    TEXT,
+    opponent_id INTEGER,
+    game_date   TEXT,
+    pts INTEGER, fgm INTEGER, fga INTEGER, fg_pct REAL,
+    "2ptm" INTEGER, "2pta" INTEGER, "2pt_pct" REAL,
+    "3ptm" INTEGER, "3pta" INTEGER, "3pt_pct" REAL,
+    ftm INTEGER, fta INTEGER, ft_pct REAL,
+    "def" INTEGER, "off" INTEGER, reb INTEGER, ast INTEGER, stl INTEGER, "to" INTEGER,
+    pf INTEGER, pfa INTEGER, blk INTEGER, blka INTEGER, rate REAL,
+    second_chance_pts INTEGER,
+    bench_pts         INTEGER,
+    fast_break_pts    INTEGER,
+    points_in_paint   INTEGER,
+    pts_off_turnovers INTEGER,
+    starters_pts      INTEGER,
+    created_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (game_id, team_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_teams_league ON teams (league_id);
+CREATE INDEX IF NOT EXISTS idx_players_league ON players (league_id);
+CREATE INDEX IF NOT EXISTS idx_history_league ON player_season_history (league_id);
+CREATE INDEX IF NOT EXISTS idx_games_league_season ON games (league_id, season);
+CREATE INDEX IF NOT EXISTS idx_quarters_league ON game_quarters (league_id);
+CREATE INDEX IF NOT EXISTS idx_player_stats_league ON game_player_stats (league_id);
+CREATE INDEX IF NOT EXISTS idx_player_stats_player ON game_player_stats (player_id);
+CREATE INDEX IF NOT EXISTS idx_team_stats_league ON game_team_stats (league_id);
+CREATE INDEX IF NOT EXISTS idx_team_stats_team ON game_team_stats (team_id);
+"""
+
+# מפתח ראשי לכל טבלה (יעד ה-ON CONFLICT)
+PRIMARY_KEYS = db_rows.PRIMARY_KEYS
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Warehouse:
+    """מחסן SQLite משותף (thread-safe, חיבור אחד עם נעילה)"""
+
+    def __init__(self, path='data/warehouse.sqlite'):
+        """
+        Args:
+            path: נתיב קובץ ה-SQLite
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        # עמודות לכל טבלה - שדות שלא בסכמה מסוננים ב-upsert
+        self.columns = {
+            table: [row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+            for table in PRIMARY_KEYS
+        }
+
+    # ============================================
+    # WRITE
+    # ============================================
+
+    def _upsert_sql(self, table, columns, keep_existing):
+        pk = PRIMARY_KEYS[table]
+        updates = []
+        for column in columns:
+            if column in pk:
+                continue
+            if keep_existing:
+                updates.append(f"{_quote(column)} = COALESCE(excluded.{_quote(column)}, {_quote(column)})")
+            else:
+                updates.append(f"{_quote(column)} = excluded.{_quote(column)}")
+        updates.append("updated_at = CURRENT_TIMESTAMP")
+
+        return (
+            f"INSERT INTO {table} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(pk)}) DO UPDATE SET {', '.join(updates)}"
+        )
+
+    def _upsert(self, table, rows, keep_existing=False):
+        """upsert בלי טרנזקציה (הקורא מחזיק את הנעילה)"""
+        known = set(self.columns[table]) - {'created_at', 'updated_at'}
+
+        # קיבוץ לפי סט העמודות - statement אחד לכל צורה של שורה
+        groups = {}
+        for row in rows:
+            columns = tuple(c for c in row if c in known)
+            groups.setdefault(columns, []).append(tuple(row[c] for c in columns))
+
+        for columns, values in groups.items():
+            self.conn.executemany(self._upsert_sql(table, columns, keep_existing), values)
+        return len(rows)
+
+    def upsert(self, table, rows, keep_existing=False):
+        """
+        upsert של שורות לטבלה (טרנזקציה אחת)
+
+        Args:
+            table: שם טבלה מתוך PRIMARY_KEYS
+            rows: list של dicts (שמות עמודות כמו בסכמה)
+            keep_existing: ערך None לא דורס ערך קיים (למשל לו"ז מעל משחק שכבר נגזר)
+
+        Returns:
+            int: מספר השורות
+        """
+        if not rows:
+            return 0
+        with self.lock:
+            with self.conn:
+                return self._upsert(table, rows, keep_existing)
+
+    def upsert_many(self, tables):
+        """upsert לכמה טבלאות בטרנזקציה אחת ({table: rows})"""
+        with self.lock:
+            with self.conn:
+                return sum(self._upsert(table, rows) for table, rows in tables.items() if rows)
+
+    def upsert_games(self, games):
+        """
+        שמירת משחקים מלאים (משחק + רבעים + סטטיסטיקות) בטרנזקציה אחת
+
+        Args:
+            games: list של game_data (כמו שנבנה ב-_scrape_single_game)
+        """
+        tables = {}
+        for game_data in games:
+            for table, rows in db_rows.full_game_rows(game_data).items():
+                tables.setdefault(table, []).extend(rows)
+        return self.upsert_many(tables)
+
+    def upsert_full_game(self, game_data):
+        return self.upsert_games([game_data])
+
+    def upsert_schedule(self, games):
+        """משחקים מהלו"ז - בלי לדרוס שדות של משחקים שכבר נגזרו"""
+        return self.upsert('games', [db_rows.game_row(game) for game in games], keep_existing=True)
+
+    def upsert_teams(self, teams):
+        return self.upsert('teams', [db_rows.team_row(team) for team in teams])
+
+    def upsert_players(self, players):
+        return self.upsert('players', [db_rows.player_row(player) for player in players])
+
+    def upsert_player_history(self, history_data):
+        return self.upsert('player_season_history', db_rows.history_rows(history_data))
+
+    # ============================================
+    # READ
+    # ============================================
+
+    def query(self, sql, params=()):
+        """שאילתה חופשית - list של dicts"""
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    @staticmethod
+    def _where(filters):
+        if not filters:
+            return "", ()
+        clause = " AND ".join(f"{_quote(column)} = ?" for column in filters)
+        return f" WHERE {clause}", tuple(filters.values())
+
+    def select(self, table, **filters):
+        """
+        שורות מטבלה לפי שוויון עמודות
+
+        Example:
+            warehouse.select('players', league_id=1)
+        """
+        where, params = self._where(filters)
+        return self.query(f"SELECT * FROM {table}{where}", params)
+
+    def count(self, table, **filters):
+        where, params = self._where(filters)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+
+    def to_dataframe(self, table, **filters):
+        """טבלה כ-DataFrame"""
+        import pandas as pd
+        where, params = self._where(filters)
+        with self.lock:
+            return pd.read_sql_query(f"SELECT * FROM {table}{where}", self.conn, params=params)
+
+    def game_stats_frames(self, league_id, season=None):
+        """
+        סטטיסטיקות משחקים של ליגה (ועונה) לחישוב ממוצעים
+
+        Returns:
+            (player_df, team_df)
+        """
+        import pandas as pd
+        params = [int(league_id)]
+        season_filter = ""
+        if season:
+            season_filter = " AND g.season = ?"
+            params.append(season)
+
+        frames = []
+        with self.lock:
+            for table in ('game_player_stats', 'game_team_stats'):
+                sql = (
+                    f"SELECT s.* FROM {table} s JOIN games g ON g.game_id = s.game_id "
+                    f"WHERE s.league_id = ?{season_filter}"
+                )
+                frames.append(pd.read_sql_query(sql, self.conn, params=params))
+        return tuple(frames)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ============================================
+# MODULE-LEVEL WAREHOUSE
+# ============================================
+
+_warehouse = None
+_warehouse_lock = threading.Lock()
+
+
+def get_warehouse():
+    """המחסן המשותף, או None אם הוא מבוטל ב-SCRAPING_CONFIG"""
+    global _warehouse
+    settings = SCRAPING_CONFIG.get('warehouse', {})
+    if not settings.get('enabled', False):
+        return None
+
+    with _warehouse_lock:
+        if _warehouse is None:
+            _warehouse = Warehouse(settings.get('path', 'data/warehouse.sqlite'))
+    return _warehouse